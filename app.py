@@ -1,10 +1,25 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 import base64
-import csv
-from io import StringIO
 from datetime import datetime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from stockcount.counting import add_count_entry as record_count_entry, set_count_complete as mark_count_complete
+from stockcount.bundles import BUNDLE_MIME_TYPES
+from stockcount.delta import ExportWatermark
+from stockcount.export_cache import ExportCache
+from stockcount.jobs import ExportJobManager
+from stockcount.history import SessionHistory
+from stockcount.ledger import CountLedger
+from stockcount.memory import MemoryAuditor
+from stockcount.metrics import AppMetrics, MetricsExporter
+from stockcount.profiling import PhaseProfiler, activate, phase_end, phase_start, profiled, span
+from stockcount.theme import (
+    ADD_COUNT_BUTTON_CSS, CENTERED_BUTTON_CSS, CENTERING_CSS, COUNT_INPUT_CSS, COUNT_SCREEN_CSS,
+    EXPORT_BUTTON_CSS, GLOBAL_THEME_CSS, HISTORY_COMPARISON_CSS, LOCATION_BUTTON_CSS, METRIC_CSS,
+    NUMBER_INPUT_CSS, SEARCH_BOX_CSS, SEARCH_RESULTS_CSS,
+    THEME_PRIMARY, THEME_SECONDARY, THEME_GRADIENT,
+)
+from stockcount.uistate import ProductUIState
 
 # Set page title and configuration
 st.set_page_config(
@@ -14,118 +29,71 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Define global theme colors
-THEME_PRIMARY = "#6a28e8"  # Main purple shade
-THEME_SECONDARY = "#9161fd"  # Lighter purple
-THEME_GRADIENT = f"linear-gradient(135deg, {THEME_PRIMARY} 0%, {THEME_SECONDARY} 100%)"
-THEME_SUCCESS = "#34C759"  # Green
-THEME_WARNING = "#FF9500"  # Orange
-THEME_ERROR = "#FF3B30"  # Red
-
-# Apply the purple theme to the app
-st.markdown(f"""
-<style>
-/* Global Theme Styles */
-:root {{
-    --theme-primary: {THEME_PRIMARY};
-    --theme-secondary: {THEME_SECONDARY};
-    --theme-success: {THEME_SUCCESS};
-    --theme-warning: {THEME_WARNING};
-    --theme-error: {THEME_ERROR};
-}}
-
-/* Header styling */
-h1, h2, h3, h4, h5, h6 {{
-    color: {THEME_PRIMARY} !important;
-}}
-
-/* Change primary button color to purple */
-.stButton > button[data-baseweb="button"] {{
-    background-color: {THEME_PRIMARY};
-    border-color: {THEME_PRIMARY};
-}}
-
-/* Change hover state */
-.stButton > button[data-baseweb="button"]:hover {{
-    background-color: {THEME_SECONDARY};
-    border-color: {THEME_SECONDARY};
-}}
+# Metrics for the ops scraper, one registry and exporter per server process; a port that can't be bound is logged and skipped
+@st.cache_resource
+def get_metrics():
+    metrics = AppMetrics()
+    MetricsExporter.from_environment(metrics.registry).start()
+    return metrics
 
-/* Change links to purple */
-a {{
-    color: {THEME_PRIMARY} !important;
-}}
+# Function to tell whether a browser session still exists, connected or kept for a reconnect
+def session_is_open(session_id):
+    session_manager = getattr(st.runtime.get_instance(), '_session_mgr', None)
+    # Without a session manager (the test runtime) every audited session counts as open
+    return session_manager is None or session_manager.get_session_info(session_id) is not None
 
-/* Change selection color */
-::selection {{
-    background-color: {THEME_SECONDARY};
-    color: white;
-}}
+# Session-state memory of every session in this process, also exported as a metric
+@st.cache_resource
+def get_memory_auditor():
+    auditor = MemoryAuditor(is_open=session_is_open)
+    get_metrics().registry.gauge(
+        "stockcount_session_state_bytes", "Deep size of session state across active sessions."
+    ).set_function(auditor.total_bytes)
+    return auditor
 
-/* Custom scrollbar */
-::-webkit-scrollbar {{
-    width: 10px;
-}}
+# Function to get the catalog's product ids as strings, for grouping per-product session-state keys
+def audit_product_ids():
+    engine = st.session_state.get('variance_engine')
+    if engine is None:
+        return frozenset()
+    return engine.product_index if engine.product_index.dtype == object else engine.product_index.astype(str)
 
-::-webkit-scrollbar-track {{
-    background: #f1f1f1;
-}}
+# Time this rerun's phases for the diagnostics panel and the metrics
+if 'profiler' not in st.session_state:
+    st.session_state.profiler = PhaseProfiler(sink=get_metrics().observe_phase)
+activate(st.session_state.profiler)
+st.session_state.profiler.begin_rerun()
 
-::-webkit-scrollbar-thumb {{
-    background: {THEME_SECONDARY};
-    border-radius: 5px;
-}}
+# Registries with up to this many countable locations get one button each; larger ones a searchable dropdown
+LOCATION_BUTTON_LIMIT = 8
 
-::-webkit-scrollbar-thumb:hover {{
-    background: {THEME_PRIMARY};
-}}
-
-/* Streamlit progress bar */
-.stProgress > div > div > div > div {{
-    background-color: {THEME_PRIMARY};
-}}
-
-/* Sidebar */
-.css-1d391kg {{
-    background-color: #f5f0ff;
-}}
-
-/* Custom input fields */
-.stTextInput > div > div > input {{
-    border-color: #d0bfff !important;
-}}
-.stTextInput > div > div > input:focus {{
-    border-color: {THEME_PRIMARY} !important;
-    box-shadow: 0 0 0 1px {THEME_SECONDARY} !important;
-}}
-
-/* Change select box color */
-.stSelectbox > div > div > div {{
-    border-color: #d0bfff !important;
-}}
-.stSelectbox > div > div > div:focus {{
-    border-color: {THEME_PRIMARY} !important;
-    box-shadow: 0 0 0 1px {THEME_SECONDARY} !important;
-}}
-
-/* Number input */
-.stNumberInput > div > div > input {{
-    border-color: #d0bfff !important;
-}}
-.stNumberInput > div > div > input:focus {{
-    border-color: {THEME_PRIMARY} !important;
-    box-shadow: 0 0 0 1px {THEME_SECONDARY} !important;
-}}
-
-</style>
-"""
-, unsafe_allow_html=True)
+# Apply the purple theme to the app
+theme_css_started = phase_start()
+st.markdown(GLOBAL_THEME_CSS, unsafe_allow_html=True)
+phase_end("theme_css", theme_css_started)
 
 # Initialize session state variables if they don't exist
 if 'stock_data' not in st.session_state:
     st.session_state.stock_data = None
 if 'count_data' not in st.session_state:
     st.session_state.count_data = {}
+# Columnar copy of every count entry, used by the report engine
+if 'count_ledger' not in st.session_state:
+    st.session_state.count_ledger = CountLedger()
+# Finished exports, reused until the counts or the uploaded file change
+if 'export_cache' not in st.session_state:
+    st.session_state.export_cache = ExportCache()
+if 'catalog_hash' not in st.session_state:
+    st.session_state.catalog_hash = None
+# Ledger version of the last export sent to the stock system, for delta exports
+if 'export_watermark' not in st.session_state:
+    st.session_state.export_watermark = ExportWatermark()
+# Whether the recount queue weights variance by unit value
+if 'recount_by_value' not in st.session_state:
+    st.session_state.recount_by_value = False
+# Ids of this session's background export jobs
+if 'export_jobs' not in st.session_state:
+    st.session_state.export_jobs = []
 if 'current_search' not in st.session_state:
     st.session_state.current_search = ""
 if 'filtered_data' not in st.session_state:
@@ -139,6 +107,23 @@ if 'raw_csv_content' not in st.session_state:
 # New session state for historical count data
 if 'historical_counts' not in st.session_state:
     st.session_state.historical_counts = {}
+# Small per-product UI choices (e.g. the location picked), LRU-bounded instead of one key per product
+if 'product_ui_state' not in st.session_state:
+    st.session_state.product_ui_state = ProductUIState()
+# Name this tablet's counter uses in a shared team count
+if 'counter_name' not in st.session_state:
+    st.session_state.counter_name = ""
+# Route worklist mode: counters step through uncounted items in walking order
+if 'route_mode' not in st.session_state:
+    st.session_state.route_mode = False
+if 'route_cursor' not in st.session_state:
+    st.session_state.route_cursor = 0
+# "all" walks every uncounted item, "cycle" only this session's cycle count worklist
+if 'route_scope' not in st.session_state:
+    st.session_state.route_scope = "all"
+# Per (product, session) totals kept up to date as counts arrive
+if 'session_history' not in st.session_state:
+    st.session_state.session_history = SessionHistory()
 # Session state for count batch/session tracking
 if 'count_sessions' not in st.session_state:
     st.session_state.count_sessions = []
@@ -149,503 +134,316 @@ if 'current_count_session' not in st.session_state:
         "name": f"Count Session {datetime.now().strftime('%b %d, %Y %H:%M')}"
     }
 
+# Function to show a catalog message on the page
+def show_notice(level, message):
+    getattr(st, level)(message)
+
 # Function to validate CSV structure and map columns
+@profiled("validate_csv")
 def validate_csv(df):
-    # Define column mappings (to handle different possible column names)
-    possible_id_columns = ['product_id', 'id', 'item_id', 'sku', 'item_number', 'item#', 'product#', 'barcode', 'code', 'item code', 'product code', 'article number']
-    possible_brand_columns = ['brand', 'Brand', 'manufacturer', 'supplier', 'vendor', 'make', 'producer', 'company', 'label', 'maker', 'source', 'Brand and Description', 'Brand & Description']
-    possible_description_columns = ['description', 'Description', 'product_description', 'item_description', 'details', 'specs', 'product_name', 'name', 'title', 'item', 'product', 'desc', 'article', 'goods', 'merchandise', 'Brand and Description', 'Brand & Description']
-    possible_location_columns = ['location', 'location_id', 'loc', 'warehouse', 'shelf', 'bin', 'storage', 'position', 'area', 'zone', 'aisle', 'section', 'dept', 'department', 'store']
-    possible_count_columns = ['expected_count', 'count', 'quantity', 'qty', 'stock', 'inventory', 'on_hand', 'amount', 'units', 'expected', 'expected qty', 'on hand qty', 'stock level', 'current stock', 'stock count', 'current count', '[E]Close SC', 'quantity on hand', 'par', 'par level', 'total', 'balance', 'volume', 'number', 'num']
-    
-    # Check specifically for the [E]Close SC column since it's important
-    close_sc_col = next((col for col in df.columns if col == '[E]Close SC'), None)
-    
-    # Try exact match first
-    id_col = next((col for col in df.columns if col.lower() in [c.lower() for c in possible_id_columns]), None)
-    brand_col = next((col for col in df.columns if col.lower() in [c.lower() for c in possible_brand_columns]), None)
-    description_col = next((col for col in df.columns if col.lower() in [c.lower() for c in possible_description_columns]), None)
-    location_col = next((col for col in df.columns if col.lower() in [c.lower() for c in possible_location_columns]), None)
-    count_col = next((col for col in df.columns if col.lower() in [c.lower() for c in possible_count_columns]), None)
-    
-    # Check specifically for 'Brand & Description' column which combines brand and description
-    brand_and_desc_col = next((col for col in df.columns if col in ['Brand & Description', 'Brand and Description']), None)
-    
-    # If not found, try partial match as a fallback
-    if description_col is None:
-        for col in df.columns:
-            if any(term in col.lower() for term in ['desc', 'name', 'product', 'item', 'title', 'article']):
-                description_col = col
-                break
-    
-    if count_col is None:
-        # First try partial name matching
-        for col in df.columns:
-            if any(term in col.lower() for term in ['count', 'qty', 'quant', 'stock', 'amount', 'unit', 'invent', 'par', 'level', 'number', 'vol']):
-                count_col = col
-                break
-                
-        # If still not found, try to find any numeric column as a last resort
-        if count_col is None:
-            for col in df.columns:
-                try:
-                    # Check if column has numeric values
-                    if pd.to_numeric(df[col], errors='coerce').notna().any():
-                        # Use the first mostly-numeric column we find
-                        if pd.to_numeric(df[col], errors='coerce').notna().mean() > 0.5:  # More than 50% are numbers
-                            count_col = col
-                            st.info(f"Using '{col}' as the quantity column based on numeric content")
-                            break
-                except:
-                    continue
-    
-    # Special handling for "Brand & Description" column
-    # If we have this column, we should split it into brand and description
-    # Look for any column containing both 'brand' and 'description' in any case
-    brand_and_desc_cols = [col for col in df.columns if 'brand' in col.lower() and ('description' in col.lower() or 'desc' in col.lower())]
-    brand_and_desc_col = None
-    
-    if brand_and_desc_cols:
-        # Use the first matching column
-        brand_and_desc_col = brand_and_desc_cols[0]
-        st.info(f"Found '{brand_and_desc_col}' column - splitting into brand and description components")
-        
-        # First, keep the full text for searching (critical for our search function)
-        df['combined_search_field'] = df[brand_and_desc_col].fillna("").astype(str)
-        
-        # Ensure Brand & Description is available for search
-        df['Brand & Description'] = df[brand_and_desc_col].fillna("").astype(str)
-        
-        # Assuming format is "Brand - Description" or just the description
-        try:
-            # Try to split by dash with brand before the dash
-            df['brand_extracted'] = df[brand_and_desc_col].str.split('-', n=1).str[0].str.strip()
-            df['description_extracted'] = df[brand_and_desc_col].str.split('-', n=1).str[1].str.strip()
-            
-            # If we have null values in description, it means there was no dash
-            # In that case, use the whole field as description
-            mask = df['description_extracted'].isna()
-            df.loc[mask, 'description_extracted'] = df.loc[mask, brand_and_desc_col]
-            df.loc[mask, 'brand_extracted'] = "Unknown"
-            
-            # Set our columns
-            brand_col = 'brand_extracted'
-            description_col = 'description_extracted'
-        except:
-            # If split fails, just use the whole column as description
-            df['description_extracted'] = df[brand_and_desc_col]
-            df['brand_extracted'] = "Unknown"
-            brand_col = 'brand_extracted'
-            description_col = 'description_extracted'
-    
-    # Check if we have product_name or description - we can work with either
-    has_product_name = False
-    if 'product_name' in df.columns and description_col is None:
-        description_col = 'product_name'
-        has_product_name = True
-
-    # Handle missing brand by using a default value
-    if brand_col is None and description_col is not None:
-        df['brand'] = "Unknown"
-        brand_col = 'brand'
-    
-    # Check if we have sufficient columns to work with
-    missing_types = []
-    if id_col is None:
-        # If no ID column, we'll create one using row numbers
-        df['product_id'] = [f"P{i+1:03d}" for i in range(len(df))]
-        id_col = 'product_id'
-    
-    # Description is required - we can't reasonably create this
-    if description_col is None:
-        missing_types.append("description or product name")
-    
-    # Location is optional, we can use "Unknown" as default
-    if location_col is None:
-        df['location'] = "Unknown"
-        location_col = 'location'
-    
-    # Expected count is required
-    if count_col is None:
-        missing_types.append("expected count or quantity")
-        
-    # Make sure we preserve the [E]Close SC column if it exists
-    if close_sc_col is not None and close_sc_col != count_col:
-        # Keep it for export later
-        df['[E]Close SC_preserved'] = df[close_sc_col]
-    
-    if missing_types:
-        return False, f"Required column types missing: {', '.join(missing_types)}. At minimum, please include columns for description/name and expected count."
-    
-    # Map the found columns to our expected column names
-    df_mapped = df.copy()
-    rename_dict = {
-        id_col: 'product_id',
-        location_col: 'location',
-        count_col: 'expected_count'
-    }
-    
-    if not has_product_name:
-        rename_dict[description_col] = 'description'
-        if brand_col != 'brand':  # Don't remap if we created it above
-            rename_dict[brand_col] = 'brand'
-    else:
-        # If we're using product_name as description, no need to rename
-        df_mapped['description'] = df_mapped[description_col]
-        
-    df_mapped.rename(columns=rename_dict, inplace=True)
-    
-    # Create product_name field by combining brand and description if needed
-    if 'product_name' not in df_mapped.columns:
-        df_mapped['product_name'] = df_mapped['brand'] + ' - ' + df_mapped['description']
-    
-    # Make sure we preserve the combined search field if it exists
-    if 'combined_search_field' in df.columns:
-        df_mapped['combined_search_field'] = df['combined_search_field']
-        
-    # Always create or preserve Brand & Description field for searching
-    if 'Brand & Description' in df.columns:
-        df_mapped['Brand & Description'] = df['Brand & Description']
-    elif 'combined_search_field' in df_mapped.columns:
-        df_mapped['Brand & Description'] = df_mapped['combined_search_field']
-    else:
-        # Create a combined field for display and search
-        df_mapped['Brand & Description'] = df_mapped['brand'] + ' - ' + df_mapped['description']
-    
-    # Check data types
-    try:
-        # Handle PID and other non-numeric headers in the count column
-        # First try to detect header or comment rows if they exist
-        if count_col:
-            # Check for standard header terms
-            if str(df_mapped['expected_count'].iloc[0]).strip().upper() in ['PID', 'QTY', 'COUNT', 'QUANTITY']:
-                st.info(f"Detected header row. Removing first row containing '{df_mapped['expected_count'].iloc[0]}'")
-                df_mapped = df_mapped.iloc[1:].reset_index(drop=True)
-            
-            # Check for comment row containing "Do not delete or edit"
-            comment_rows = []
-            for i, val in enumerate(df_mapped['expected_count']):
-                if isinstance(val, str) and "do not delete" in val.lower():
-                    comment_rows.append(i)
-                    st.info(f"Found comment row at index {i}: '{val}'")
-            
-            # Remove any detected comment rows
-            if comment_rows:
-                df_mapped = df_mapped.drop(comment_rows).reset_index(drop=True)
-                st.success(f"Removed {len(comment_rows)} comment row(s) from the data")
-        
-        # Now handle any remaining non-numeric values in the expected_count
-        try:
-            # Convert expected_count to numeric
-            df_mapped['expected_count'] = pd.to_numeric(df_mapped['expected_count'], errors='coerce')
-            
-            # Check if we have NaN values after conversion
-            if df_mapped['expected_count'].isna().any():
-                # If some values couldn't be converted, drop those rows
-                na_count = df_mapped['expected_count'].isna().sum()
-                st.warning(f"Removed {na_count} rows with non-numeric expected counts")
-                df_mapped = df_mapped.dropna(subset=['expected_count']).reset_index(drop=True)
-                
-                # If we dropped all rows, that's an error
-                if len(df_mapped) == 0:
-                    return False, "No valid rows remaining after removing non-numeric count values."
-        except Exception as e:
-            return False, f"Error converting expected counts to numbers: {str(e)}"
-            
-        # Ensure product_id is unique
-        if df_mapped['product_id'].duplicated().any():
-            return False, "Duplicate product IDs found. Each product ID must be unique."
-        
-        return True, df_mapped
-    except Exception as e:
-        return False, f"Error validating data: {str(e)}"
+    return validate_catalog(df, notify=show_notice)
 
 # Function to add a count entry with historical tracking
+@profiled("add_count_entry")
 def add_count_entry(product_id, count_value, count_location, count_note):
-    # Initialize product in count_data if it doesn't exist
-    if product_id not in st.session_state.count_data:
-        st.session_state.count_data[product_id] = []
-    
-    # Initialize product in historical_counts if it doesn't exist
-    if product_id not in st.session_state.historical_counts:
-        st.session_state.historical_counts[product_id] = []
+    record_count_entry(st.session_state, product_id, count_value, count_location, count_note)
+    get_metrics().count_entries.inc()
     
-    # Add timestamp to count entry
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    session_id = st.session_state.current_count_session["id"]
-    
-    # Create the count entry
-    count_entry = {
-        'count': count_value,
-        'location': count_location,
-        'timestamp': timestamp,
-        'session_id': session_id
-    }
-    
-    # Store entry in current count data
-    st.session_state.count_data[product_id].append(count_entry.copy())
+    # Share progress with the other counters in a team count
+    schedule = current_work_schedule()
+    if schedule is not None:
+        schedule.mark_counted(product_id)
+
+# Function to mark a product's count as complete (or not), which updates [E]Close SC in the export
+def set_count_complete(product_id, is_complete):
+    mark_count_complete(st.session_state, product_id, is_complete)
+
+# Function to get the variance engine for the loaded catalog, brought up to date with the ledger
+def get_variance_engine():
+    catalog = st.session_state.stock_data
+    catalog_key = st.session_state.catalog_hash or id(catalog)
     
-    # Add to historical counts 
-    st.session_state.historical_counts[product_id].append({
-        'count': count_value,
-        'location': count_location,
-        'timestamp': timestamp,
-        'session_id': session_id,
-        'session_name': st.session_state.current_count_session["name"]
-    })
+    # A new catalog needs a new engine and recount queue; otherwise only the new ledger entries are folded in
+    if st.session_state.get('variance_engine_key') != catalog_key:
+        st.session_state.variance_engine = VarianceEngine(catalog)
+        st.session_state.variance_engine_key = catalog_key
+        st.session_state.recount_queue = RecountQueue()
     
-    # Keep track of which products have been counted in this session
-    product_info = None
+    engine = st.session_state.variance_engine
+    touched = engine.refresh(st.session_state.count_ledger)
     
-    # Find the product details in the stock data
-    if st.session_state.stock_data is not None:
-        product_row = st.session_state.stock_data[st.session_state.stock_data['product_id'] == product_id]
-        if not product_row.empty:
-            product_info = {
-                'product_id': product_id,
-                'name': product_row['Brand & Description'].iloc[0],
-                'expected_count': product_row['expected_count'].iloc[0] if 'expected_count' in product_row else None
-            }
-    
-    # Add product to the current session's counted items if not already there
-    session_exists = False
-    for session in st.session_state.count_sessions:
-        if session['id'] == session_id:
-            session_exists = True
-            if product_info and product_id not in [p['product_id'] for p in session.get('products', [])]:
-                if 'products' not in session:
-                    session['products'] = []
-                session['products'].append(product_info)
-            break
+    # Re-prioritise just the products that received counts, O(log N) each
+    if len(touched):
+        priorities = engine.recount_priorities(touched, by_value=st.session_state.recount_by_value)
+        for position, priority in zip(touched, priorities):
+            st.session_state.recount_queue.update(engine.product_ids[position], float(priority))
+    return engine
+
+# Sites, rooms and shelves from locations.toml, loaded once per server process
+@st.cache_resource
+def get_location_registry():
+    return load_location_registry()
+
+# Function to get the location x session cube, bringing it up to date with the ledger
+def get_location_cube():
+    catalog_key = st.session_state.catalog_hash or id(st.session_state.stock_data)
+    if st.session_state.get('location_cube_key') != catalog_key:
+        st.session_state.location_cube = LocationCube(st.session_state.stock_data, get_location_registry())
+        st.session_state.location_cube_key = catalog_key
     
-    # If this is a new session, add it to the list
-    if not session_exists:
-        new_session = st.session_state.current_count_session.copy()
-        new_session['products'] = [product_info] if product_info else []
-        st.session_state.count_sessions.append(new_session)
+    cube = st.session_state.location_cube
+    cube.refresh(st.session_state.count_ledger)
+    return cube
+
+# Callback to pop the next product off the recount queue and search for it
+def recount_next_product():
+    head = st.session_state.recount_queue.pop()
+    if head is not None:
+        # Runs before the rerun, so the search box widget can still be updated
+        st.session_state.current_search = str(head[0])
+        st.session_state.search_box = str(head[0])
+
+# Team count plans, keyed by catalog hash and shared by every session of this server process
+@st.cache_resource
+def get_work_schedules():
+    return {}
+
+# Function to get the team count plan for the loaded catalog, or None
+def current_work_schedule():
+    return get_work_schedules().get(st.session_state.catalog_hash)
+
+# Function to get the walking route for the loaded catalog, built once per catalog
+def get_count_route():
+    catalog_key = st.session_state.catalog_hash or id(st.session_state.stock_data)
+    if st.session_state.get('count_route_key') != catalog_key:
+        st.session_state.count_route = CountRoute(st.session_state.stock_data, get_location_registry())
+        st.session_state.count_route_key = catalog_key
+        st.session_state.route_cursor = 0
+    return st.session_state.count_route
 
-# Function to download data as CSV
-def get_csv_download_link(df_or_csv, filename="stock_count_results.csv"):
-    if isinstance(df_or_csv, str):
-        # If a CSV string is passed directly
-        csv_string = df_or_csv
+# Callback to move to the next uncounted item on the route and search for it
+def advance_count_route(start=None):
+    route = get_count_route()
+    schedule = current_work_schedule()
+    if schedule is not None and st.session_state.counter_name in schedule:
+        # Team count: walk only this counter's package
+        after = -1 if start == 0 else st.session_state.route_cursor
+        stop = schedule.next_stop(st.session_state.counter_name, after)
     else:
-        # If a dataframe is passed
-        csv_string = df_or_csv.to_csv(index=False)
-    
-    b64 = base64.b64encode(csv_string.encode()).decode()
-    
-    # Create an iOS-style button for the download
-    href = f'''
-    <a href="data:file/csv;base64,{b64}" download="{filename}" 
-       style="display: block; width: 100%; text-align: center; 
-              background-color: #007AFF; color: white; 
-              padding: 12px 20px; border-radius: 25px;
-              font-weight: bold; text-decoration: none;
-              box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
-              transition: all 0.3s ease;"
-       onmouseover="this.style.backgroundColor='#0062CC'; this.style.boxShadow='0 6px 12px rgba(0, 0, 0, 0.15)';"
-       onmouseout="this.style.backgroundColor='#007AFF'; this.style.boxShadow='0 4px 8px rgba(0, 0, 0, 0.1)';"
-    >
-        📥 Export Stock Data
-    </a>
-    '''
-    return href
+        if start is None:
+            start = st.session_state.route_cursor + 1
+        stop = route.next_stop(get_variance_engine().is_counted, start, route_worklist())
+    if stop is None:
+        st.session_state.route_mode = False
+        return
+    st.session_state.route_cursor = stop
+    # Runs before the rerun, so the search box widget can still be updated
+    st.session_state.current_search = str(route.product_ids[stop])
+    st.session_state.search_box = str(route.product_ids[stop])
+
+# Callback to start route mode at the first uncounted item
+def start_count_route(scope="all"):
+    st.session_state.route_scope = scope
+    st.session_state.route_mode = True
+    advance_count_route(start=0)
+
+# Function to get the catalog rows route mode is limited to, or None for the whole catalog
+def route_worklist():
+    return get_cycle_plan().selected if st.session_state.route_scope == "cycle" else None
+
+# Function to value each catalog row's stock and score it for ABC classification
+def cycle_count_scores(basis):
+    engine = get_variance_engine()
+    unit_value = engine.unit_values if engine.unit_values is not None else 1.0
+    values = np.abs(engine.expected * unit_value)
+    if basis == "Velocity":
+        # Average movement between saved sessions, valued per unit
+        velocity = get_trend_store().velocity()
+        if len(velocity):
+            moves = velocity.reindex(pd.Index(engine.product_ids).astype(str)).fillna(0.0).to_numpy()
+            return moves * unit_value, values
+    return values, values
+
+# Function to get this session's cycle count plan, rebuilt when its settings change
+def get_cycle_plan():
+    basis = st.session_state.get("cycle_basis", "Stock value")
+    tolerance = st.session_state.get("cycle_tolerance", 2.0) / 100
+    plan_key = (
+        st.session_state.catalog_hash or id(st.session_state.stock_data),
+        st.session_state.current_count_session["id"],
+        basis,
+        tolerance,
+    )
+    if st.session_state.get('cycle_plan_key') != plan_key:
+        scores, values = cycle_count_scores(basis)
+        st.session_state.cycle_plan = CyclePlan(scores, values, st.session_state.current_count_session["id"], tolerance)
+        st.session_state.cycle_plan_key = plan_key
+    return st.session_state.cycle_plan
+
+# Callback to leave route mode
+def stop_count_route():
+    st.session_state.route_mode = False
+    st.session_state.route_scope = "all"
+    st.session_state.current_search = ""
+    st.session_state.search_box = ""
+
+# Function to rebuild the recount queue after the weighting changes
+def rebuild_recount_queue():
+    engine = get_variance_engine()
+    priorities = engine.recount_priorities(by_value=st.session_state.recount_by_value)
+    outstanding = st.session_state.recount_queue.outstanding
+    st.session_state.recount_queue = RecountQueue.from_arrays(engine.product_ids, priorities, outstanding)
 
 # Function to prepare final data for export
-def prepare_export_data(report_type="standard"):
-    """
-    Raw CSV manipulation to ensure [E]Close SC in row 2 of the CSV gets updated
-    with count values without adding any extra columns.
-    """
-    if st.session_state.stock_data is None or 'raw_csv_content' not in st.session_state:
+def prepare_export_data(report_type="standard", record_watermark=True):
+    if report_type == "location_summary" and st.session_state.stock_data is not None:
+        get_location_cube()
+    return exports.prepare_export_data(st.session_state, report_type, get_metrics().export_seconds, record_watermark)
+
+# Function to prepare an export of only the products whose count changed since the last export
+def prepare_delta_export(delta_format="original"):
+    return exports.prepare_delta_export(st.session_state, delta_format)
+
+# Function to prepare a compressed bundle of several reports
+def prepare_bundle_export(report_types, bundle_format="zip"):
+    if "location_summary" in report_types and st.session_state.stock_data is not None:
+        get_location_cube()
+    return exports.prepare_bundle_export(st.session_state, report_types, bundle_format)
+
+# Function to show a native download button that generates the export on click
+def export_download_button(label, file_name, report_type="standard", key=None):
+    export_builder = prepare_export_data(report_type)
+    if export_builder is None:
+        st.error("No stock data available for export.")
+        return False
+    
+    return st.download_button(
+        label,
+        data=export_builder,
+        file_name=file_name,
+        mime="text/csv",
+        key=key,
+        use_container_width=True
+    )
+
+# Shared pool for exports built in the background, one per server process
+@st.cache_resource
+def get_export_jobs():
+    return ExportJobManager()
+
+# Function to compare two count sessions, with product names for display, rebuilt only when the counts change
+def compare_count_sessions(baseline_session_id, compare_session_id):
+    diff_key = (
+        st.session_state.catalog_hash or id(st.session_state.stock_data),
+        st.session_state.count_ledger.version,
+        baseline_session_id,
+        compare_session_id,
+    )
+    if st.session_state.get('session_diff_key') != diff_key:
+        entries = st.session_state.count_ledger.to_frame()
+        diff = diff_sessions(entries, baseline_session_id, compare_session_id)
+        names = st.session_state.stock_data.drop_duplicates('product_id').set_index('product_id')['Brand & Description']
+        diff.insert(0, 'Product', names.reindex(diff.index).to_numpy())
+        st.session_state.session_diff = diff
+        st.session_state.session_diff_key = diff_key
+    return st.session_state.session_diff
+
+# Long-term store of session totals, shared by every session of this server process
+@st.cache_resource
+def get_trend_store():
+    return TrendStore()
+
+# Function to write a count session's per-product totals to the trend store
+def save_session_trends(session):
+    totals = st.session_state.session_history.session_totals(session['id'])
+    if not totals:
+        return 0
+    trend_store = get_trend_store()
+    trend_store.record_session(session['timestamp'], totals)
+    # Fold sessions past the retention window into monthly averages before writing
+    trend_store.downsample()
+    trend_store.save()
+    return len(totals)
+
+# Function to queue an export on the background pool and remember the job for this session
+def submit_background_export(label, file_name, report_type="standard"):
+    # The build may never be downloaded, so the delta watermark only moves once it is
+    export_builder = prepare_export_data(report_type, record_watermark=False)
+    if export_builder is None:
         st.error("No stock data available for export.")
         return None
     
-    try:
-        # Get the raw CSV content
-        csv_content = st.session_state.raw_csv_content
-        
-        # Split into lines
-        lines = csv_content.strip().split('\n')
-        
-        # We need at least 3 lines (header, [E]Close SC row, and data)
-        if len(lines) < 3:
-            st.error("CSV file doesn't have the expected format.")
-            return None
-        
-        # Parse each row to find product_id and [E]Close SC positions
-        reader = csv.reader(lines)
-        rows = list(reader)
-        
-        if len(rows) < 3:
-            st.error("CSV file doesn't have enough rows.")
-            return None
-        
-        # First row is the header (row 0)
-        header_row = rows[0]
-        
-        # Second row (row 1) should contain [E]Close SC
-        eclose_row = rows[1]
-        
-        # Find the cell containing [E]Close SC in the second row
-        eclose_col = -1
-        for i, cell in enumerate(eclose_row):
-            if '[E]Close SC' in cell:
-                eclose_col = i
-                break
-        
-        if eclose_col == -1:
-            st.error("Cannot find [E]Close SC in row 2 of the CSV file.")
-            return None
-        
-        # Find the product_id column index in our processed DataFrame
-        product_id_col = -1
-        for col in st.session_state.stock_data.columns:
-            if col == 'product_id':
-                # Find the original column index
-                product_id_col = list(st.session_state.stock_data.columns).index(col)
-                break
-        
-        if product_id_col == -1:
-            st.error("Cannot find product_id column.")
-            return None
-        
-        # Find the column index for the count column (794438) for reference
-        count_col = -1
-        for i, cell in enumerate(header_row):
-            if '794438' in cell:
-                count_col = i
-                break
-                
-        if count_col == -1:
-            st.warning("Cannot find 794438 column in the CSV header. Using the same column as [E]Close SC.")
-            # Fall back to using the same column as [E]Close SC
-            count_col = eclose_col
-        
-        # Create a mapping of product_id to count value
-        product_counts = {}
-        for product_id, counts in st.session_state.count_data.items():
-            if counts:
-                total_count = sum(entry['count'] for entry in counts)
-                product_counts[product_id] = str(total_count)
-        
-        # Create a new list of rows for the output CSV
-        new_rows = [rows[0]]  # Keep header row unchanged
-        
-        # Keep the original [E]Close SC row completely unchanged
-        new_eclose_row = rows[1]  # Use the exact original row
-        
-        # Process all data rows (starting from row 3, index 2)
-        data_rows = []
-        for i in range(2, len(rows)):
-            row = rows[i]
-            
-            if len(row) <= max(product_id_col, count_col, eclose_col):
-                # Skip malformed rows
-                data_rows.append(row)
-                continue
-            
-            # Get the product ID from our mapping in the session state
-            data_index = i - 2  # Adjust for 0-based indexing and 2 header rows
-            if data_index < len(st.session_state.stock_data):
-                try:
-                    product_id = st.session_state.stock_data.iloc[data_index]['product_id']
-                    
-                    # Set count value in the 794438 column to ensure data consistency 
-                    if product_id in product_counts:
-                        row[count_col] = product_counts[product_id]
-                    else:
-                        # Set to 0 if not counted
-                        row[count_col] = "0"
-                except:
-                    # If we can't get the product_id or other error, leave row unchanged
-                    pass
-            
-            data_rows.append(row)
-        
-        # In each data row, we need to update the count in the [E]Close SC column
-        
-        # First, find the [E]Close SC column in the row 2 (so we know which column to update in the data)
-        eclose_col = -1
-        for idx, cell in enumerate(new_eclose_row):
-            if '[E]Close SC' in str(cell):
-                eclose_col = idx
-                break
-        
-        if eclose_col == -1:
-            st.warning("[E]Close SC column not found in row 2, looking in header row instead.")
-            # Try to find it in the header row as a fallback
-            for idx, cell in enumerate(header_row):
-                if '[E]Close SC' in str(cell):
-                    eclose_col = idx
-                    break
-        
-        # Update the count values in the [E]Close SC column of the data rows
-        if eclose_col != -1:
-            # For each data row, update the [E]Close SC column with count values
-            for i, row in enumerate(data_rows):
-                # Get the product ID for this row
-                if i < len(st.session_state.stock_data):
-                    try:
-                        # Get the product ID for this row
-                        product_id = st.session_state.stock_data.iloc[i]['product_id']
-                        
-                        # Make sure the row has enough cells
-                        while len(row) <= eclose_col:
-                            row.append("")
-                        
-                        # Update the [E]Close SC column with the count value
-                        if product_id in product_counts:
-                            row[eclose_col] = product_counts[product_id]
-                        else:
-                            # Set to 0 if no count found
-                            row[eclose_col] = "0"
-                    except Exception as e:
-                        st.error(f"Error updating row {i}: {str(e)}")
+    script_run_ctx = get_script_run_ctx()
+    owner = script_run_ctx.session_id if script_run_ctx is not None else None
+    on_served = exports.export_served_callback(st.session_state, report_type)
+    job = get_export_jobs().submit(label, file_name, export_builder, owner=owner, on_served=on_served)
+    st.session_state.export_jobs.append(job.id)
+    return job
+
+# Progress bars for running background exports, polled without rerunning the whole page
+@st.fragment(run_every=1.0)
+def running_export_jobs_panel(job_ids):
+    jobs = get_export_jobs()
+    still_running = False
+    
+    for job_id in job_ids:
+        job = jobs.get(job_id)
+        if job is None or not job.active:
+            continue
+        still_running = True
+        st.progress(job.progress, text=f"{job.label}: {job.phase} · {job.progress:.0%}")
+        if st.button("✖ Cancel", key=f"cancel_job_{job_id}"):
+            job.cancel()
+    
+    # Once everything has finished, rerun the page once to show the results and stop polling
+    if not still_running:
+        st.rerun()
+
+# Function to show background export jobs: progress while running, download when done
+def export_jobs_panel():
+    jobs = get_export_jobs()
+    # Forget jobs that the pool has already pruned
+    st.session_state.export_jobs = [job_id for job_id in st.session_state.export_jobs if jobs.get(job_id) is not None]
+    if not st.session_state.export_jobs:
+        return
+    
+    running = [job_id for job_id in st.session_state.export_jobs if jobs.get(job_id).active]
+    if running:
+        running_export_jobs_panel(running)
+    
+    for job_id in st.session_state.export_jobs:
+        job = jobs.get(job_id)
+        if job.active:
+            continue
+        
+        if job.status == "done":
+            st.download_button(
+                f"📥 Download {job.file_name}",
+                data=job.download,
+                file_name=job.file_name,
+                mime="text/csv",
+                key=f"download_job_{job_id}",
+                use_container_width=True
+            )
+        elif job.status == "failed":
+            st.error(f"{job.label} failed: {job.error}")
         else:
-            st.error("Could not find [E]Close SC column in row 2 or header. Count values not updated.")
-        
-        # Keep the row 2 itself unchanged - this is important
-        # We're only updating the data rows (rows 3+), not row 2
-        
-        # Add the updated [E]Close SC row
-        new_rows.append(new_eclose_row)
-        
-        # Add all data rows
-        new_rows.extend(data_rows)
+            st.info(f"{job.label} was cancelled.")
         
-        # Handle filtered report for counted items only
-        if report_type == "counted":
-            filtered_rows = [rows[0], new_eclose_row]  # Keep header rows with updated values
-            
-            for i, row in enumerate(data_rows):
-                if i < len(st.session_state.stock_data):
-                    try:
-                        product_id = st.session_state.stock_data.iloc[i]['product_id']
-                        if product_id in product_counts:
-                            filtered_rows.append(row)
-                    except:
-                        pass
-            
-            # Convert back to CSV
-            output = StringIO()
-            writer = csv.writer(output)
-            writer.writerows(filtered_rows)
-            
-            return output.getvalue()
-        
-        # Convert back to CSV
-        output = StringIO()
-        writer = csv.writer(output)
-        writer.writerows(new_rows)
-        
-        return output.getvalue()
-    
-    except Exception as e:
-        st.error(f"Error preparing export data: {str(e)}")
-        # Fall back to the original data if there's an error
-        return st.session_state.stock_data
+        if st.button("Dismiss", key=f"dismiss_job_{job_id}"):
+            jobs.discard(job_id)
+            st.session_state.export_jobs.remove(job_id)
+            st.rerun()
+
+# Splash logo as an inline image, read once per process (st.image would load NumPy and PIL before the first paint)
+@st.cache_resource
+def splash_logo_html(path):
+    try:
+        with open(path, 'rb') as logo:
+            encoded = base64.b64encode(logo.read()).decode('ascii')
+    except OSError:
+        return None
+    return f'<p style="text-align: right;"><img src="data:image/png;base64,{encoded}" width="100" alt="Arc Inspirations"></p>'
 
 # Function to switch from splash screen to main application
 def switch_to_main():
@@ -653,52 +451,28 @@ def switch_to_main():
     st.rerun()
 
 # Apply global centering CSS for all text content
-st.markdown("""
-<style>
-.stApp {
-    text-align: center;
-}
-.stTextInput, .stNumberInput, .stSelectbox, .stTextArea {
-    text-align: center;
-    margin-left: auto;
-    margin-right: auto;
-    max-width: 600px;
-}
-div.row-widget.stButton {
-    text-align: center;
-    display: flex;
-    justify-content: center;
-}
-.css-6qob1r {
-    text-align: center !important;
-}
-.css-10trblm {
-    text-align: center !important;
-}
-p, h1, h2, h3, h4, h5, h6 {
-    text-align: center !important;
-}
-.stMarkdown {
-    text-align: center !important;
-}
-/* Dropdown style changes */
-.stSelectbox > div > div {
-    background-color: white !important;
-    color: black !important;
-}
-/* Dropdown options */
-.stSelectbox ul {
-    background-color: white !important;
-}
-.stSelectbox ul li {
-    color: black !important;
-}
-/* Dropdown arrow */
-.stSelectbox svg {
-    color: black !important;
-}
-</style>
-""", unsafe_allow_html=True)
+st.markdown(CENTERING_CSS, unsafe_allow_html=True)
+
+# pandas, NumPy and the engines are only needed once there is a catalog, so an empty splash screen paints without them
+engines_needed = st.session_state.view != "splash" or st.session_state.get("splash_uploader") is not None
+if engines_needed:
+    engines_started = phase_start()
+    import numpy as np
+    import pandas as pd
+    
+    from stockcount import exports
+    from stockcount.analytics import VarianceEngine
+    from stockcount.catalog import catalog_hash, read_catalog, validate_csv as validate_catalog
+    from stockcount.cube import LocationCube
+    from stockcount.cycle import CyclePlan
+    from stockcount.diff import DIFF_STATUSES, diff_sessions, diff_summary
+    from stockcount.locations import load_location_registry
+    from stockcount.recount import RecountQueue
+    from stockcount.route import CountRoute
+    from stockcount.scheduler import WorkSchedule
+    from stockcount.search import filter_catalog
+    from stockcount.trends import TrendStore
+    phase_end("engine_imports", engines_started)
 
 # Check which view to display (splash screen or main app)
 if st.session_state.view == "splash":
@@ -706,11 +480,11 @@ if st.session_state.view == "splash":
     # Add a small logo at the top right
     col_logo_left, col_logo_right = st.columns([4, 1])
     with col_logo_right:
-        try:
-            # Use the actual logo image
-            logo_path = "attached_assets/arc-inspirations-squareLogo-1644849585224.png"
-            st.image(logo_path, width=100)  # Smaller logo positioned at top right
-        except:
+        # Use the actual logo image, smaller and positioned at top right
+        logo_html = splash_logo_html("attached_assets/arc-inspirations-squareLogo-1644849585224.png")
+        if logo_html:
+            st.markdown(logo_html, unsafe_allow_html=True)
+        else:
             # If no logo is found, show a text header
             st.markdown('<p style="text-align: right; font-size: 1rem;">Arc Inspirations</p>', unsafe_allow_html=True)
     
@@ -738,6 +512,7 @@ if st.session_state.view == "splash":
                     
                     # Store the raw CSV content for later export
                     st.session_state.raw_csv_content = raw_content
+                    st.session_state.catalog_hash = catalog_hash(raw_content)
                     
                     first_few_lines = raw_content.split('\n')[:5]  # Get first 5 lines
                     
@@ -750,41 +525,8 @@ if st.session_state.view == "splash":
                     uploaded_file.seek(0)
                     
                     # Try multiple approaches to parse the CSV
-                    try:
-                        # First attempt: Try standard parsing
-                        df = pd.read_csv(uploaded_file)
-                        st.success("Loaded CSV file with standard headers")
-                    except Exception as e1:
-                        st.warning(f"Standard header load failed: {str(e1)}")
-                        uploaded_file.seek(0)  # Reset file pointer
-                        try:
-                            # Second attempt: Try with header in row 2 and skip row 1
-                            df = pd.read_csv(uploaded_file, header=1, skiprows=[2])  # Skip row 1 after headers (row index 2)
-                            st.success("Loaded CSV file with headers in row 2 and skipped row 1")
-                        except Exception as e2:
-                            st.warning(f"Row 2 header load failed: {str(e2)}")
-                            uploaded_file.seek(0)  # Reset file pointer
-                            try:
-                                # Third attempt: Try with no headers
-                                df = pd.read_csv(uploaded_file, header=None)
-                                # Generate default column names (Col0, Col1, etc.)
-                                st.warning("Loaded CSV with no headers, using auto-generated column names")
-                            except Exception as e3:
-                                # Try different separators
-                                uploaded_file.seek(0)
-                                for separator in [',', ';', '\t', '|']:
-                                    try:
-                                        uploaded_file.seek(0)
-                                        df = pd.read_csv(uploaded_file, sep=separator)
-                                        st.success(f"Successfully loaded CSV with '{separator}' as separator")
-                                        break
-                                    except Exception as sep_error:
-                                        pass
-                                else:
-                                    # Last attempt: Try with the most flexible parsing
-                                    uploaded_file.seek(0)
-                                    df = pd.read_csv(uploaded_file, sep=None, engine='python')
-                                    st.warning("Used automatic delimiter detection to load CSV")
+                    ingest_started = phase_start()
+                    df = read_catalog(uploaded_file, notify=show_notice)
                     
                     # Show the detected columns
                     st.write("Detected columns:", df.columns.tolist())
@@ -823,6 +565,8 @@ if st.session_state.view == "splash":
                         except Exception as e:
                             st.error(f"Error checking row 2: {str(e)}")
                     
+                    phase_end("ingest", ingest_started)
+                    
                     # Show a preview of the data
                     st.write("Preview of loaded data:")
                     st.dataframe(df.head(3))
@@ -899,6 +643,7 @@ else:
                 
                 # Store the raw CSV content for later export
                 st.session_state.raw_csv_content = raw_content
+                st.session_state.catalog_hash = catalog_hash(raw_content)
                 
                 first_few_lines = raw_content.split('\n')[:5]  # Get first 5 lines
                 
@@ -911,46 +656,14 @@ else:
                 uploaded_file.seek(0)
                 
                 # Try multiple approaches to parse the CSV
-                try:
-                    # First priority: Try with header in row 2 (which is index 1) and skip row 1
-                    # This is the format the user indicated works for their CSV
-                    df = pd.read_csv(uploaded_file, header=1, skiprows=[2])  # Skip row 1 after headers (row index 2)
-                    st.success("Loaded CSV file with headers in row 2 and skipped row 1")
-                except Exception as e1:
-                    st.warning(f"Row 2 header load failed: {str(e1)}")
-                    uploaded_file.seek(0)  # Reset file pointer
-                    try:
-                        # Second attempt: Try with standard headers
-                        df = pd.read_csv(uploaded_file)
-                        st.success("Loaded CSV file with standard headers")
-                    except Exception as e2:
-                        st.warning(f"Standard header load failed: {str(e2)}")
-                        uploaded_file.seek(0)  # Reset file pointer
-                        try:
-                            # Third attempt: Try with no headers
-                            df = pd.read_csv(uploaded_file, header=None)
-                            # Generate default column names (Col0, Col1, etc.)
-                            st.warning("Loaded CSV with no headers, using auto-generated column names")
-                        except Exception as e3:
-                            # Try different separators
-                            uploaded_file.seek(0)
-                            for separator in [',', ';', '\t', '|']:
-                                try:
-                                    uploaded_file.seek(0)
-                                    df = pd.read_csv(uploaded_file, sep=separator)
-                                    st.success(f"Successfully loaded CSV with '{separator}' as separator")
-                                    break
-                                except Exception as sep_error:
-                                    pass
-                            else:
-                                # Last attempt: Try with the most flexible parsing
-                                uploaded_file.seek(0)
-                                df = pd.read_csv(uploaded_file, sep=None, engine='python')
-                                st.warning("Used automatic delimiter detection to load CSV")
+                ingest_started = phase_start()
+                df = read_catalog(uploaded_file, row2_header_first=True, notify=show_notice)
                 
                 # Show the detected columns
                 st.write("Detected columns:", df.columns.tolist())
                 
+                phase_end("ingest", ingest_started)
+                
                 # Show a preview of the data
                 st.write("Preview of loaded data:")
                 st.dataframe(df.head(3))
@@ -999,6 +712,9 @@ else:
                 if not session_exists and len(st.session_state.count_data) > 0:
                     # Ensure we save the current session if it has counts
                     st.session_state.count_sessions.append(current_session.copy())
+                
+                # Keep the finished session's totals for long-term trends
+                save_session_trends(current_session)
                     
                 # Create a new session
                 new_session = {
@@ -1012,6 +728,13 @@ else:
                 st.success(f"Started new count session: {new_session_name}")
                 st.rerun()
             
+            if st.button("💾 Save Session to Trend History", use_container_width=True, key="save_trends_btn"):
+                saved = save_session_trends(current_session)
+                if saved:
+                    st.success(f"Saved totals for {saved} products to the trend history.")
+                else:
+                    st.info("No counts in the current session yet.")
+            
             # Show existing sessions if we have any
             if st.session_state.count_sessions:
                 st.markdown("### Past Sessions")
@@ -1037,6 +760,98 @@ else:
                     </div>
                     """, unsafe_allow_html=True)
             
+            # What changed between two sessions, e.g. last week against this week
+            comparable_sessions = {session['id']: session for session in st.session_state.count_sessions}
+            comparable_sessions.setdefault(current_session['id'], current_session)
+            if len(comparable_sessions) > 1:
+                with st.expander("Compare Sessions", expanded=False):
+                    session_ids = sorted(
+                        comparable_sessions,
+                        key=lambda session_id: comparable_sessions[session_id].get('timestamp', datetime.now()),
+                        reverse=True
+                    )
+                    session_label = lambda session_id: comparable_sessions[session_id].get('name', session_id)
+                    compare_session_id = st.selectbox("Session", options=session_ids, index=0, format_func=session_label, key="diff_compare_session")
+                    baseline_session_id = st.selectbox("Compared with", options=session_ids, index=1, format_func=session_label, key="diff_baseline_session")
+                    
+                    if baseline_session_id == compare_session_id:
+                        st.info("Choose two different sessions.")
+                    else:
+                        session_diff = compare_count_sessions(baseline_session_id, compare_session_id)
+                        summary = diff_summary(session_diff)
+                        st.caption(" · ".join(f"{status}: {summary[status]}" for status in DIFF_STATUSES[:-1]))
+                        status_filter = st.multiselect("Show", options=DIFF_STATUSES[:-1], default=DIFF_STATUSES[:-1], key="diff_status_filter")
+                        st.dataframe(session_diff[session_diff['Status'].isin(status_filter)], use_container_width=True)
+                        st.download_button(
+                            "Download Differences",
+                            data=lambda session_diff=session_diff: session_diff.reset_index().rename(columns={'product_id': 'Product ID'}).to_csv(index=False),
+                            file_name=f"session_diff_{baseline_session_id}_{compare_session_id}.csv",
+                            mime="text/csv",
+                            key="diff_download_btn",
+                            use_container_width=True
+                        )
+            
+            # Split the uncounted items between several counters
+            with st.expander("Team Count", expanded=False):
+                st.text_input("Your name", key="counter_name", placeholder="e.g. Sam")
+                schedule = current_work_schedule()
+                if schedule is None:
+                    team_names = st.text_area("Counters (one per line)", key="team_counter_names")
+                    if st.button("Split Uncounted Items", key="team_split_btn", use_container_width=True):
+                        counter_names = [name.strip() for name in team_names.splitlines() if name.strip()]
+                        if counter_names:
+                            get_work_schedules()[st.session_state.catalog_hash] = WorkSchedule(
+                                st.session_state.stock_data, get_count_route(), counter_names, get_variance_engine().is_counted
+                            )
+                            st.rerun()
+                        else:
+                            st.warning("Enter at least one counter name.")
+                else:
+                    st.dataframe(schedule.summary(), use_container_width=True, hide_index=True)
+                    team_col1, team_col2 = st.columns(2)
+                    with team_col1:
+                        if st.button("Rebalance", key="team_rebalance_btn", use_container_width=True):
+                            moved = schedule.rebalance()
+                            st.info(f"Moved {moved} items to counters who had finished.")
+                    with team_col2:
+                        if st.button("Clear Plan", key="team_clear_btn", use_container_width=True):
+                            get_work_schedules().pop(st.session_state.catalog_hash, None)
+                            st.rerun()
+                    if st.session_state.counter_name in schedule:
+                        st.button("🧭 Start My Worklist", key="team_start_btn", on_click=start_count_route, use_container_width=True)
+                    else:
+                        st.caption("Enter your name as listed in the plan to get your worklist.")
+            
+            # Count the high-value items in full and a sample of the rest
+            with st.expander("Cycle Count", expanded=False):
+                cycle_basis = st.radio("Rank items by", options=["Stock value", "Velocity"], horizontal=True, key="cycle_basis")
+                st.slider("Variance tolerance (% of stock value)", min_value=0.5, max_value=10.0, value=2.0, step=0.5, key="cycle_tolerance")
+                if cycle_basis == "Velocity" and not len(get_trend_store()):
+                    st.caption("No saved sessions yet - ranking by stock value.")
+                
+                cycle_plan = get_cycle_plan()
+                st.dataframe(
+                    cycle_plan.summary(),
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        'Coverage': st.column_config.ProgressColumn("Coverage", min_value=0.0, max_value=1.0, format="percent"),
+                    }
+                )
+                st.caption(f"Counting {len(cycle_plan):,} of {len(cycle_plan.classes):,} items - {cycle_plan.effort_saving:.0%} less than a full count")
+                
+                # Scale the sampled classes up to an estimate for the whole catalog
+                variance_engine = get_variance_engine()
+                if (variance_engine.is_counted & cycle_plan.selected).any():
+                    unit_value = variance_engine.unit_values if variance_engine.unit_values is not None else 1.0
+                    estimate, margin = cycle_plan.estimate_total_variance(variance_engine.variance * unit_value, variance_engine.is_counted)
+                    if np.isfinite(margin):
+                        st.caption(f"Estimated total variance: {estimate:+,.1f} ± {margin:,.1f}")
+                    else:
+                        st.caption("Count at least two items in each class for a variance estimate.")
+                
+                st.button("🧭 Start Cycle Count", key="cycle_start_btn", on_click=start_count_route, args=("cycle",), use_container_width=True)
+            
             # Add a separator before the export section
             st.markdown("<hr style='margin: 20px 0;'>", unsafe_allow_html=True)
         
@@ -1045,32 +860,8 @@ else:
             st.subheader("Export & Share")
             
             # Quick export button with purple gradient styling
-            if st.button("📊 Export Inventory Report", use_container_width=True):
-                export_data = prepare_export_data()
-                if export_data is not None:
-                    st.success("Report generated successfully!")
-                    if isinstance(export_data, str):
-                        # Already CSV content
-                        csv_content = export_data
-                    else:
-                        # DataFrame
-                        csv_content = export_data.to_csv(index=False)
-                    # Base64 encode for download
-                    b64 = base64.b64encode(csv_content.encode()).decode()
-                    # Create download link with purple gradient style
-                    href = f'''
-                    <a href="data:file/csv;base64,{b64}" download="stock_count_report.csv" 
-                       style="display: block; width: 100%; text-align: center; 
-                              background: linear-gradient(135deg, #6a28e8 0%, #9161fd 100%); 
-                              color: white; 
-                              padding: 12px 20px; border-radius: 25px;
-                              font-weight: bold; text-decoration: none;
-                              box-shadow: 0 4px 8px rgba(106, 40, 232, 0.3);
-                              transition: all 0.3s ease;">
-                        📥 Export Stock Data
-                    </a>
-                    '''
-                    st.markdown(href, unsafe_allow_html=True)
+            if export_download_button("📊 Export Inventory Report", "stock_count_report.csv", key="sidebar_export_btn"):
+                st.success("Report generated successfully!")
             
             # Add a small expander for advanced export options (hidden by default)
             with st.expander("Advanced Export Options", expanded=False):
@@ -1087,36 +878,69 @@ else:
                     "Compliance Report": "compliance"
                 }
                 
-                if st.button("Generate Custom Report"):
-                    export_data = prepare_export_data(report_type=report_type_map[report_type])
-                    
-                    if export_data is not None:
-                        filename = f"{report_type.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.csv"
-                        st.success(f"{report_type} generated!")
-                        
-                        if isinstance(export_data, str):
-                            # Already CSV content
-                            csv_content = export_data
-                        else:
-                            # DataFrame
-                            csv_content = export_data.to_csv(index=False)
-                            
-                        # Base64 encode for download
-                        b64 = base64.b64encode(csv_content.encode()).decode()
-                        # Create download link with purple gradient style
-                        href = f'''
-                        <a href="data:file/csv;base64,{b64}" download="{filename}" 
-                           style="display: block; width: 100%; text-align: center; 
-                                  background: linear-gradient(135deg, #6a28e8 0%, #9161fd 100%); 
-                                  color: white; 
-                                  padding: 12px 20px; border-radius: 25px;
-                                  font-weight: bold; text-decoration: none;
-                                  box-shadow: 0 4px 8px rgba(106, 40, 232, 0.3);
-                                  transition: all 0.3s ease;">
-                            📥 Download {filename}
-                        </a>
-                        '''
-                        st.markdown(href, unsafe_allow_html=True)
+                filename = f"{report_type.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.csv"
+                if export_download_button("Generate Custom Report", filename, report_type=report_type_map[report_type], key="custom_report_btn"):
+                    st.success(f"{report_type} generated!")
+                
+                # Very large catalogs: build on the background pool and keep counting meanwhile
+                if st.button("⏳ Build in Background", key="background_report_btn", use_container_width=True):
+                    submit_background_export(report_type, filename, report_type=report_type_map[report_type])
+            
+                # Several reports in one compressed download for head office
+                st.markdown("**Report Bundle**")
+                bundle_reports = st.multiselect(
+                    "Reports to include",
+                    options=list(report_type_map.keys()),
+                    default=["Standard Report", "Detailed Count Log", "Location Summary"],
+                    key="bundle_reports"
+                )
+                bundle_format = st.radio("Archive format", options=["zip", "tar.gz"], horizontal=True, key="bundle_format")
+                
+                bundle_builder = prepare_bundle_export([report_type_map[name] for name in bundle_reports], bundle_format) if bundle_reports else None
+                if bundle_builder is not None:
+                    if st.download_button(
+                        "🗜️ Download Report Bundle",
+                        data=bundle_builder,
+                        file_name=f"stock_count_reports_{datetime.now().strftime('%Y%m%d')}.{bundle_format}",
+                        mime=BUNDLE_MIME_TYPES[bundle_format],
+                        key="bundle_download_btn",
+                        use_container_width=True
+                    ):
+                        st.success("Report bundle generated!")
+            
+                # Incremental update for the stock system: only products counted since the last export
+                st.markdown("**Changes Since Last Export**")
+                watermark = st.session_state.export_watermark
+                since_version = watermark.since(st.session_state.catalog_hash)
+                new_entries = len(st.session_state.count_ledger) - st.session_state.count_ledger.first_row_after(since_version)
+                if watermark.exported_at is not None and since_version:
+                    st.caption(f"{new_entries} count entries since the export at {datetime.fromtimestamp(watermark.exported_at).strftime('%H:%M')}")
+                else:
+                    st.caption(f"No export yet - the delta will include all {new_entries} count entries")
+                
+                delta_format = st.radio(
+                    "Delta format",
+                    options=["Original layout", "Compact patch"],
+                    horizontal=True,
+                    key="delta_format"
+                )
+                delta_builder = prepare_delta_export("patch" if delta_format == "Compact patch" else "original")
+                if delta_builder is not None:
+                    if st.download_button(
+                        "🔁 Download Changes",
+                        data=delta_builder,
+                        file_name=f"stock_count_delta_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+                        mime="text/csv",
+                        key="delta_download_btn",
+                        use_container_width=True
+                    ):
+                        st.success("Delta export generated!")
+                if st.button("Reset to full export", key="reset_watermark_btn"):
+                    watermark.reset()
+                    st.rerun()
+            
+            # Progress and downloads for background exports
+            export_jobs_panel()
     
     # Only show the logo without title
     col_header_right = st.columns([1])[0]
@@ -1318,58 +1142,7 @@ else:
         
         # Create a search box that exactly matches the screenshot with purple border
         # Custom CSS for search box with explicit iOS styling
-        st.markdown("""
-        <style>
-        /* Hide default input container styles */
-        .stTextInput > div > div[data-testid="stFormSubmitButton"] { 
-            display: none !important; 
-        }
-        
-        /* Hide default input border & background */
-        div[data-baseweb="base-input"] {
-            border: none !important;
-            background: transparent !important;
-        }
-        
-        /* Style the input field exactly like iOS */
-        div[data-baseweb="input"] {
-            border-radius: 20px !important;
-            border: 1px solid rgba(159, 121, 242, 0.3) !important;
-            padding: 0 !important; 
-            overflow: hidden !important;
-            background: white !important;
-        }
-        
-        /* Input element styling */
-        .stTextInput input {
-            border: none !important;
-            padding: 10px 10px 10px 40px !important;
-            background-color: transparent !important;
-            font-size: 15px !important;
-            color: #333 !important;
-        }
-        
-        /* Input placeholder */
-        .stTextInput input::placeholder {
-            color: #999 !important;
-            font-size: 15px !important;
-        }
-        
-        /* Magnifying glass icon */
-        .stTextInput {
-            position: relative !important;
-        }
-        .stTextInput::before {
-            content: "🔍";
-            position: absolute;
-            left: 15px;
-            top: 11px;
-            font-size: 15px;
-            z-index: 10;
-            color: #777;
-        }
-        </style>
-        """, unsafe_allow_html=True)
+        st.markdown(SEARCH_BOX_CSS, unsafe_allow_html=True)
         
         # Use the standard search input
         search_term = st.text_input(
@@ -1383,6 +1156,27 @@ else:
         # Update session state with current search
         st.session_state.current_search = search_term
         
+        # Route worklist bar: where the counter is on the walk and one tap to the next item
+        if st.session_state.route_mode:
+            count_route = get_count_route()
+            route_cursor = st.session_state.route_cursor
+            schedule = current_work_schedule()
+            if schedule is not None and st.session_state.counter_name in schedule:
+                items_left = len(schedule.pending(st.session_state.counter_name))
+            else:
+                items_left = count_route.remaining(get_variance_engine().is_counted, route_worklist())
+            st.markdown(f"""
+            <div style="background-color: #f8f9fa; padding: 10px 15px; border-radius: 10px; margin: 10px 0; border-left: 4px solid {THEME_PRIMARY};">
+                <p style="margin: 0; font-size: 14px; font-weight: 500;">🧭 Stop {route_cursor + 1} of {len(count_route)} · 📍 {count_route.locations[route_cursor]}</p>
+                <p style="margin: 0; font-size: 12px; color: #666;">{items_left} items left to count</p>
+            </div>
+            """, unsafe_allow_html=True)
+            route_col1, route_col2 = st.columns([3, 1])
+            with route_col1:
+                st.button("➡️ Next Item on Route", key="route_next_btn", on_click=advance_count_route, use_container_width=True)
+            with route_col2:
+                st.button("End Route", key="route_stop_btn", on_click=stop_count_route, use_container_width=True)
+        
         # Display recent searches if we have any and no current search
         if 'recent_searches' in st.session_state and not search_term:
             # Create a container for recent searches with styled tags
@@ -1458,150 +1252,9 @@ else:
             # Create a lowercase version of search term
             search_lower = search_term.lower()
             
-            # Enhanced search function with improved matching algorithms
-            def search_all_columns(df, search_term):
-                """
-                Advanced search function that intelligently searches across all columns
-                with smart matching and prioritization
-                """
-                # Convert search term to lowercase for case-insensitive search
-                search_term = search_term.lower().strip()
-                
-                # Create a mask of all False initially
-                mask = pd.Series([False] * len(df))
-                
-                # Dictionary to store matches with scores for better ranking
-                # Higher score = better match (exact match > starts with > contains)
-                match_scores = {}
-                
-                # Debug info
-                column_list = df.columns.tolist()
-                print(f"DEBUG: Available columns for search: {column_list}")
-                
-                # Break search term into words for multi-word searching
-                search_words = search_term.split()
-                
-                # FIRST PRIORITY: Product ID (exact match)
-                if 'product_id' in df.columns:
-                    # Try to match product ID (including partial matches)
-                    prod_ids = df['product_id'].fillna('').astype(str).str.lower()
-                    for idx, value in prod_ids.items():
-                        # Exact product ID match gets highest priority
-                        if search_term == value:
-                            match_scores[idx] = 100
-                            mask.iloc[idx] = True
-                            print(f"DEBUG: Found exact product ID match: {value}")
-                        # Partial product ID match (starts with)
-                        elif value.startswith(search_term):
-                            match_scores[idx] = 90
-                            mask.iloc[idx] = True
-                            print(f"DEBUG: Found product ID starts with match: {value}")
-                        # Partial product ID match (contains)
-                        elif search_term in value:
-                            match_scores[idx] = 80
-                            mask.iloc[idx] = True
-                            print(f"DEBUG: Found product ID contains match: {value}")
-                
-                # SECOND PRIORITY: Unnamed columns (main product information)
-                unnamed_columns = [col for col in df.columns if 'Unnamed:' in col]
-                for col in unnamed_columns:
-                    if col in df.columns:
-                        col_values = df[col].fillna('').astype(str).str.lower()
-                        print(f"DEBUG: Searching in unnamed column '{col}'")
-                        for idx, value in col_values.items():
-                            if value.strip() == "":
-                                continue
-                                
-                            # Check for exact match
-                            if search_term == value.strip():
-                                match_scores[idx] = match_scores.get(idx, 0) + 70
-                                mask.iloc[idx] = True
-                                print(f"DEBUG: Found exact match in {col}: '{value}'")
-                            # Check for starts with
-                            elif value.strip().startswith(search_term):
-                                match_scores[idx] = match_scores.get(idx, 0) + 60
-                                mask.iloc[idx] = True
-                                print(f"DEBUG: Found starts with match in {col}: '{value}'")
-                            # Check for contains
-                            elif search_term in value.strip():
-                                match_scores[idx] = match_scores.get(idx, 0) + 50
-                                mask.iloc[idx] = True
-                                print(f"DEBUG: Found contains match in {col}: '{value}'")
-                            # Check for multi-word match (all words present)
-                            elif len(search_words) > 1 and all(word in value for word in search_words):
-                                match_scores[idx] = match_scores.get(idx, 0) + 45
-                                mask.iloc[idx] = True
-                                print(f"DEBUG: Found multi-word match in {col}: '{value}'")
-                            # Check if any word matches (partial match)
-                            elif any(word in value for word in search_words):
-                                match_scores[idx] = match_scores.get(idx, 0) + 40
-                                mask.iloc[idx] = True
-                                print(f"DEBUG: Found partial word match in {col}: '{value}'")
-                
-                # THIRD PRIORITY: Product name/Brand and name combinations
-                # Check 'Brand & Description' field
-                if 'Brand & Description' in df.columns:
-                    col_values = df['Brand & Description'].fillna('').astype(str).str.lower()
-                    print(f"DEBUG: Searching in 'Brand & Description'")
-                    for idx, value in col_values.items():
-                        if search_term == value.strip():
-                            match_scores[idx] = match_scores.get(idx, 0) + 35
-                            mask.iloc[idx] = True
-                        elif value.strip().startswith(search_term):
-                            match_scores[idx] = match_scores.get(idx, 0) + 30
-                            mask.iloc[idx] = True
-                        elif search_term in value.strip():
-                            match_scores[idx] = match_scores.get(idx, 0) + 25
-                            mask.iloc[idx] = True
-                        elif len(search_words) > 1 and all(word in value for word in search_words):
-                            match_scores[idx] = match_scores.get(idx, 0) + 20
-                            mask.iloc[idx] = True
-                
-                # FOURTH PRIORITY: Individual fields
-                priority_fields = ['brand', 'description', 'product_name']
-                for col in priority_fields:
-                    if col in df.columns:
-                        col_values = df[col].fillna('').astype(str).str.lower()
-                        print(f"DEBUG: Searching in '{col}'")
-                        for idx, value in col_values.items():
-                            if search_term == value.strip():
-                                match_scores[idx] = match_scores.get(idx, 0) + 15
-                                mask.iloc[idx] = True
-                            elif value.strip().startswith(search_term):
-                                match_scores[idx] = match_scores.get(idx, 0) + 10
-                                mask.iloc[idx] = True
-                            elif search_term in value.strip():
-                                match_scores[idx] = match_scores.get(idx, 0) + 5
-                                mask.iloc[idx] = True
-                
-                # Add column for sorting by match score
-                if mask.sum() > 0:
-                    df_temp = df[mask].copy()
-                    df_temp['match_score'] = pd.Series(match_scores)
-                
-                print(f"DEBUG: Found {mask.sum()} matches in total")
-                return mask, match_scores
-            
             # Perform the search with improved matching algorithm
-            mask, match_scores = search_all_columns(st.session_state.stock_data, search_lower)
-            
-            # Debug info (commented out for production)
-            # st.write(f"DEBUG: Found {mask.sum()} matches for '{search_term}' out of {len(st.session_state.stock_data)} items")
-            
-            # Filter data using the mask
-            st.session_state.filtered_data = st.session_state.stock_data[mask].copy()
-            
-            # Apply match scores for better ordering
-            if not st.session_state.filtered_data.empty:
-                # Create a match_score column based on the scores
-                st.session_state.filtered_data['match_score'] = st.session_state.filtered_data.index.map(
-                    lambda idx: match_scores.get(idx, 0)
-                )
-                
-                # Sort by match score (descending - highest scores first)
-                st.session_state.filtered_data = st.session_state.filtered_data.sort_values(
-                    'match_score', ascending=False
-                ).drop(columns=['match_score'])
+            with span("search_all_columns"):
+                st.session_state.filtered_data = filter_catalog(st.session_state.stock_data, search_lower)
             
             # Store this search term in recent searches if it's not already there (regardless of results)
             if search_term and search_term not in st.session_state.recent_searches:
@@ -1656,108 +1309,7 @@ else:
             if not st.session_state.filtered_data.empty:
                 
                 # Add custom CSS for animated search results
-                st.markdown("""
-                <style>
-                /* Animated hover styles for search result expanders */
-                section[data-testid="stExpander"] {
-                    background-color: white;
-                    border-radius: 8px !important;
-                    border: 1px solid rgba(0,0,0,0.05) !important;
-                    margin-bottom: 12px;
-                    transition: all 0.3s cubic-bezier(0.25, 0.8, 0.25, 1) !important;
-                    box-shadow: 0 1px 3px rgba(0,0,0,0.05) !important;
-                    overflow: hidden !important;
-                    position: relative !important;
-                }
-
-                /* Hover effect with scaling, shadow and color change */
-                section[data-testid="stExpander"]:hover {
-                    transform: translateY(-2px) scale(1.01);
-                    border-color: rgba(106, 40, 232, 0.15) !important;
-                    box-shadow: 0 4px 15px rgba(106, 40, 232, 0.1) !important;
-                }
-                
-                /* Add animated purple highlight bar on the left side on hover */
-                section[data-testid="stExpander"]::before {
-                    content: "";
-                    position: absolute;
-                    top: 0;
-                    left: 0;
-                    width: 4px;
-                    height: 100%;
-                    background: linear-gradient(135deg, #6a28e8 0%, #9161fd 100%);
-                    opacity: 0;
-                    transition: opacity 0.3s ease, width 0.2s ease;
-                    z-index: 10;
-                }
-                
-                section[data-testid="stExpander"]:hover::before {
-                    opacity: 1;
-                }
-                
-                /* Button glow effect on hover */
-                section[data-testid="stExpander"] > div:first-child {
-                    position: relative;
-                    border: none !important;
-                    background-color: transparent !important;
-                    padding: 16px !important;
-                    transition: background-color 0.3s ease !important;
-                }
-                
-                section[data-testid="stExpander"]:hover > div:first-child {
-                    background-color: rgba(248, 245, 255, 0.5) !important;
-                }
-                
-                /* Fix expander title text */
-                section[data-testid="stExpander"] > div:first-child p {
-                    color: #333 !important;
-                    font-weight: 500 !important;
-                    font-size: 15px !important;
-                    transition: color 0.3s ease, transform 0.2s ease !important;
-                }
-                
-                section[data-testid="stExpander"]:hover > div:first-child p {
-                    color: rgba(106, 40, 232, 0.9) !important;
-                    transform: translateX(4px);
-                }
-                
-                /* Content animation */
-                section[data-testid="stExpander"] > div:nth-child(2) {
-                    animation: fadeIn 0.4s ease-in-out;
-                    background-color: rgba(250, 248, 255, 0.5) !important;
-                    border-top: 1px solid rgba(106, 40, 232, 0.05) !important;
-                    padding: 16px !important;
-                }
-                
-                /* Animation for fade in */
-                @keyframes fadeIn {
-                    from { opacity: 0; transform: translateY(-8px); }
-                    to { opacity: 1; transform: translateY(0); }
-                }
-                
-                /* Pulsing effect on expander arrow */
-                section[data-testid="stExpander"] button {
-                    color: #6a28e8 !important;
-                    transition: transform 0.3s cubic-bezier(0.34, 1.56, 0.64, 1) !important;
-                }
-                
-                section[data-testid="stExpander"]:hover button {
-                    transform: rotate(90deg) scale(1.2);
-                }
-                
-                /* Enhanced styling when expanded */
-                section[data-testid="stExpander"]:has(div[data-testid="stExpander-content"]) {
-                    box-shadow: 0 6px 20px rgba(106, 40, 232, 0.15) !important;
-                    border-color: rgba(106, 40, 232, 0.2) !important;
-                }
-                
-                /* Purple highlight bar on the left side when expanded */
-                section[data-testid="stExpander"]:has(div[data-testid="stExpander-content"])::before {
-                    opacity: 1;
-                    width: 6px;
-                }
-                </style>
-                """, unsafe_allow_html=True)
+                st.markdown(SEARCH_RESULTS_CSS, unsafe_allow_html=True)
                 
                 # Display the search results count with an attractive badge
                 st.markdown(f"""
@@ -1778,6 +1330,7 @@ else:
                 """, unsafe_allow_html=True)
                 
                 # For each product in the filtered data, create an expander
+                render_started = phase_start()
                 for idx, row in st.session_state.filtered_data.iterrows():
                     product_id = row['product_id']
                     
@@ -1826,133 +1379,7 @@ else:
                     # Create the expander with the product name
                     with st.expander(expander_title):
                         # Add enhanced iOS-style CSS for the count screen
-                        st.markdown("""
-                        <style>
-                        .product-info-card {
-                            background-color: white;
-                            border-radius: 12px;
-                            padding: 20px;
-                            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-                            margin-bottom: 20px;
-                            transition: all 0.3s ease;
-                        }
-                        .product-info-card:hover {
-                            box-shadow: 0 4px 15px rgba(0,0,0,0.08);
-                        }
-                        .count-form-card {
-                            background-color: white;
-                            border-radius: 12px;
-                            padding: 20px;
-                            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-                            margin-bottom: 20px;
-                            transition: all 0.3s ease;
-                        }
-                        .count-form-card:hover {
-                            box-shadow: 0 4px 15px rgba(0,0,0,0.08);
-                        }
-                        
-                        /* Styles for multiple metrics */
-                        .summary-metrics {
-                            display: flex;
-                            justify-content: space-between;
-                            background-color: white;
-                            border-radius: 12px;
-                            padding: 16px 24px;
-                            margin: 20px 0;
-                            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-                        }
-                        .metric-item {
-                            text-align: center;
-                            padding: 8px;
-                            flex: 1;
-                            border-right: 1px solid #f0f0f0;
-                        }
-                        .metric-item:last-child {
-                            border-right: none;
-                        }
-                        
-                        /* Styles for single metric (when hiding expected and variance) */
-                        .summary-metrics-single {
-                            background-color: white;
-                            border-radius: 12px;
-                            padding: 16px 24px;
-                            margin: 20px 0;
-                            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-                            text-align: center;
-                        }
-                        .metric-item-single {
-                            padding: 12px;
-                        }
-                        
-                        /* Shared metric styles */
-                        .metric-value {
-                            font-size: 28px;
-                            font-weight: 600;
-                            color: #007AFF;
-                            margin-bottom: 5px;
-                        }
-                        .metric-label {
-                            font-size: 13px;
-                            font-weight: 500;
-                            color: #666;
-                            text-transform: uppercase;
-                            letter-spacing: 0.5px;
-                        }
-                        .variance-positive {
-                            color: #34C759;
-                        }
-                        .variance-negative {
-                            color: #FF3B30;
-                        }
-                        .count-table {
-                            margin-top: 15px;
-                            margin-bottom: 15px;
-                            background-color: white;
-                            border-radius: 12px;
-                            padding: 5px;
-                            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-                        }
-                        
-                        /* Input field styling for iOS look */
-                        div[data-testid="stNumberInput"] label, div[data-testid="stSelectbox"] label {
-                            font-weight: 500;
-                            color: #444;
-                            font-size: 14px;
-                        }
-                        div[data-testid="stNumberInput"] input, div[data-testid="stSelectbox"] > div > div {
-                            border-radius: 8px !important;
-                            border: 1px solid #e0e0e0 !important;
-                            padding: 8px 12px !important;
-                        }
-                        div[data-testid="stNumberInput"] input:focus, div[data-testid="stSelectbox"] > div > div:focus {
-                            border-color: #007AFF !important;
-                            box-shadow: 0 0 0 1px #007AFF !important;
-                        }
-                        
-                        /* Custom expander styling for inside product details - not search results */
-                        .inner-expander section[data-testid="stExpander"] {
-                            border-radius: 12px;
-                            border: none !important;
-                            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-                            margin-bottom: 20px;
-                        }
-                        .inner-expander section[data-testid="stExpander"] > div:first-child {
-                            border-radius: 12px 12px 0 0 !important;
-                            border: none !important;
-                            padding: 1rem !important;
-                            background-color: #f8f9fa !important;
-                        }
-                        .inner-expander section[data-testid="stExpander"] > div:first-child p {
-                            font-weight: 600 !important;
-                            color: #333 !important;
-                        }
-                        .inner-expander section[data-testid="stExpander"] > div:nth-child(2) {
-                            border: none !important;
-                            border-top: 1px solid #f0f0f0 !important;
-                            border-radius: 0 0 12px 12px !important;
-                        }
-                        </style>
-                        """, unsafe_allow_html=True)
+                        st.markdown(COUNT_SCREEN_CSS, unsafe_allow_html=True)
                         
                         col1, col2 = st.columns([1, 1])
                         
@@ -2037,101 +1464,13 @@ else:
                         # Count entry form - with card-like styling
                         with col2:
                             # Add custom CSS for number input styling
-                            st.markdown(f"""
-                            <style>
-                            /* iOS-style number input styling */
-                            div[data-testid="stNumberInput"] > div > div > div > input {{
-                                border-radius: 10px !important;
-                                border: 1px solid rgba({THEME_PRIMARY.replace('#', '')}, 0.2) !important;
-                                padding: 10px 8px !important;
-                                box-shadow: 0 2px 5px rgba({THEME_PRIMARY.replace('#', '')}, 0.05) !important;
-                                font-size: 16px !important;
-                                transition: all 0.2s ease;
-                            }}
-                            
-                            div[data-testid="stNumberInput"] > div > div > div > input:focus {{
-                                border: 1px solid {THEME_PRIMARY} !important;
-                                box-shadow: 0 0 0 2px rgba({THEME_PRIMARY.replace('#', '')}, 0.1) !important;
-                            }}
-                            
-                            /* Create nice count entry card with gradient border */
-                            .count-form-card {{
-                                border-radius: 16px;
-                                padding: 20px;
-                                margin-bottom: 20px;
-                                box-shadow: 0 4px 12px rgba({THEME_PRIMARY.replace('#', '')}, 0.08);
-                                background: white;
-                                border: 1px solid rgba({THEME_PRIMARY.replace('#', '')}, 0.15);
-                                background: linear-gradient(to bottom, white, rgba({THEME_PRIMARY.replace('#', '')}, 0.02));
-                            }}
-                            </style>
-                            """, unsafe_allow_html=True)
+                            st.markdown(NUMBER_INPUT_CSS, unsafe_allow_html=True)
                             
                             st.markdown('<div class="count-form-card">', unsafe_allow_html=True)
                             st.markdown(f"<h3 style='margin-top:0; color:{THEME_PRIMARY}; font-size:20px; font-weight:600;'>Add Count Entry</h3>", unsafe_allow_html=True)
                             
                             # Custom CSS for bigger number input
-                            st.markdown(f"""
-                            <style>
-                            /* Make number input field larger and more prominent */
-                            div[data-testid="stNumberInput"] {{
-                                margin-bottom: 25px;
-                            }}
-                            
-                            div[data-testid="stNumberInput"] > div > div > input {{
-                                border-radius: 12px !important;
-                                border: 2px solid {THEME_PRIMARY} !important;
-                                padding: 15px 20px !important;
-                                box-shadow: 0 3px 10px rgba(0,0,0,0.08) !important;
-                                font-size: 24px !important;
-                                font-weight: 500 !important;
-                                background-color: white !important;
-                                height: 60px !important;
-                                transition: all 0.2s ease !important;
-                            }}
-                            
-                            div[data-testid="stNumberInput"] > div > div > input:focus {{
-                                border: 2px solid {THEME_PRIMARY} !important;
-                                box-shadow: 0 3px 12px rgba({THEME_PRIMARY.replace('#', '')}, 0.3) !important;
-                            }}
-                            
-                            /* Simple fix for +/- buttons */
-                            div[data-testid="stNumberInput"] button {{
-                                width: 36px !important;
-                                height: 36px !important;
-                                border-radius: 10px !important;
-                                background: linear-gradient(135deg, {THEME_PRIMARY} 0%, #9161fd 100%) !important;
-                                color: white !important;
-                                box-shadow: 0 2px 6px rgba({THEME_PRIMARY.replace('#', '')}, 0.3) !important;
-                                padding: 0 !important;
-                                display: flex !important;
-                                align-items: center !important;
-                                justify-content: center !important;
-                                margin: 4px 0 !important;
-                                border: none !important;
-                                position: relative !important;
-                                bottom: 2px !important;
-                            }}
-                            
-                            /* Hover effect */
-                            div[data-testid="stNumberInput"] button:hover {{
-                                filter: brightness(1.05) !important;
-                                box-shadow: 0 3px 8px rgba({THEME_PRIMARY.replace('#', '')}, 0.4) !important;
-                            }}
-                            
-                            /* Make +/- icons more visible */
-                            div[data-testid="stNumberInput"] button svg {{
-                                width: 18px !important;
-                                height: 18px !important;
-                                fill: white !important;
-                            }}
-                            
-                            /* Help tooltip styling */
-                            div[data-testid="stNumberInput"] .stTooltipIcon {{
-                                color: {THEME_PRIMARY} !important;
-                            }}
-                            </style>
-                            """, unsafe_allow_html=True)
+                            st.markdown(COUNT_INPUT_CSS, unsafe_allow_html=True)
                             
                             # Add extra space for buttons
                             st.markdown('<div style="height: 10px;"></div>', unsafe_allow_html=True)
@@ -2152,112 +1491,54 @@ else:
                             # Location selection using buttons
                             st.markdown("<p style='margin-bottom:8px; font-weight:500; color:#444; font-size:14px;'>Location</p>", unsafe_allow_html=True)
                             
-                            # Define location options
-                            location_options = ["Bar 1", "Bar 2", "Store Room 1", "Store Room 2", "Cellar"]
+                            # Countable locations from the location registry
+                            location_registry = get_location_registry()
+                            location_options = location_registry.leaf_labels
                             
-                            # Try to set default based on product location if it matches one of our options
-                            product_location = row['location']
-                            default_location = location_options[0]  # Default to first option
-                            for option in location_options:
-                                if option.lower() == product_location.lower():
-                                    default_location = option
-                                    break
+                            # Default to the product's catalog location when the registry knows it
+                            default_location = location_registry.leaf_for(row['location'], location_options[0])
                             
-                            # Create session state for storing selected location if it doesn't exist
-                            if f"selected_loc_{product_id}" not in st.session_state:
-                                st.session_state[f"selected_loc_{product_id}"] = default_location
+                            # Location picked for this product, remembered in the bounded per-product UI state
+                            product_ui_state = st.session_state.product_ui_state
+                            selected_location = product_ui_state.get(product_id, 'location')
+                            if selected_location not in location_options:
+                                selected_location = default_location
+                                product_ui_state.set(product_id, 'location', selected_location)
                             
                             # Add custom CSS for iOS-style location buttons
-                            st.markdown("""
-                            <style>
-                            /* iOS-style location buttons */
-                            .location-buttons div[data-testid="stHorizontalBlock"] {
-                                gap: 8px;
-                                margin-bottom: 8px;
-                            }
-                            
-                            /* All location buttons base style */
-                            .location-buttons div[data-testid="stButton"] button {
-                                border-radius: 10px;
-                                font-size: 13px;
-                                font-weight: 500;
-                                padding: 8px 0;
-                                width: 100%;
-                                transition: all 0.2s;
-                                box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-                                border: 1px solid #e4e4e4;
-                                background-color: #f5f5f7;
-                                color: #333;
-                            }
-                            
-                            /* Hover effect for all buttons */
-                            .location-buttons div[data-testid="stButton"] button:hover {
-                                transform: translateY(-1px);
-                                box-shadow: 0 3px 8px rgba(0,0,0,0.1);
-                                filter: brightness(1.05);
-                            }
-                            
-                            /* Selected location highlight with purple theme */
-                            .location-selected {
-                                font-size: 14px;
-                                color: {THEME_PRIMARY};
-                                margin: 12px 0 15px 0;
-                                text-align: center;
-                                padding: 10px;
-                                border-radius: 10px;
-                                background-color: rgba({THEME_PRIMARY.replace('#', '')}, 0.08);
-                                border: 1px solid rgba({THEME_PRIMARY.replace('#', '')}, 0.2);
-                                font-weight: 500;
-                            }
-                            </style>
-                            """, unsafe_allow_html=True)
+                            st.markdown(LOCATION_BUTTON_CSS, unsafe_allow_html=True)
                             
                             # Create a div to contain all location buttons for styling
                             st.markdown('<div class="location-buttons">', unsafe_allow_html=True)
                             
-                            # Create layout for location buttons
-                            col1, col2 = st.columns(2)
-                            
-                            # First row of buttons
-                            with col1:
-                                if st.button("Bar 1", key=f"loc1_{product_id}", 
-                                            use_container_width=True,
-                                            help="Select Bar 1 as location"):
-                                    st.session_state[f"selected_loc_{product_id}"] = "Bar 1"
-                                    st.rerun()
-                            
-                            with col2:
-                                if st.button("Bar 2", key=f"loc2_{product_id}", 
-                                            use_container_width=True,
-                                            help="Select Bar 2 as location"):
-                                    st.session_state[f"selected_loc_{product_id}"] = "Bar 2"
-                                    st.rerun()
-                            
-                            # Second row of buttons
-                            col3, col4 = st.columns(2)
-                            with col3:
-                                if st.button("Store Room 1", key=f"loc3_{product_id}", 
-                                            use_container_width=True,
-                                            help="Select Store Room 1 as location"):
-                                    st.session_state[f"selected_loc_{product_id}"] = "Store Room 1"
-                                    st.rerun()
-                            
-                            with col4:
-                                if st.button("Store Room 2", key=f"loc4_{product_id}", 
-                                            use_container_width=True,
-                                            help="Select Store Room 2 as location"):
-                                    st.session_state[f"selected_loc_{product_id}"] = "Store Room 2"
-                                    st.rerun()
-                            
-                            # Third row with Cellar 
-                            if st.button("Cellar", key=f"loc5_{product_id}", 
-                                        use_container_width=True,
-                                        help="Select Cellar as location"):
-                                st.session_state[f"selected_loc_{product_id}"] = "Cellar"
-                                st.rerun()
+                            use_location_buttons = len(location_options) <= LOCATION_BUTTON_LIMIT
+                            if use_location_buttons:
+                                # Two buttons per row; an odd last location gets the full width
+                                for start in range(0, len(location_options), 2):
+                                    row_options = location_options[start:start + 2]
+                                    row_columns = st.columns(2) if len(row_options) == 2 else [st.container()]
+                                    for offset, (column, option) in enumerate(zip(row_columns, row_options)):
+                                        with column:
+                                            if st.button(option, key=f"loc{start + offset + 1}_{product_id}", 
+                                                        use_container_width=True,
+                                                        help=f"Select {option} as location"):
+                                                product_ui_state.set(product_id, 'location', option)
+                                                st.rerun()
+                            else:
+                                # Hundreds of bins: type to filter instead of scanning buttons
+                                picked_location = st.selectbox(
+                                    "Location",
+                                    options=location_options,
+                                    index=location_options.index(selected_location),
+                                    key=f"loc_select_{product_id}",
+                                    label_visibility="collapsed"
+                                )
+                                if picked_location != selected_location:
+                                    product_ui_state.set(product_id, 'location', picked_location)
+                                    selected_location = picked_location
                             
                             # Get the selected location
-                            count_location = st.session_state[f"selected_loc_{product_id}"]
+                            count_location = selected_location
                             
                             # Display the selected location with styling
                             st.markdown(f'<div class="location-selected"><strong>📍 {count_location}</strong></div>', unsafe_allow_html=True)
@@ -2277,44 +1558,14 @@ else:
                             """
                             
                             # Apply active styling to the selected location's button
-                            if count_location == "Bar 1":
-                                st.markdown(active_style.replace('button[kind="secondary"]', f'button[aria-label="Select Bar 1 as location"]'), unsafe_allow_html=True)
-                            elif count_location == "Bar 2":
-                                st.markdown(active_style.replace('button[kind="secondary"]', f'button[aria-label="Select Bar 2 as location"]'), unsafe_allow_html=True)
-                            elif count_location == "Store Room 1":
-                                st.markdown(active_style.replace('button[kind="secondary"]', f'button[aria-label="Select Store Room 1 as location"]'), unsafe_allow_html=True)
-                            elif count_location == "Store Room 2":
-                                st.markdown(active_style.replace('button[kind="secondary"]', f'button[aria-label="Select Store Room 2 as location"]'), unsafe_allow_html=True)
-                            elif count_location == "Cellar":
-                                st.markdown(active_style.replace('button[kind="secondary"]', f'button[aria-label="Select Cellar as location"]'), unsafe_allow_html=True)
+                            if use_location_buttons:
+                                st.markdown(active_style.replace('button[kind="secondary"]', f'button[aria-label="Select {count_location} as location"]'), unsafe_allow_html=True)
                             
                             # Close the location-buttons div
                             st.markdown('</div>', unsafe_allow_html=True)
                             
                             # Add custom CSS for a more prominent Add Count Entry button
-                            st.markdown(f"""
-                            <style>
-                            /* Style for the Add Count Entry button */
-                            div[data-testid="stButton"] button:has(div:contains("Add Count Entry")) {{
-                                background: {THEME_GRADIENT} !important;
-                                color: white !important;
-                                padding: 15px !important;
-                                font-size: 16px !important;
-                                font-weight: 600 !important;
-                                border-radius: 12px !important;
-                                border: none !important;
-                                box-shadow: 0 4px 12px rgba({THEME_PRIMARY.replace('#', '')}, 0.25) !important;
-                                margin-top: 5px !important;
-                                height: auto !important;
-                                transition: all 0.3s ease !important;
-                            }}
-                            
-                            div[data-testid="stButton"] button:has(div:contains("Add Count Entry")):hover {{
-                                transform: translateY(-2px) !important;
-                                box-shadow: 0 6px 15px rgba({THEME_PRIMARY.replace('#', '')}, 0.3) !important;
-                            }}
-                            </style>
-                            """, unsafe_allow_html=True)
+                            st.markdown(ADD_COUNT_BUTTON_CSS, unsafe_allow_html=True)
                             
                             # iOS-style add count button
                             add_count_button = st.button(
@@ -2346,48 +1597,7 @@ else:
                             variance_symbol = "+" if variance >= 0 else ""
                             
                             # Add metric styling
-                            st.markdown(f"""
-                            <style>
-                            .summary-metrics-single {{
-                                background: #f7f7f9;
-                                color: #333;
-                                border-radius: 12px;
-                                padding: 15px 20px;
-                                text-align: center;
-                                margin: 15px 0;
-                                box-shadow: 0 4px 12px rgba(0, 0, 0, 0.05);
-                                border: 1px solid #e9e9ec;
-                            }}
-                            .metric-item-single {{
-                                text-align: center;
-                            }}
-                            .metric-value {{
-                                font-size: 36px;
-                                font-weight: 700;
-                                margin-bottom: 5px;
-                                color: #333;
-                            }}
-                            .metric-label {{
-                                font-size: 14px;
-                                font-weight: 500;
-                                letter-spacing: 1px;
-                                color: #666;
-                            }}
-                            
-                            /* Count history table styling */
-                            .count-table {{
-                                border-radius: 12px;
-                                overflow: hidden;
-                                box-shadow: 0 4px 12px rgba({THEME_PRIMARY.replace('#', '')}, 0.08);
-                                margin-top: 15px;
-                                margin-bottom: 20px;
-                                border: 1px solid rgba({THEME_PRIMARY.replace('#', '')}, 0.1);
-                            }}
-                            div[data-testid="stDataFrame"] > div > div > div {{
-                                border-radius: 12px !important;
-                            }}
-                            </style>
-                            """, unsafe_allow_html=True)
+                            st.markdown(METRIC_CSS, unsafe_allow_html=True)
                             
                             # Only show total count, hiding expected count and variance as requested
                             metrics_html = f"""
@@ -2428,105 +1638,20 @@ else:
                             st.markdown('</div>', unsafe_allow_html=True)
                             
                             # Check if we have historical data for comparison
-                            if product_id in st.session_state.historical_counts and len(st.session_state.historical_counts[product_id]) > 1:
+                            session_history = st.session_state.session_history
+                            if session_history.entry_count(product_id) > 1:
                                 # Add section for historical comparison
                                 st.markdown("### 📊 Historical Count Comparison", unsafe_allow_html=True)
                                 
-                                st.markdown("""
-                                <style>
-                                .comparison-header {
-                                    font-size: 18px;
-                                    font-weight: 600;
-                                    color: #6a28e8;
-                                    margin: 15px 0 10px 0;
-                                    text-align: left;
-                                }
-                                .history-table {
-                                    margin-top: 5px;
-                                    margin-bottom: 15px;
-                                    background-color: white;
-                                    border-radius: 12px;
-                                    padding: 5px;
-                                    box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-                                }
-                                .history-metrics {
-                                    display: flex;
-                                    justify-content: space-between;
-                                    background-color: white;
-                                    border-radius: 12px;
-                                    padding: 15px;
-                                    margin: 10px 0;
-                                    box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-                                }
-                                .history-metric {
-                                    text-align: center;
-                                    flex: 1;
-                                }
-                                .history-metric-value {
-                                    font-size: 20px;
-                                    font-weight: 600;
-                                    color: #6a28e8;
-                                    margin-bottom: 5px;
-                                }
-                                .history-metric-label {
-                                    font-size: 12px;
-                                    color: #666;
-                                    text-transform: uppercase;
-                                }
-                                .trend-up {
-                                    color: #34C759;
-                                }
-                                .trend-down {
-                                    color: #FF3B30;
-                                }
-                                .trend-stable {
-                                    color: #007AFF;
-                                }
-                                </style>
-                                """, unsafe_allow_html=True)
-                                
-                                # Group data by session
-                                historical_data = st.session_state.historical_counts[product_id]
-                                session_groups = {}
-                                
-                                for entry in historical_data:
-                                    session_id = entry.get('session_id', 'unknown')
-                                    session_name = entry.get('session_name', f"Session {session_id}")
-                                    
-                                    if session_id not in session_groups:
-                                        session_groups[session_id] = {
-                                            'name': session_name,
-                                            'entries': [],
-                                            'timestamp': entry.get('timestamp', '')
-                                        }
-                                    
-                                    session_groups[session_id]['entries'].append(entry)
-                                
-                                # Calculate totals by session
-                                session_totals = {}
-                                for session_id, data in session_groups.items():
-                                    total = sum(entry['count'] for entry in data['entries'])
-                                    session_totals[session_id] = {
-                                        'name': data['name'],
-                                        'total': total,
-                                        'timestamp': data['timestamp'],
-                                        'count': len(data['entries'])
-                                    }
-                                
-                                # Get sessions ordered by timestamp
-                                sorted_sessions = sorted(
-                                    [(sid, data) for sid, data in session_totals.items()],
-                                    key=lambda x: x[1]['timestamp'],
-                                    reverse=True
-                                )
+                                st.markdown(HISTORY_COMPARISON_CSS, unsafe_allow_html=True)
                                 
                                 # Show comparison metrics if we have at least 2 sessions
-                                if len(sorted_sessions) >= 2:
-                                    current_session = sorted_sessions[0][1]
-                                    previous_session = sorted_sessions[1][1]
+                                latest_sessions = session_history.latest_two(product_id)
+                                if latest_sessions is not None:
+                                    current_session, previous_session = latest_sessions
                                     
-                                    current_total = current_session['total']
-                                    previous_total = previous_session['total']
+                                    current_total = current_session.total
+                                    previous_total = previous_session.total
                                     
                                     # Calculate change
                                     change = current_total - previous_total
@@ -2549,7 +1674,7 @@ else:
                                         trend_text = "Decrease"
                                     
                                     # Display comparison metrics
-                                    st.markdown(f'<div class="comparison-header">Comparison: {current_session["name"]} vs {previous_session["name"]}</div>', unsafe_allow_html=True)
+                                    st.markdown(f'<div class="comparison-header">Comparison: {current_session.name} vs {previous_session.name}</div>', unsafe_allow_html=True)
                                     
                                     metrics_html = f"""
                                     <div class="history-metrics">
@@ -2576,22 +1701,27 @@ else:
                                 # Show table of session data
                                 st.markdown('<div class="comparison-header">All Count Sessions</div>', unsafe_allow_html=True)
                                 
-                                # Create a DataFrame from session totals
-                                sessions_df = pd.DataFrame([
-                                    {
-                                        'Session': data['name'], 
-                                        'Total Count': data['total'],
-                                        'Count Entries': data['count'],
-                                        'Date/Time': data['timestamp']
-                                    } 
-                                    for _, data in sorted_sessions
-                                ])
+                                # Precomputed session totals for this product, newest first
+                                sessions_df = session_history.frame(product_id)
                                 
                                 # Display sessions table
                                 st.markdown('<div class="history-table">', unsafe_allow_html=True)
                                 st.dataframe(sessions_df, use_container_width=True)
                                 st.markdown('</div>', unsafe_allow_html=True)
                             
+                            # Long-term trend from saved sessions (persists across browser sessions)
+                            trend_series = get_trend_store().rolling_average(product_id)
+                            if len(trend_series) > 1:
+                                st.markdown('<div class="comparison-header">Long-term Trend</div>', unsafe_allow_html=True)
+                                st.line_chart(
+                                    trend_series.set_index('time')[['total', 'rolling_average']].rename(
+                                        columns={'total': 'Session Total', 'rolling_average': 'Rolling Average'}
+                                    )
+                                )
+                                usage_trend = get_trend_store().usage_trend(product_id)
+                                if usage_trend is not None:
+                                    st.caption(f"Trend: {usage_trend:+.1f} per 30 days across {len(trend_series)} saved sessions")
+                            
                             # Add "Count Complete" button with purple gradient styling
                             sc_closed = product_id in st.session_state.sc_closed and st.session_state.sc_closed[product_id]
                             
@@ -2625,18 +1755,7 @@ else:
                             col1, col2, col3 = st.columns([1.5, 2, 1.5])
                             with col2:
                                 # Custom button with centered style
-                                st.markdown(
-                                    f"""
-                                    <style>
-                                    div[data-testid="stButton"] {{
-                                        text-align: center;
-                                        display: flex;
-                                        justify-content: center;
-                                    }}
-                                    </style>
-                                    """,
-                                    unsafe_allow_html=True
-                                )
+                                st.markdown(CENTERED_BUTTON_CSS, unsafe_allow_html=True)
                                 complete_button = st.button(
                                     btn_label,
                                     key=f"complete_btn_{product_id}",
@@ -2650,14 +1769,14 @@ else:
                                 # Toggle the state
                                 if not sc_closed:
                                     # Mark as complete
-                                    st.session_state.sc_closed[product_id] = True
+                                    set_count_complete(product_id, True)
                                     st.success("Stock count marked as complete!")
                                     # Clear search to return to main page
                                     st.session_state.current_search = ""
                                     st.rerun()
                                 else:
                                     # Mark as incomplete
-                                    st.session_state.sc_closed[product_id] = False
+                                    set_count_complete(product_id, False)
                                     st.info("Stock count marked as incomplete.")
                                     st.rerun()
                         else:
@@ -2694,6 +1813,7 @@ else:
                                 <div class="ios-empty-message">Use the form above to add your first count for this product.</div>
                             </div>
                             """, unsafe_allow_html=True)
+                phase_end("render_results", render_started)
             else:
                 # Enhanced "No products found" message with iOS styling
                 st.markdown("""
@@ -2784,6 +1904,77 @@ else:
             </div>
             """, unsafe_allow_html=True)
             
+            # Count in walking order instead of searching item by item
+            st.button("🧭 Start Count Route", key="route_start_btn", on_click=start_count_route, use_container_width=True)
+            
+            # Catalog-wide variance overview with the biggest discrepancies
+            variance_engine = get_variance_engine()
+            variance_summary = variance_engine.summary()
+            if variance_summary['counted_products']:
+                st.markdown("<h3 style='text-align: center; margin-top: 30px;'>Variance Overview</h3>", unsafe_allow_html=True)
+                
+                metric_cols = st.columns(4)
+                metric_cols[0].metric("Items Counted", f"{variance_summary['counted_products']:,} / {variance_summary['products']:,}")
+                metric_cols[1].metric("Total Counted", f"{variance_summary['counted_total']:,.1f}")
+                metric_cols[2].metric("Net Variance", f"{variance_summary['net_variance']:+,.1f}")
+                metric_cols[3].metric("Absolute Variance", f"{variance_summary['abs_variance']:,.1f}")
+                
+                shortfall_tab, overage_tab = st.tabs(["Largest Shortfalls", "Largest Overages"])
+                with shortfall_tab:
+                    st.dataframe(variance_engine.top(10, 'shortfall'), use_container_width=True, hide_index=True)
+                with overage_tab:
+                    st.dataframe(variance_engine.top(10, 'overage'), use_container_width=True, hide_index=True)
+                
+                # Recount the biggest discrepancies first
+                st.markdown("<h4 style='text-align: center; margin-top: 20px;'>Recount Queue</h4>", unsafe_allow_html=True)
+                recount_queue = st.session_state.recount_queue
+                if variance_engine.unit_values is not None:
+                    by_value = st.checkbox("Weight by unit value", value=st.session_state.recount_by_value, key="recount_by_value_box")
+                    if by_value != st.session_state.recount_by_value:
+                        st.session_state.recount_by_value = by_value
+                        rebuild_recount_queue()
+                        recount_queue = st.session_state.recount_queue
+                
+                upcoming = recount_queue.peek_many(5)
+                if upcoming:
+                    position_of = variance_engine.product_index.get_indexer([product_id for product_id, _ in upcoming])
+                    st.dataframe(pd.DataFrame({
+                        'Product ID': [product_id for product_id, _ in upcoming],
+                        'Product': variance_engine.names[position_of],
+                        'Variance': variance_engine.variance[position_of],
+                        'Priority': [priority for _, priority in upcoming],
+                    }), use_container_width=True, hide_index=True)
+                    awaiting = len(recount_queue.outstanding)
+                    st.caption(f"{len(recount_queue)} products waiting for a recount" + (f" · {awaiting} handed out, not recounted yet" if awaiting else ""))
+                    
+                    st.button("🔁 Recount Next Product", key="recount_next_btn", on_click=recount_next_product, use_container_width=True)
+                else:
+                    st.caption("No discrepancies to recount.")
+                
+                # Progress of the current session room by room
+                st.markdown("<h4 style='text-align: center; margin-top: 20px;'>Room Progress</h4>", unsafe_allow_html=True)
+                location_registry = get_location_registry()
+                location_cube = get_location_cube()
+                current_session_id = st.session_state.current_count_session["id"]
+                room_summary = location_cube.session_summary(current_session_id, location_registry.assignable_labels)
+                st.dataframe(
+                    room_summary,
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        'Completion': st.column_config.ProgressColumn("Completion", min_value=0.0, max_value=1.0, format="percent"),
+                    }
+                )
+                
+                # Quantities rolled up to shelves, rooms and sites for multi-level registries
+                if location_registry.is_hierarchical:
+                    with st.expander("Totals by Site and Room", expanded=False):
+                        st.dataframe(
+                            location_registry.rollup(location_cube.session_totals(current_session_id)),
+                            use_container_width=True,
+                            hide_index=True
+                        )
+            
             # Add a modern export section at the bottom of the main UI with iOS styling
             st.markdown("""
             <div style="margin: 40px auto 30px auto; max-width: 800px;">
@@ -2795,169 +1986,7 @@ else:
             """, unsafe_allow_html=True)
             
             # Add iOS-style buttons with custom CSS using theme colors
-            st.markdown(f"""
-            <style>
-                /* iOS style button for Generate Report */
-                div.stButton > button {{
-                    background-color: {THEME_PRIMARY}; /* Primary purple theme */
-                    color: white !important; /* Force white text */
-                    font-weight: 500;
-                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell;
-                    border: none;
-                    padding: 12px 24px;
-                    border-radius: 8px; /* Slightly rounded corners like iOS */
-                    transition: all 0.2s ease;
-                    box-shadow: 0 2px 5px rgba(106, 40, 232, 0.2);
-                    font-size: 15px;
-                    letter-spacing: 0.5px;
-                }}
-                
-                /* Make sure button text is white */
-                div.stButton > button p, 
-                div.stButton > button span,
-                div.stButton > button div {{
-                    color: white !important;
-                }}
-                div.stButton > button:hover {{
-                    box-shadow: 0 4px 10px rgba(106, 40, 232, 0.25);
-                    transform: translateY(-1px);
-                    filter: brightness(1.05);
-                    background-color: {THEME_SECONDARY};
-                }}
-                
-                /* Purple gradient style for Complete Inventory button */
-                [data-testid="stButton"] button:has(> div:contains("Export Inventory Report")) {{
-                    background: {THEME_GRADIENT} !important;
-                    color: white !important; /* Force white text */
-                    box-shadow: 0 4px 10px rgba(106, 40, 232, 0.3) !important;
-                    transition: all 0.3s ease;
-                }}
-                /* Fallback selector in case the above doesn't work */
-                [data-testid="stButton"] button[kind="secondary"][aria-label="📊 Export Inventory Report"] {{
-                    background: {THEME_GRADIENT} !important;
-                    color: white !important; /* Force white text */
-                    box-shadow: 0 4px 10px rgba(106, 40, 232, 0.3) !important;
-                    transition: all 0.3s ease;
-                }}
-                [data-testid="stButton"] button[kind="secondary"][aria-label="📊 Export Inventory Report"]:hover {{
-                    background: linear-gradient(135deg, {THEME_SECONDARY}, {THEME_PRIMARY});
-                    box-shadow: 0 6px 15px rgba(106, 40, 232, 0.4);
-                    transform: translateY(-2px);
-                }}
-                div.stButton > button:active {{
-                    transform: translateY(1px);
-                    box-shadow: 0 1px 3px rgba(0, 0, 0, 0.1);
-                }}
-                
-                /* Global style for download links and buttons */
-                a[download], a.download-link {{
-                    color: white !important;
-                    text-decoration: none !important;
-                }}
-                a[download] span, a.download-link span {{
-                    color: white !important;
-                }}
-                
-                /* iOS style download button */
-                .ios-download-btn {{
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    background: {THEME_GRADIENT}; /* Theme gradient */
-                    color: white !important; /* Force white text */
-                    text-decoration: none;
-                    padding: 12px 16px;
-                    border-radius: 8px;
-                    margin: 12px 0;
-                    font-weight: 500;
-                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen;
-                    transition: all 0.2s ease;
-                    box-shadow: 0 2px 5px rgba({THEME_PRIMARY.replace('#', '')}, 0.2);
-                }}
-                .ios-download-btn:hover {{
-                    background: linear-gradient(135deg, {THEME_SECONDARY}, {THEME_PRIMARY});
-                    box-shadow: 0 4px 10px rgba({THEME_PRIMARY.replace('#', '')}, 0.25);
-                    transform: translateY(-1px);
-                }}
-                .ios-download-btn:active {{
-                    transform: translateY(1px);
-                    box-shadow: 0 1px 3px rgba({THEME_PRIMARY.replace('#', '')}, 0.1);
-                }}
-                .ios-download-icon {{
-                    margin-right: 10px;
-                    font-size: 18px;
-                }}
-                
-                /* Report card styling */
-                .report-cards {{
-                    display: flex;
-                    flex-wrap: wrap;
-                    gap: 15px;
-                    margin-top: 15px;
-                    margin-bottom: 25px;
-                }}
-                .report-card {{
-                    flex: 1;
-                    min-width: 220px;
-                    background-color: #f8f9fa;
-                    border-radius: 10px;
-                    overflow: hidden;
-                    box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-                    transition: all 0.3s ease;
-                }}
-                .report-card:hover {{
-                    transform: translateY(-5px);
-                    box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-                }}
-                .report-card-header {{
-                    padding: 15px;
-                    color: white;
-                    font-weight: 600;
-                    text-align: center;
-                }}
-                .report-card-body {{
-                    padding: 15px;
-                    min-height: 80px;
-                    font-size: 14px;
-                    color: #444;
-                }}
-                
-                /* Report summary styling */
-                .report-summary {{
-                    background: linear-gradient(135deg, rgba({THEME_PRIMARY.replace('#', '')}, 0.03), rgba({THEME_SECONDARY.replace('#', '')}, 0.05));
-                    border-radius: 10px;
-                    padding: 20px;
-                    margin-top: 20px;
-                    box-shadow: 0 2px 8px rgba({THEME_PRIMARY.replace('#', '')}, 0.1);
-                    border: 1px solid rgba({THEME_PRIMARY.replace('#', '')}, 0.1);
-                }}
-                .summary-header {{
-                    font-size: 18px;
-                    font-weight: 600;
-                    margin-bottom: 15px;
-                    color: {THEME_PRIMARY};
-                }}
-                .summary-metrics {{
-                    display: flex;
-                    gap: 25px;
-                    margin-bottom: 15px;
-                }}
-                .summary-metric {{
-                    flex: 1;
-                }}
-                .metric-value {{
-                    font-size: 24px;
-                    font-weight: 700;
-                    color: {THEME_SECONDARY}; 
-                    text-shadow: 0 1px 2px rgba({THEME_PRIMARY.replace('#', '')}, 0.2);
-                }}
-                .metric-label {{
-                    font-size: 14px;
-                    color: #666;
-                    margin-top: 5px;
-                }}
-            </style>
-            """, unsafe_allow_html=True)
+            st.markdown(EXPORT_BUTTON_CSS, unsafe_allow_html=True)
             
             # Simplified to just one card for the complete inventory report
             col_space1, card_col1, col_space2 = st.columns([1, 4, 1])
@@ -2983,69 +2012,45 @@ else:
             
             # Full inventory report - now using the entire width
             with col1:
-                if st.button("📊 Export Inventory Report", key="complete_inv_btn", use_container_width=True):
-                    # Get original data without adding columns
-                    export_data = prepare_export_data("standard")
-                    if export_data is not None:
-                        filename = f"inventory_report_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
-                        
-                        # Check if export_data is a string (CSV content) or DataFrame
-                        if isinstance(export_data, str):
-                            # Already a CSV string, use it directly
-                            csv_content = export_data
-                        else:
-                            # It's a DataFrame, convert to CSV
-                            csv_content = export_data.to_csv(index=False)
-                        
-                        # Encode for download
-                        b64 = base64.b64encode(csv_content.encode()).decode()
-                        
-                        # Create a purple-themed download button with all text in white
-                        download_link = f"""
-                        <a class="download-link" href="data:file/csv;base64,{b64}" download="{filename}" style="display: flex; align-items: center; justify-content: center; background: {THEME_GRADIENT}; color: white !important; text-decoration: none !important; padding: 12px 16px; border-radius: 8px; margin: 12px 0; font-weight: 500; transition: all 0.2s ease; box-shadow: 0 4px 10px rgba(106, 40, 232, 0.3);">
-                            <span style="margin-right: 10px; font-size: 18px; color: white !important;">📥</span> 
-                            <span style="color: white !important;">Download Inventory Report</span>
-                        </a>
-                        """
-                        
-                        st.success("✅ Your complete inventory report is ready!")
-                        st.markdown(download_link, unsafe_allow_html=True)
-                        
-                        # Calculate stats for display only
-                        # Use stock_data for stats since export_data may be a string now
-                        total_items = len(st.session_state.stock_data)
-                        
-                        # Count the items that have been counted
-                        counted_products = set()
-                        for product_id, counts in st.session_state.count_data.items():
-                            if counts:  # If there are count entries for this product
-                                counted_products.add(product_id)
-                        counted_items = len(counted_products)
-                        
-                        completion_pct = round(counted_items/total_items*100, 1) if total_items > 0 else 0
-                        
-                        # Display a summary with styled metrics
-                        st.markdown(f"""
-                        <div class="report-summary">
-                            <div class="summary-header">Report Summary</div>
-                            <div class="summary-metrics">
-                                <div class="summary-metric">
-                                    <div class="metric-value">{total_items}</div>
-                                    <div class="metric-label">Total Items</div>
-                                </div>
-                                <div class="summary-metric">
-                                    <div class="metric-value">{counted_items}</div>
-                                    <div class="metric-label">Items Counted</div>
-                                </div>
-                                <div class="summary-metric">
-                                    <div class="metric-value">{completion_pct}%</div>
-                                    <div class="metric-label">Completion Rate</div>
-                                </div>
+                filename = f"inventory_report_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
+                if export_download_button("📊 Export Inventory Report", filename, key="complete_inv_btn"):
+                    st.success("✅ Your complete inventory report is ready!")
+                    
+                    # Calculate stats for display only
+                    # Use stock_data for stats since the export itself is built on the download thread
+                    total_items = len(st.session_state.stock_data)
+                    
+                    # Count the items that have been counted
+                    counted_products = set()
+                    for product_id, counts in st.session_state.count_data.items():
+                        if counts:  # If there are count entries for this product
+                            counted_products.add(product_id)
+                    counted_items = len(counted_products)
+                    
+                    completion_pct = round(counted_items/total_items*100, 1) if total_items > 0 else 0
+                    
+                    # Display a summary with styled metrics
+                    st.markdown(f"""
+                    <div class="report-summary">
+                        <div class="summary-header">Report Summary</div>
+                        <div class="summary-metrics">
+                            <div class="summary-metric">
+                                <div class="metric-value">{total_items}</div>
+                                <div class="metric-label">Total Items</div>
+                            </div>
+                            <div class="summary-metric">
+                                <div class="metric-value">{counted_items}</div>
+                                <div class="metric-label">Items Counted</div>
+                            </div>
+                            <div class="summary-metric">
+                                <div class="metric-value">{completion_pct}%</div>
+                                <div class="metric-label">Completion Rate</div>
                             </div>
-                            <div style="color:#666; font-size:14px;">Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}</div>
                         </div>
-                        """, unsafe_allow_html=True)
-            
+                        <div style="color:#666; font-size:14px;">Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}</div>
+                    </div>
+                    """, unsafe_allow_html=True)
+        
             # Export section complete - removed second export option
     else:
         # Placeholder when no data is loaded
@@ -3059,3 +2064,43 @@ else:
         3. **Add count entries** for each product, with location and notes
         4. **Export results** as a CSV file when finished
         """)
+
+# Report this session as active, with the memory its catalog holds
+if st.session_state.stock_data is not None:
+    catalog_key = st.session_state.catalog_hash or id(st.session_state.stock_data)
+    if st.session_state.get('catalog_bytes_key') != catalog_key:
+        st.session_state.catalog_bytes = int(st.session_state.stock_data.memory_usage(deep=True).sum())
+        st.session_state.catalog_bytes_key = catalog_key
+script_run_ctx = get_script_run_ctx()
+if script_run_ctx is not None:
+    get_metrics().sessions.touch(script_run_ctx.session_id, st.session_state.get('catalog_bytes', 0) if st.session_state.stock_data is not None else 0)
+
+# Audit session-state memory now and then, or on every rerun while diagnostics are open
+# (an empty splash screen holds next to nothing, and auditing it would load pandas)
+diagnostics_open = st.query_params.get("diagnostics") == "1"
+memory_auditor = get_memory_auditor()
+if script_run_ctx is not None and (diagnostics_open or (engines_needed and memory_auditor.due(script_run_ctx.session_id))):
+    with span("memory_audit"):
+        memory_auditor.audit(
+            script_run_ctx.session_id,
+            [(key, st.session_state[key]) for key in st.session_state.keys()],
+            audit_product_ids()
+        )
+
+# Close this rerun's timings; the panel is hidden unless the URL has ?diagnostics=1
+st.session_state.profiler.end_rerun()
+if diagnostics_open:
+    with st.sidebar:
+        with st.expander("Diagnostics", expanded=True):
+            profiler = st.session_state.profiler
+            st.caption(f"Phase timings over the last {profiler.window} samples · {profiler.reruns} reruns")
+            st.dataframe(profiler.percentiles(), use_container_width=True, hide_index=True)
+            
+            if script_run_ctx is not None:
+                st.caption(
+                    f"Session state: {memory_auditor.session_bytes(script_run_ctx.session_id) / 2**20:,.1f} MB here · "
+                    f"{memory_auditor.total_bytes() / 2**20:,.1f} MB across {memory_auditor.session_count()} sessions"
+                )
+                for warning in memory_auditor.warnings(script_run_ctx.session_id):
+                    st.warning(warning)
+                st.dataframe(memory_auditor.latest(script_run_ctx.session_id).head(15), use_container_width=True, hide_index=True)
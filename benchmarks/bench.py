@@ -0,0 +1,383 @@
+"""
+Benchmarks for the app's hot paths, with JSON baselines and a regression check.
+
+Times, on catalogs from vendor_catalog.py at each requested size:
+
+- ingest: decoding, hashing and parsing an uploaded file as the upload path does
+- validate_csv: column detection and cleaning of the parsed file
+- search_*: search_all_columns on representative queries (product ID, rare
+  and popular brand, a multi-word product name, no match)
+- add_count_entry: a batch of count entries into a fresh session
+- history_fold / history_compare: per-session aggregation of the count ledger
+  and the two-session comparison
+- export_*: prepare_export_data for each report type, built from scratch
+
+The code under test is imported from the stockcount package and runs against
+a plain namespace standing in for st.session_state, so no Streamlit script
+runs while timing.
+
+The startup command checks the cold first paint instead: it renders app.py's
+splash screen with AppTest in fresh interpreters and fails when that takes
+longer than --budget seconds or loads pandas or NumPy.
+
+    python benchmarks/bench.py run --save local
+    python benchmarks/bench.py run --compare benchmarks/baselines/local.json
+    python benchmarks/bench.py run --sizes 1M --compare benchmarks/baselines/local.json
+    python benchmarks/bench.py compare old.json new.json --threshold 15
+    python benchmarks/bench.py startup --budget 0.3
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from vendor_catalog import generate_catalog, parse_rows
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_PATH = ROOT / "app.py"
+sys.path.insert(0, str(ROOT))
+
+from stockcount.catalog import catalog_hash, validate_csv
+from stockcount.counting import add_count_entry
+from stockcount.cube import LocationCube
+from stockcount.delta import ExportWatermark
+from stockcount.diff import diff_sessions
+from stockcount.export_cache import ExportCache
+from stockcount.exports import prepare_export_data
+from stockcount.history import SessionHistory
+from stockcount.ledger import CountLedger
+from stockcount.search import search_all_columns
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+# 1M takes minutes per run, so it is opt-in with --sizes
+DEFAULT_SIZES = ["10k", "100k"]
+# Count entries added per add_count_entry benchmark run
+ENTRY_BATCH = 1000
+# Sessions the history and export benchmarks spread their ledger over
+HISTORY_SESSIONS = 3
+REPORT_TYPES = ["standard", "detailed", "location_summary", "compliance"]
+
+# Regressions smaller than this many seconds are treated as noise
+MIN_DELTA_SECONDS = 0.002
+
+# Seconds the cold splash screen may take to render, and modules it must not load
+STARTUP_BUDGET_SECONDS = 0.3
+STARTUP_DEFERRED_MODULES = ["pandas", "numpy", "stockcount.analytics", "stockcount.exports", "stockcount.reports"]
+
+# Run in a fresh interpreter: render the splash screen once, report how long the script ran and what it
+# imported. Only the script is timed; Streamlit and AppTest's own setup are loaded before a real session starts.
+STARTUP_PROBE = """
+import json, sys, time
+import streamlit.runtime.scriptrunner.script_runner as script_runner
+from streamlit.testing.v1 import AppTest
+
+script_seconds = []
+execute = script_runner.exec_func_with_error_handling
+def timed_execute(func, ctx):
+    started = time.perf_counter()
+    try:
+        return execute(func, ctx)
+    finally:
+        script_seconds.append(time.perf_counter() - started)
+script_runner.exec_func_with_error_handling = timed_execute
+
+app = AppTest.from_file(sys.argv[1], default_timeout=60)
+app.run()
+print(json.dumps({
+    "seconds": script_seconds[0],
+    "exception": [str(e.value) for e in app.exception],
+    "loaded": [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+}))
+"""
+
+
+# Function to build the session state the app has after an upload, as a plain namespace
+def session_state(stock_data, raw_csv_content):
+    return SimpleNamespace(
+        view="main",
+        stock_data=stock_data,
+        raw_csv_content=raw_csv_content,
+        catalog_hash=catalog_hash(raw_csv_content),
+        count_data={},
+        historical_counts={},
+        sc_closed={},
+        count_ledger=CountLedger(),
+        session_history=SessionHistory(),
+        export_cache=ExportCache(),
+        export_watermark=ExportWatermark(),
+        count_sessions=[],
+        current_count_session={"id": "session_0", "timestamp": datetime.now(), "name": "Count Session"},
+        location_cube=LocationCube(stock_data),
+    )
+
+
+class Fixture:
+    """One catalog size: the generated file and the app state built from it."""
+    
+    def __init__(self, rows, seed=0):
+        self.rows = rows
+        self.catalog = generate_catalog(rows, seed=seed)
+        self.raw = self.catalog.data
+        self.parsed = pd.read_csv(BytesIO(self.raw))
+        valid, result = validate_csv(self.parsed.copy())
+        if not valid:
+            raise RuntimeError(f"Generated catalog failed validation: {result}")
+        self.stock_data = result
+        self.product_ids = self.stock_data["product_id"].to_numpy()
+        self.rng = np.random.default_rng(seed)
+        self.state = None
+    
+    def reset_session(self):
+        """A fresh session with this catalog loaded, as after an upload."""
+        self.state = session_state(self.stock_data, self.raw.decode("utf-8"))
+        return self.state
+    
+    def fill_ledger(self, entries, sessions=HISTORY_SESSIONS):
+        """Append `entries` counts spread over `sessions` sessions straight to the ledger."""
+        state = self.reset_session()
+        products = self.product_ids[self.rng.integers(0, len(self.product_ids), entries)]
+        counts = self.rng.integers(0, 60, entries).astype(float)
+        session_of = np.sort(self.rng.integers(0, sessions, entries))
+        for product_id, count, session in zip(products, counts, session_of):
+            state.count_ledger.append(product_id, count, "Bar", f"2026-01-0{session + 1} 10:00:00", f"session_{session}")
+            state.count_data.setdefault(product_id, []).append({"count": count, "location": "Bar"})
+        return state
+    
+    def search_terms(self):
+        names = self.catalog.names
+        return {
+            "search_id": str(self.product_ids[len(self.product_ids) // 2]),
+            "search_brand": self.catalog.brands[-1],
+            "search_popular_brand": self.catalog.brands[0],
+            "search_name": names[len(names) // 3],
+            "search_miss": "zzqx",
+        }
+
+
+# Function to build the (setup, operation) pairs of every benchmark for one fixture
+def benchmarks(fixture):
+    entries = max(ENTRY_BATCH, fixture.rows // 10)
+    cases = {}
+    
+    def ingest():
+        text = fixture.raw.decode("utf-8")
+        catalog_hash(text)
+        return pd.read_csv(BytesIO(fixture.raw))
+    cases["ingest"] = (None, ingest)
+    
+    cases["validate_csv"] = (lambda: fixture.parsed.copy(), validate_csv)
+    
+    for name, term in fixture.search_terms().items():
+        cases[name] = (None, lambda term=term: search_all_columns(fixture.stock_data, term))
+    
+    def entry_batch():
+        return fixture.reset_session(), fixture.product_ids[fixture.rng.integers(0, len(fixture.product_ids), ENTRY_BATCH)]
+    
+    def add_entries(batch):
+        state, products = batch
+        for product_id in products:
+            add_count_entry(state, product_id, 1.0, "Bar", "")
+    cases["add_count_entry"] = (entry_batch, add_entries)
+    
+    def fold_history(state):
+        ledger = state.count_ledger
+        history = SessionHistory()
+        for row in range(len(ledger)):
+            history.add(ledger.product_ids[row], ledger.session_ids[row], ledger.session_ids[row],
+                        ledger.counts[row], ledger.timestamps[row])
+        for product_id in ledger.product_ids[:100]:
+            history.frame(product_id)
+        return history
+    cases["history_fold"] = (lambda: fixture.fill_ledger(entries), fold_history)
+    cases["history_compare"] = (lambda: fixture.fill_ledger(entries),
+                                lambda state: diff_sessions(state.count_ledger.to_frame(), "session_0", f"session_{HISTORY_SESSIONS - 1}"))
+    
+    def export_setup():
+        # Reuse the filled ledger, but start every run with an empty export cache
+        state = fixture.state
+        if state is None or len(state.count_ledger) != entries:
+            state = fixture.fill_ledger(entries)
+        state.export_cache = ExportCache()
+        return state
+    for report_type in REPORT_TYPES:
+        cases[f"export_{report_type}"] = (export_setup, lambda state, report_type=report_type: prepare_export_data(state, report_type)())
+    
+    return cases
+
+
+# Function to time one benchmark: best and median of `repeat` runs, setup excluded
+def time_case(setup, operation, repeat):
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        gc.collect()
+        started = time.perf_counter()
+        operation(arg) if setup else operation()
+        times.append(time.perf_counter() - started)
+    return {"min": min(times), "median": statistics.median(times), "repeat": repeat}
+
+
+# Function to describe the machine and code a result file came from
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    import streamlit
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "streamlit": streamlit.__version__,
+    }
+
+
+def run(args):
+    # Mixed-type columns are expected: the vendor layout puts text rows above the numbers
+    warnings.simplefilter("ignore", pd.errors.DtypeWarning)
+    results = {}
+    for size in args.sizes:
+        rows = parse_rows(size)
+        print(f"== {size} rows", flush=True)
+        fixture = Fixture(rows, args.seed)
+        for name, (setup, operation) in benchmarks(fixture).items():
+            if args.only and not any(pattern in name for pattern in args.only):
+                continue
+            stats = time_case(setup, operation, args.repeat)
+            results[f"{name}@{size}"] = stats
+            print(f"  {name:<26} {stats['min'] * 1000:>10.1f} ms  (median {stats['median'] * 1000:.1f} ms)", flush=True)
+    
+    report = {"environment": environment(), "results": results}
+    outputs = [args.out] if args.out else []
+    if args.save:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        outputs.append(BASELINE_DIR / f"{args.save}.json")
+    for path in outputs:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {path}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            return print_comparison(json.load(f), report, args.threshold, args.metric)
+    return 0
+
+
+# Function to render the splash screen in a fresh interpreter and return the probe's report
+def probe_startup(path=APP_PATH, deferred=STARTUP_DEFERRED_MODULES):
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_PROBE, str(path), json.dumps(deferred)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def startup(args):
+    probes = [probe_startup() for _ in range(args.repeat)]
+    seconds = [probe["seconds"] for probe in probes]
+    best, median = min(seconds), statistics.median(seconds)
+    print(f"Splash first paint: {best * 1000:.0f} ms best, {median * 1000:.0f} ms median of {args.repeat} "
+          f"(budget {args.budget * 1000:.0f} ms)")
+    
+    failures = []
+    if probes[0]["exception"]:
+        failures.append(f"the splash screen raised: {probes[0]['exception'][0]}")
+    if probes[0]["loaded"]:
+        failures.append(f"the splash screen loaded {', '.join(probes[0]['loaded'])}")
+    if best > args.budget:
+        failures.append(f"first paint took {best * 1000:.0f} ms, over the {args.budget * 1000:.0f} ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("Startup is within budget")
+    return 1 if failures else 0
+
+
+# Function to list the benchmarks that got slower than the baseline by more than threshold percent
+def regressions(baseline, current, threshold, metric="min"):
+    rows = []
+    for key, stats in current["results"].items():
+        before = baseline["results"].get(key)
+        if before is None:
+            continue
+        change = (stats[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+        regressed = change > threshold and stats[metric] - before[metric] > MIN_DELTA_SECONDS
+        rows.append((key, before[metric], stats[metric], change, regressed))
+    return rows
+
+
+# Function to print a baseline comparison and return the exit status
+def print_comparison(baseline, current, threshold, metric="min"):
+    rows = regressions(baseline, current, threshold, metric)
+    print(f"\n{'benchmark':<36} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for key, before, after, change, regressed in rows:
+        print(f"{key:<36} {before * 1000:>12.1f} {after * 1000:>12.1f} {change:>+7.1f}%{'  REGRESSION' if regressed else ''}")
+    
+    missing = sorted(set(baseline["results"]) - set(current["results"]))
+    if missing:
+        print(f"\nNot run this time: {', '.join(missing)}")
+    failed = [row for row in rows if row[4]]
+    if failed:
+        print(f"\n{len(failed)} benchmark(s) regressed by more than {threshold}%")
+        return 1
+    print(f"\nNo benchmark regressed by more than {threshold}%")
+    return 0
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    return print_comparison(baseline, current, args.threshold, args.metric)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the stock count app's hot paths.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="catalog sizes (default: 10k 100k; add 1M explicitly)")
+    run_parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark (best and median are kept)")
+    run_parser.add_argument("--only", nargs="+", help="run only benchmarks whose name contains one of these")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--out", help="write the results to this JSON file")
+    run_parser.add_argument("--save", metavar="NAME", help="store the results as benchmarks/baselines/NAME.json")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="compare against a baseline JSON and fail on regressions")
+    
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown in percent")
+        sub.add_argument("--metric", choices=["min", "median"], default="min", help="statistic to compare")
+    
+    startup_parser = commands.add_parser("startup", help="check the cold splash screen against a time budget")
+    startup_parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS, help="seconds allowed for the first paint")
+    startup_parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters to time (the best is checked)")
+    
+    args = parser.parse_args(argv)
+    return {"run": run, "compare": compare, "startup": startup}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
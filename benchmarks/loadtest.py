@@ -0,0 +1,318 @@
+"""
+Concurrent-session load test for app.py.
+
+Drives the app headlessly with Streamlit's AppTest. Each simulated session is
+a counter on a tablet: it uploads a catalog from vendor_catalog.py, searches
+for products, enters counts against the results it finds and builds an export
+in the background. Sessions run on their own threads inside one process, so
+they share the cached resources, the GIL and the memory a real server would.
+Like a real server, they share one compiled copy of the script, and each
+session's first run (which also sets up AppTest's component registry) is
+serialized; the time spent waiting for it is not counted as latency.
+
+Exceptions the harness itself hits (widget lookups, AppTest internals) are
+reported separately from app failures, and never flagged as the app degrading.
+
+For every number of concurrent sessions the tool reports rerun latency
+percentiles, CPU use and resident memory, and flags the first step where the
+p95 latency degrades past --degrade times the smallest step's p95.
+
+    python benchmarks/loadtest.py --sessions 1 2 4 8 --rows 2000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from streamlit import config
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest, app_test, local_script_runner
+
+from vendor_catalog import generate_catalog, parse_rows
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+
+# Rerun latency percentiles reported for every step
+PERCENTILES = (50, 95, 99)
+
+# Held for each session's first run, which sets up AppTest state that isn't thread-safe
+FIRST_RUN_LOCK = threading.Lock()
+
+
+class AppFailure(Exception):
+    """The app raised, rejected the upload or never finished the export."""
+
+
+# Function to read the process's current resident set size in bytes
+def current_rss():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # No procfs: fall back to the peak, which ru_maxrss reports in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+# Function to let AppTest sessions run concurrently in one process
+def share_apptest_runtime():
+    """
+    AppTest installs a mock Runtime and the global.appTest option for the
+    length of each run and removes them afterwards, which breaks any session
+    still running on another thread. Keep the most recently installed runtime
+    visible and the option set for the whole load test instead.
+    
+    Every AppTest run also compiles the script into a fresh ScriptCache, and
+    concurrent compiles of the same file race inside the parser. Hand every
+    run one shared cache, so the script is compiled once under its lock.
+    """
+    config.set_option("global.appTest", True)
+    shared_script_cache = ScriptCache()
+    app_test.ScriptCache = lambda: shared_script_cache
+    local_script_runner.ScriptCache = lambda: shared_script_cache
+    installed = {}
+    
+    def instance(cls):
+        if cls._instance is not None:
+            installed['runtime'] = cls._instance
+        runtime = cls._instance or installed.get('runtime')
+        if runtime is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return runtime
+    
+    def exists(cls):
+        return cls._instance is not None or 'runtime' in installed
+    
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+
+
+class RSSSampler:
+    """Background thread that tracks the peak resident memory while a step runs."""
+    
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+    
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+class SimulatedSession:
+    """One tablet session driven through AppTest, timing every rerun it causes."""
+    
+    def __init__(self, catalog, terms, rng, timeout=120, think=0.0):
+        self.catalog = catalog
+        self.terms = terms
+        self.rng = rng
+        self.think = think
+        self.app = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+        self.timings = []  # (action, seconds) per rerun
+        self.errors = []          # App failures
+        self.harness_errors = []  # Faults in the load test itself
+    
+    def rerun(self, action):
+        started = time.perf_counter()
+        self.app.run()
+        self.timings.append((action, time.perf_counter() - started))
+        if self.app.exception:
+            raise AppFailure(f"{action}: {self.app.exception[0].value}")
+        if self.think:
+            time.sleep(self.rng.uniform(0, self.think))
+    
+    def upload(self):
+        with FIRST_RUN_LOCK:
+            self.rerun("open")
+        self.app.file_uploader(key="splash_uploader").set_value(("stock.csv", self.catalog, "text/csv"))
+        self.rerun("upload")
+        if self.app.session_state["view"] != "main":
+            raise AppFailure("upload: catalog was rejected")
+    
+    def search(self, term):
+        self.app.text_input(key="search_box").input(term)
+        self.rerun("search")
+        # Every product in the results has its own Add Count Entry button
+        return [button.key[len("btn_"):] for button in self.app.button if button.key and button.key.startswith("btn_")]
+    
+    def count(self, product_id):
+        self.app.number_input(key=f"count_{product_id}").set_value(float(self.rng.randint(0, 60)))
+        self.app.button(key=f"btn_{product_id}").click()
+        self.rerun("count")
+    
+    def export(self, poll=0.25, timeout=120):
+        """Build the standard report in the background and rerun until it is ready to download."""
+        self.app.button(key="background_report_btn").click()
+        self.rerun("export")
+        job_key = f"download_job_{self.app.session_state['export_jobs'][-1]}"
+        started = time.perf_counter()
+        while not any(button.key == job_key for button in self.app.get("download_button")):
+            if time.perf_counter() - started > timeout:
+                raise AppFailure("export: background job did not finish")
+            time.sleep(poll)
+            self.rerun("export_poll")
+        self.timings.append(("export_ready", time.perf_counter() - started))
+    
+    def script(self, searches, counts):
+        try:
+            self.upload()
+            for term in self.rng.sample(self.terms, min(searches, len(self.terms))):
+                for product_id in self.search(term)[:counts]:
+                    self.count(product_id)
+            self.export()
+        except AppFailure as e:
+            self.errors.append(str(e))
+        except Exception as e:
+            self.harness_errors.append(f"{type(e).__name__}: {e}")
+
+
+# Function to run one step of the test with n concurrent sessions
+def run_step(n, catalog, terms, args):
+    sessions = [
+        SimulatedSession(catalog, terms, random.Random(args.seed * 1000 + i), args.timeout, args.think)
+        for i in range(n)
+    ]
+    threads = [threading.Thread(target=session.script, args=(args.searches, args.counts)) for session in sessions]
+    
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    with RSSSampler() as rss:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.perf_counter() - started
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    
+    # Polling reruns only wait on the export; they are reported with it, not as rerun latency
+    timings = [(action, seconds) for session in sessions for action, seconds in session.timings]
+    latencies = np.array([seconds for action, seconds in timings if action not in ("export_poll", "export_ready")])
+    export_ready = [seconds for action, seconds in timings if action == "export_ready"]
+    
+    result = {
+        "sessions": n,
+        "reruns": int(len(latencies)),
+        "wall_seconds": wall,
+        "reruns_per_second": len(latencies) / wall if wall else 0.0,
+        "cpu_seconds": cpu,
+        "cpu_percent": cpu / wall * 100 if wall else 0.0,
+        "peak_rss_mb": rss.peak / 2**20,
+        "export_ready_seconds": float(np.mean(export_ready)) if export_ready else None,
+        "errors": [error for session in sessions for error in session.errors],
+        "harness_errors": [error for session in sessions for error in session.harness_errors],
+        "by_action": {},
+    }
+    for p in PERCENTILES:
+        result[f"p{p}_ms"] = float(np.percentile(latencies, p) * 1000) if len(latencies) else None
+    for action in sorted({action for action, seconds in timings if action not in ("export_poll", "export_ready")}):
+        values = np.array([seconds for name, seconds in timings if name == action])
+        result["by_action"][action] = {f"p{p}_ms": float(np.percentile(values, p) * 1000) for p in PERCENTILES}
+    return result
+
+
+# Function to mark the steps whose p95 latency has degraded against the first step
+def flag_degradation(results, factor):
+    baseline = results[0]["p95_ms"] if results else None
+    knee = None
+    for result in results:
+        result["p95_vs_baseline"] = result["p95_ms"] / baseline if baseline and result["p95_ms"] else None
+        result["degraded"] = bool(result["errors"]) or (result["p95_vs_baseline"] or 0) > factor
+        if result["degraded"] and knee is None:
+            knee = result
+    return knee
+
+
+# Function to print the results as a table
+def print_report(results, knee, factor, by_action=False):
+    header = f"{'sessions':>8} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rerun/s':>8} {'cpu %':>7} {'rss MB':>8} {'export s':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        export = f"{r['export_ready_seconds']:.2f}" if r["export_ready_seconds"] is not None else "-"
+        flag = "  <- degraded" if r["degraded"] else ""
+        print(f"{r['sessions']:>8} {r['reruns']:>7} {r['p50_ms'] or 0:>8.0f} {r['p95_ms'] or 0:>8.0f} {r['p99_ms'] or 0:>8.0f} "
+              f"{r['reruns_per_second']:>8.2f} {r['cpu_percent']:>7.0f} {r['peak_rss_mb']:>8.0f} {export:>9}{flag}")
+        if by_action:
+            for action, stats in r["by_action"].items():
+                print(f"{'':>8} {action:>7} " + " ".join(f"{stats[f'p{p}_ms']:>8.0f}" for p in PERCENTILES))
+        for error in r["errors"][:3]:
+            print(f"{'':>8} error: {error}")
+        for error in r["harness_errors"][:3]:
+            print(f"{'':>8} harness error: {error}")
+    
+    print()
+    incomplete = [r["sessions"] for r in results if r["harness_errors"]]
+    if incomplete:
+        print(f"The load test itself failed at {', '.join(map(str, incomplete))} concurrent sessions; "
+              "those steps are incomplete and say nothing about the app.")
+    if knee is None:
+        print(f"No degradation: p95 stayed within {factor}x the {results[0]['sessions']}-session baseline.")
+    elif knee["errors"]:
+        print(f"Sessions failed at {knee['sessions']} concurrent sessions.")
+    else:
+        print(f"Latency degrades at {knee['sessions']} concurrent sessions "
+              f"(p95 {knee['p95_vs_baseline']:.1f}x the {results[0]['sessions']}-session baseline).")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test app.py with concurrent headless sessions.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8], help="concurrent session counts to step through")
+    parser.add_argument("--rows", type=parse_rows, default=2000, help="products in the synthetic catalog, e.g. 2000 or 10k")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of catalog rows to break")
+    parser.add_argument("--searches", type=int, default=5, help="searches per session")
+    parser.add_argument("--search-kind", choices=["brand", "product", "mixed"], default="brand",
+                        help="what sessions search for; multi-word product names match far more rows")
+    parser.add_argument("--counts", type=int, default=2, help="count entries per search")
+    parser.add_argument("--think", type=float, default=0.0, help="maximum random pause between actions, in seconds")
+    parser.add_argument("--degrade", type=float, default=2.0, help="p95 multiple of the baseline that counts as degraded")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed for a single rerun")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--by-action", action="store_true", help="break latency down by action")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to a JSON file")
+    parser.add_argument("--stop-on-degrade", action="store_true", help="stop stepping once latency degrades")
+    args = parser.parse_args(argv)
+    
+    share_apptest_runtime()
+    synthetic = generate_catalog(args.rows, seed=args.seed, malformed_rate=args.malformed_rate)
+    catalog = synthetic.data
+    terms = sorted(set(synthetic.search_terms(max(100, args.searches * 10), seed=args.seed, kind=args.search_kind)))
+    print(f"Catalog: {args.rows} products ({len(catalog) / 2**20:.1f} MB); "
+          f"{args.searches} searches x {args.counts} counts + 1 export per session\n")
+    
+    results = []
+    for n in sorted(set(args.sessions)):
+        results.append(run_step(n, catalog, terms, args))
+        knee = flag_degradation(results, args.degrade)
+        if args.stop_on_degrade and knee is not None:
+            break
+    
+    print_report(results, knee, args.degrade, args.by_action)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rows": args.rows, "degrade_factor": args.degrade, "results": results}, f, indent=2)
+    if knee is not None and knee["errors"]:
+        return 1
+    return 2 if any(r["harness_errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Synthetic stock catalogs in the vendor export layout.
+
+The app is written against one supplier's stock-take CSV, which has a peculiar
+shape:
+
+- row 1 is metadata (site name, blanks, and `794438` above the count column),
+  so pandas names the product columns `Unnamed: 4/5/6/7` and the count column
+  `794438`;
+- row 2 holds the real labels, including `[E]Close SC` over the count column;
+- row 3, and occasionally rows further down, are "Do not delete or edit this
+  row" comments in the count column;
+- each product has a "Brand & Description" value ("Brand - Description"),
+  with type, name and size in the unnamed columns.
+
+generate_catalog builds such files deterministically from a seed at any scale
+(1k to 1M rows). Brand and description vocabularies follow Zipf-like
+distributions, and a configurable share of rows is malformed in the ways real
+exports are. Every benchmark and load test builds its input here.
+
+    python benchmarks/vendor_catalog.py --rows 100000 --out catalog_100k.csv
+"""
+import argparse
+import sys
+
+import numpy as np
+
+# Vendor layout: column positions of the fields the app reads
+COLUMNS = ["PID", "Category", "Brand & Description", "Location", "Type", "Name", "Size", "Unit", "[E]Close SC", "Cost"]
+COUNT_COLUMN = 8
+METADATA_ROW = ["Site", "{site}", "", "", "", "", "", "", "794438", ""]
+COMMENT_TEXT = "Do not delete or edit this row"
+
+# Seed vocabulary; brands beyond these are made up from syllables. Accented names make the encoding matter.
+BASE_BRANDS = ["Madri", "Peroni", "Guinness", "Aspall", "Camden", "Beavertown", "Gordon's", "Tanqueray",
+               "Smirnoff", "Jameson", "Bacardi", "Aperol", "Fever-Tree", "Coca-Cola", "Pepsi", "Red Bull",
+               "Jägermeister", "Moët", "Cointreau", "Rosé Piscine", "Crème de Cassis", "Hendrick's"]
+BRAND_SYLLABLES = ["ar", "bel", "cor", "dun", "el", "fen", "gal", "hol", "ix", "jor", "kel", "lun",
+                   "mar", "nor", "ost", "pel", "quin", "ros", "sol", "tor", "ul", "ven", "wyn", "zel"]
+# style -> (category, type, sizes)
+STYLES = {
+    "Lager": ("Beer", "Draught", ["1 Gallon [1]", "11G Keg [1]", "330ml [24]"]),
+    "Pale Ale": ("Beer", "Bottle", ["330ml [24]", "500ml [12]"]),
+    "IPA": ("Beer", "Can", ["330ml [24]", "440ml [24]"]),
+    "Stout": ("Beer", "Draught", ["1 Gallon [1]", "440ml [24]"]),
+    "Cider": ("Cider", "Draught", ["1 Gallon [1]", "500ml [12]"]),
+    "Gin": ("Spirits", "Spirit", ["70cl [1]", "1L [1]"]),
+    "Vodka": ("Spirits", "Spirit", ["70cl [1]", "1L [1]"]),
+    "Whiskey": ("Spirits", "Spirit", ["70cl [1]"]),
+    "Rum": ("Spirits", "Spirit", ["70cl [1]", "1L [1]"]),
+    "Liqueur": ("Spirits", "Spirit", ["50cl [1]", "70cl [1]"]),
+    "Champagne": ("Wine", "Bottle", ["75cl [6]", "20cl [24]"]),
+    "Rosé": ("Wine", "Bottle", ["75cl [6]", "25cl [24]"]),
+    "Tonic": ("Soft Drinks", "Mixer", ["200ml [24]", "500ml [8]"]),
+    "Cola": ("Soft Drinks", "Mixer", ["330ml [24]", "Bag in Box [1]"]),
+    "Lemonade": ("Soft Drinks", "Mixer", ["330ml [24]", "Bag in Box [1]"]),
+    "Energy": ("Soft Drinks", "Can", ["250ml [24]"]),
+}
+VARIANTS = ["", "Original", "Zero", "Light", "Reserve", "Special", "Export", "Premium", "Gold", "Dry", "Pink", "Citrus"]
+# Size options drawn per product (cycled through each style's own sizes)
+SIZE_PICKS = 6
+UNITS = ["Each", "Case", "Keg", "Bottle"]
+LOCATIONS = ["Bar", "Store Room", "Cellar", "Kitchen", "Fridge"]
+
+# Ways a data row can be broken
+MALFORMED_KINDS = ("short", "bad_count", "blank_count", "quoted", "extra_field")
+# Kinds pandas still parses; "extra_field" makes the standard read fail outright
+DEFAULT_MALFORMED_KINDS = ("short", "bad_count", "blank_count", "quoted")
+BAD_COUNTS = ["n/a", "-", "12 cs", "?", "TBC"]
+
+ENCODINGS = ("utf-8", "utf-8-sig", "cp1252", "latin-1", "utf-16")
+
+
+# Function to parse sizes like 10k or 1M
+def parse_rows(value):
+    value = str(value).strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip("km")) * scale)
+
+
+# Function to draw indices from a Zipf-like distribution over n items
+def zipf_choice(rng, n, size, skew):
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return rng.choice(n, size=size, p=weights / weights.sum())
+
+
+# Function to build a brand vocabulary of the requested size
+def brand_vocabulary(n, rng):
+    brands = BASE_BRANDS[:n]
+    seen = set(brands)
+    while len(brands) < n:
+        name = "".join(rng.choice(BRAND_SYLLABLES, size=rng.integers(2, 4))).capitalize()
+        if name not in seen:
+            seen.add(name)
+            brands.append(name)
+    return brands
+
+
+class SyntheticCatalog:
+    """A generated vendor-format CSV and what went into it."""
+    
+    def __init__(self, data, product_ids, names, brands, malformed_rows, comment_rows, encoding):
+        self.data = data  # the encoded file
+        self.product_ids = product_ids
+        self.names = names  # "Brand & Description" per product row
+        self.brands = brands
+        self.malformed_rows = malformed_rows  # product row numbers that were broken
+        self.comment_rows = comment_rows  # product row numbers followed by an extra comment row
+        self.encoding = encoding
+    
+    def __len__(self):
+        return len(self.product_ids)
+    
+    @property
+    def text(self):
+        return self.data.decode(self.encoding)
+    
+    def write(self, path):
+        with open(path, "wb") as f:
+            f.write(self.data)
+        return path
+    
+    def search_terms(self, n, seed=0, kind="product"):
+        """
+        n search terms that occur in the catalog: full product names ("product"),
+        brand names ("brand") or a mix of the two ("mixed").
+        """
+        rng = np.random.default_rng(seed)
+        products = [self.names[i] for i in rng.choice(len(self.names), size=n)]
+        brands = [self.brands[i] for i in rng.choice(len(self.brands), size=n)]
+        if kind == "product":
+            return products
+        if kind == "brand":
+            return brands
+        if kind == "mixed":
+            return [product if pick else brand for product, brand, pick in zip(products, brands, rng.random(n) < 0.5)]
+        raise ValueError(f"Unknown search term kind: {kind}")
+
+
+# Function to quote a CSV field when it needs it
+def csv_field(value):
+    if any(char in value for char in ',"\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+# Function to list every description the vocabulary can produce, with its category, type and size
+def description_table():
+    descriptions, categories, kinds, sizes = [], [], [], []
+    for style, (category, kind, style_sizes) in STYLES.items():
+        for variant in VARIANTS:
+            for pick in range(SIZE_PICKS):
+                size = style_sizes[pick % len(style_sizes)]
+                descriptions.append(" ".join(part for part in (variant, style, size.split(" [")[0]) if part))
+                categories.append(category)
+                kinds.append(kind)
+                sizes.append(size)
+    return [np.array(column, dtype=object) for column in (descriptions, categories, kinds, sizes)]
+
+
+def generate_catalog(rows, seed=0, brands=60, brand_skew=1.1, style_skew=0.8, malformed_rate=0.0,
+                     malformed_kinds=DEFAULT_MALFORMED_KINDS, comment_rate=0.0, encoding="utf-8",
+                     line_ending="\n", site="Arc Bar"):
+    """
+    Build a vendor-format catalog with `rows` products.
+    
+    brands/brand_skew and style_skew shape the Brand & Description vocabulary
+    (higher skew, fewer distinct names dominate). malformed_rate is the share
+    of product rows broken in one of malformed_kinds; comment_rate is the share
+    followed by an extra "Do not delete" comment row. The same arguments always
+    produce the same bytes.
+    
+    Columns are drawn as index arrays into the vocabulary tables and rows are
+    joined as whole object arrays, so a million rows take a few seconds.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unsupported encoding: {encoding}")
+    unknown = set(malformed_kinds) - set(MALFORMED_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown malformed row kinds: {', '.join(sorted(unknown))}")
+    
+    rng = np.random.default_rng(seed)
+    brand_names = np.array(brand_vocabulary(brands, rng), dtype=object)
+    descriptions, categories, kinds, sizes = description_table()
+    
+    brand_idx = zipf_choice(rng, len(brand_names), rows, brand_skew)
+    style_idx = zipf_choice(rng, len(STYLES), rows, style_skew)
+    variant_idx = rng.integers(0, len(VARIANTS), rows)
+    description_idx = (style_idx * len(VARIANTS) + variant_idx) * SIZE_PICKS + rng.integers(0, SIZE_PICKS, rows)
+    # Stock levels: mostly small, with a long tail of high-volume lines
+    counts = np.minimum(rng.poisson(rng.lognormal(2.0, 1.0, rows)), 9999)
+    costs = rng.lognormal(2.0, 0.8, rows)
+    
+    # Product codes keep a letter prefix: a numeric first column would be taken for the count column
+    product_ids = np.array([f"P{i:07d}" for i in range(rows)], dtype=object)
+    names = brand_names[brand_idx] + " - " + descriptions[description_idx]
+    count_text = counts.astype(str).astype(object)
+    
+    # Break a share of the rows the way hand-edited exports get broken
+    malformed_rows = np.sort(rng.choice(rows, size=int(round(rows * malformed_rate)), replace=False))
+    row_kinds = rng.choice(list(malformed_kinds), size=len(malformed_rows)) if len(malformed_rows) else []
+    name_fields = names.copy()
+    for row, kind in zip(malformed_rows, row_kinds):
+        if kind == "bad_count":
+            count_text[row] = BAD_COUNTS[row % len(BAD_COUNTS)]
+        elif kind == "blank_count":
+            count_text[row] = ""
+        elif kind == "quoted":
+            names[row] = f'{names[row]}, "{VARIANTS[1 + row % (len(VARIANTS) - 1)]}" edition'
+            name_fields[row] = csv_field(names[row])
+    
+    columns = [
+        product_ids, categories[description_idx], name_fields,
+        np.array(LOCATIONS, dtype=object)[rng.integers(0, len(LOCATIONS), rows)],
+        kinds[description_idx], brand_names[brand_idx], sizes[description_idx],
+        np.array(UNITS, dtype=object)[rng.integers(0, len(UNITS), rows)],
+        count_text, [f"{cost:.2f}" for cost in costs],
+    ]
+    lines = list(map(",".join, zip(*[list(column) for column in columns])))
+    for row, kind in zip(malformed_rows, row_kinds):
+        if kind == "short":
+            # Cut the row off before its unit, count and cost
+            lines[row] = ",".join(lines[row].split(",")[:COUNT_COLUMN - 1])
+        elif kind == "extra_field":
+            lines[row] += ",see note"
+    
+    # Extra comment rows go in back to front so earlier positions stay valid
+    comment_rows = np.sort(rng.choice(rows, size=int(round(rows * comment_rate)), replace=False))
+    comment = ",".join(COMMENT_TEXT if i == COUNT_COLUMN else "" for i in range(len(COLUMNS)))
+    for row in comment_rows[::-1]:
+        lines.insert(row + 1, comment)
+    
+    header = [",".join(METADATA_ROW).format(site=site), ",".join(COLUMNS), comment]
+    data = (line_ending.join(header + lines) + line_ending).encode(encoding)
+    return SyntheticCatalog(data, product_ids.tolist(), names.tolist(), brand_names.tolist(),
+                            malformed_rows.tolist(), comment_rows.tolist(), encoding)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic vendor-format stock catalog CSV.")
+    parser.add_argument("--rows", type=parse_rows, default=1000, help="number of products, e.g. 10k or 1M")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--brands", type=int, default=60, help="size of the brand vocabulary")
+    parser.add_argument("--brand-skew", type=float, default=1.1, help="Zipf exponent of brand frequencies")
+    parser.add_argument("--style-skew", type=float, default=0.8, help="Zipf exponent of description style frequencies")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of product rows to break")
+    parser.add_argument("--malformed-kinds", nargs="+", choices=MALFORMED_KINDS, default=list(DEFAULT_MALFORMED_KINDS))
+    parser.add_argument("--comment-rate", type=float, default=0.0, help="share of product rows followed by a comment row")
+    parser.add_argument("--encoding", choices=ENCODINGS, default="utf-8")
+    parser.add_argument("--crlf", action="store_true", help="use Windows line endings")
+    parser.add_argument("--out", default="-", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+    
+    catalog = generate_catalog(
+        args.rows, args.seed, args.brands, args.brand_skew, args.style_skew, args.malformed_rate,
+        args.malformed_kinds, args.comment_rate, args.encoding, "\r\n" if args.crlf else "\n",
+    )
+    if args.out == "-":
+        sys.stdout.buffer.write(catalog.data)
+    else:
+        catalog.write(args.out)
+        print(f"Wrote {len(catalog)} products ({len(catalog.data) / 2**20:.1f} MB, {args.encoding}) to {args.out}; "
+              f"{len(catalog.malformed_rows)} malformed, {len(catalog.comment_rows)} extra comment rows", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Domain engines for the Stock Count app.
+
+The Streamlit page in app.py keeps the UI; the modules in this package hold
+the data structures and reports it works on so they are imported once per
+process rather than re-executed on every rerun.
+"""
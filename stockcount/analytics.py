@@ -0,0 +1,150 @@
+"""
+Whole-catalog variance analytics.
+
+VarianceEngine keeps one NumPy array per measure, aligned with the catalog
+rows: expected quantity, counted quantity and number of count entries. New
+ledger entries are folded in incrementally, so refreshing after a count only
+touches the entries added since the previous refresh, and every derived
+measure (variance, absolute and percentage variance, counted flags) is a
+single vectorized expression over the arrays.
+"""
+import numpy as np
+import pandas as pd
+
+# Views offered by VarianceEngine.top
+TOP_VIEWS = ('shortfall', 'overage', 'absolute')
+
+# Catalog columns that may hold a unit cost or price, in order of preference
+UNIT_VALUE_COLUMNS = ['unit_cost', 'cost', 'cost_price', 'unit_price', 'price', 'value']
+
+
+# Function to find per-unit values in the catalog, or None if it has no such column
+def unit_values(catalog):
+    columns = {str(col).lower(): col for col in catalog.columns}
+    for name in UNIT_VALUE_COLUMNS:
+        if name in columns:
+            values = pd.to_numeric(catalog[columns[name]], errors='coerce').fillna(0.0)
+            return values.abs().to_numpy(dtype=float)
+    return None
+
+
+class VarianceEngine:
+    """Expected vs counted quantity for every product in one catalog."""
+    
+    def __init__(self, catalog):
+        self.product_ids = catalog['product_id'].to_numpy()
+        self.product_index = pd.Index(self.product_ids)
+        if 'Brand & Description' in catalog:
+            self.names = catalog['Brand & Description'].astype(str).to_numpy()
+        else:
+            self.names = self.product_ids.astype(str)
+        self.expected = pd.to_numeric(catalog['expected_count'], errors='coerce').fillna(0.0).to_numpy(dtype=float)
+        self.unit_values = unit_values(catalog)
+        
+        self.counted = np.zeros(len(self.product_ids), dtype=float)
+        self.entries = np.zeros(len(self.product_ids), dtype=np.int64)
+        # Number of ledger entries already folded into the arrays
+        self.rows_applied = 0
+    
+    def refresh(self, ledger):
+        """
+        Fold in the ledger entries appended since the last refresh and return
+        the catalog positions of the products they touched.
+        """
+        end = len(ledger)
+        if end <= self.rows_applied:
+            return np.empty(0, dtype=np.int64)
+        
+        positions = self.product_index.get_indexer(ledger.product_ids[self.rows_applied:end])
+        counts = np.array(ledger.counts[self.rows_applied:end], dtype=float)
+        known = positions >= 0  # Entries for products missing from this catalog are ignored
+        np.add.at(self.counted, positions[known], counts[known])
+        np.add.at(self.entries, positions[known], 1)
+        self.rows_applied = end
+        return np.unique(positions[known])
+    
+    @property
+    def variance(self):
+        return self.counted - self.expected
+    
+    @property
+    def is_counted(self):
+        return self.entries > 0
+    
+    def recount_priorities(self, positions=None, by_value=False):
+        """
+        Recount priority of the counted products at `positions` (default: all):
+        absolute variance, times unit value when by_value is set and the
+        catalog has values. Uncounted products get zero.
+        """
+        if positions is None:
+            positions = slice(None)
+        priority = np.abs(self.variance[positions]) * self.is_counted[positions]
+        if by_value and self.unit_values is not None:
+            priority = priority * self.unit_values[positions]
+        return priority
+    
+    def table(self):
+        """Every catalog product with its expected, counted and variance measures."""
+        variance = self.variance
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent = np.where(self.expected != 0, variance / self.expected * 100, np.nan)
+        return pd.DataFrame({
+            'Product ID': self.product_ids,
+            'Product': self.names,
+            'Expected': self.expected,
+            'Counted': self.counted,
+            'Variance': variance,
+            'Abs Variance': np.abs(variance),
+            'Variance %': percent,
+            'Entries': self.entries,
+            'Is Counted': self.is_counted,
+        })
+    
+    def summary(self):
+        """Catalog-wide totals for the overview metrics."""
+        counted = self.is_counted
+        variance = self.variance[counted]
+        return {
+            'products': len(self.product_ids),
+            'counted_products': int(counted.sum()),
+            'uncounted_products': int((~counted).sum()),
+            'expected_total': float(self.expected.sum()),
+            'counted_total': float(self.counted.sum()),
+            'net_variance': float(variance.sum()),
+            'abs_variance': float(np.abs(variance).sum()),
+        }
+    
+    def top(self, n=10, view='shortfall', counted_only=True):
+        """
+        The n products with the largest shortfall, overage or absolute
+        variance, largest first. Uses argpartition, so only the selected rows
+        are sorted.
+        """
+        if view not in TOP_VIEWS:
+            raise ValueError(f"Unknown view: {view}")
+        
+        variance = self.variance
+        if view == 'shortfall':
+            score = -variance
+        elif view == 'overage':
+            score = variance.copy()
+        else:
+            score = np.abs(variance)
+        
+        # Products that don't qualify for the view never make the list
+        eligible = score > 0
+        if counted_only:
+            eligible &= self.is_counted
+        candidates = np.flatnonzero(eligible)
+        if len(candidates) > n:
+            candidates = candidates[np.argpartition(-score[candidates], n - 1)[:n]]
+        candidates = candidates[np.argsort(-score[candidates], kind='stable')]
+        
+        return pd.DataFrame({
+            'Product ID': self.product_ids[candidates],
+            'Product': self.names[candidates],
+            'Expected': self.expected[candidates],
+            'Counted': self.counted[candidates],
+            'Variance': variance[candidates],
+        })
@@ -0,0 +1,74 @@
+"""
+Compressed export bundles.
+
+Several reports are packed into one archive, one member per report. Members
+are compressed chunk by chunk as their CSV is generated, so no report has to
+exist uncompressed in full before it is written into the archive.
+"""
+import io
+import tarfile
+import tempfile
+import time
+import zipfile
+
+# Members larger than this are spooled to disk before going into a tar archive
+TAR_SPOOL_BYTES = 8 * 1024 * 1024
+
+# Download MIME type for each bundle format
+BUNDLE_MIME_TYPES = {
+    'zip': 'application/zip',
+    'tar.gz': 'application/gzip',
+}
+
+
+# Function to count chunks as they pass through, for progress reporting
+def _track(chunks, counter, total, progress):
+    for chunk in chunks:
+        counter[0] += 1
+        if progress is not None:
+            progress(counter[0], total, "Compressing bundle")
+        yield chunk
+
+
+# Function to write members into a zip archive, deflating each chunk as it arrives
+def write_zip_bundle(members, total_chunks=0, progress=None):
+    buffer = io.BytesIO()
+    counter = [0]
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        for name, chunks in members:
+            with archive.open(name, 'w', force_zip64=True) as member:
+                for chunk in _track(chunks, counter, total_chunks, progress):
+                    member.write(chunk)
+    return buffer.getvalue()
+
+
+# Function to write members into a gzip-compressed tar archive
+def write_tar_gz_bundle(members, total_chunks=0, progress=None):
+    buffer = io.BytesIO()
+    counter = [0]
+    with tarfile.open(fileobj=buffer, mode='w:gz', compresslevel=6) as archive:
+        for name, chunks in members:
+            # Tar headers carry the member size, so spool the member first; the
+            # gzip stream still compresses it incrementally as it is copied in
+            with tempfile.SpooledTemporaryFile(max_size=TAR_SPOOL_BYTES) as spool:
+                for chunk in _track(chunks, counter, total_chunks, progress):
+                    spool.write(chunk)
+                info = tarfile.TarInfo(name)
+                info.size = spool.tell()
+                info.mtime = int(time.time())
+                spool.seek(0)
+                archive.addfile(info, spool)
+    return buffer.getvalue()
+
+
+BUNDLE_WRITERS = {
+    'zip': write_zip_bundle,
+    'tar.gz': write_tar_gz_bundle,
+}
+
+
+# Function to build a bundle in the requested format from (member name, chunk iterable) pairs
+def write_bundle(bundle_format, members, total_chunks=0, progress=None):
+    if bundle_format not in BUNDLE_WRITERS:
+        raise ValueError(f"Unknown bundle format: {bundle_format}")
+    return BUNDLE_WRITERS[bundle_format](members, total_chunks, progress)
@@ -0,0 +1,289 @@
+"""
+Reading and validating uploaded stock catalogs.
+
+The vendor exports arrive in a few shapes: a metadata row above the labels,
+a "Do not delete or edit this row" comment row under them, other separators,
+or no headers at all. read_catalog tries each way of parsing the file in
+turn and validate_csv maps whatever columns it finds onto product_id,
+brand, description, location and expected_count. Progress messages go to
+an optional notify(level, message) callback so the page can show them.
+"""
+import hashlib
+
+import pandas as pd
+
+# Separators tried in order when the header-based reads fail
+CATALOG_SEPARATORS = [',', ';', '\t', '|']
+
+
+# Function that drops messages when no callback is given
+def _ignore(level, message):
+    pass
+
+
+# Function to hash the uploaded file, so caches keyed on it reset when a new catalog arrives
+def catalog_hash(raw_content):
+    return hashlib.sha1(raw_content.encode('utf-8')).hexdigest()
+
+
+# Function to read the uploaded CSV, trying progressively looser parsing
+def read_catalog(uploaded_file, row2_header_first=False, notify=None):
+    """
+    The splash screen tries the standard header row first and the sidebar
+    tries the vendor layout (labels in row 2, comment row skipped) first;
+    row2_header_first picks the sidebar's order.
+    """
+    notify = notify or _ignore
+    attempts = [
+        (dict(), "Loaded CSV file with standard headers", "Standard header load failed"),
+        (dict(header=1, skiprows=[2]), "Loaded CSV file with headers in row 2 and skipped row 1", "Row 2 header load failed"),
+    ]
+    if row2_header_first:
+        attempts.reverse()
+    
+    for options, loaded, failed in attempts:
+        uploaded_file.seek(0)
+        try:
+            df = pd.read_csv(uploaded_file, **options)
+            notify("success", loaded)
+            return df
+        except Exception as e:
+            notify("warning", f"{failed}: {str(e)}")
+    
+    try:
+        # Try with no headers
+        uploaded_file.seek(0)
+        df = pd.read_csv(uploaded_file, header=None)
+        notify("warning", "Loaded CSV with no headers, using auto-generated column names")
+        return df
+    except Exception:
+        pass
+    
+    # Try different separators
+    for separator in CATALOG_SEPARATORS:
+        try:
+            uploaded_file.seek(0)
+            df = pd.read_csv(uploaded_file, sep=separator)
+            notify("success", f"Successfully loaded CSV with '{separator}' as separator")
+            return df
+        except Exception:
+            pass
+    
+    # Last attempt: Try with the most flexible parsing
+    uploaded_file.seek(0)
+    df = pd.read_csv(uploaded_file, sep=None, engine='python')
+    notify("warning", "Used automatic delimiter detection to load CSV")
+    return df
+
+
+# Function to validate CSV structure and map columns
+def validate_csv(df, notify=None):
+    notify = notify or _ignore
+    # Define column mappings (to handle different possible column names)
+    possible_id_columns = ['product_id', 'id', 'item_id', 'sku', 'item_number', 'item#', 'product#', 'barcode', 'code', 'item code', 'product code', 'article number']
+    possible_brand_columns = ['brand', 'Brand', 'manufacturer', 'supplier', 'vendor', 'make', 'producer', 'company', 'label', 'maker', 'source', 'Brand and Description', 'Brand & Description']
+    possible_description_columns = ['description', 'Description', 'product_description', 'item_description', 'details', 'specs', 'product_name', 'name', 'title', 'item', 'product', 'desc', 'article', 'goods', 'merchandise', 'Brand and Description', 'Brand & Description']
+    possible_location_columns = ['location', 'location_id', 'loc', 'warehouse', 'shelf', 'bin', 'storage', 'position', 'area', 'zone', 'aisle', 'section', 'dept', 'department', 'store']
+    possible_count_columns = ['expected_count', 'count', 'quantity', 'qty', 'stock', 'inventory', 'on_hand', 'amount', 'units', 'expected', 'expected qty', 'on hand qty', 'stock level', 'current stock', 'stock count', 'current count', '[E]Close SC', 'quantity on hand', 'par', 'par level', 'total', 'balance', 'volume', 'number', 'num']
+    
+    # Check specifically for the [E]Close SC column since it's important
+    close_sc_col = next((col for col in df.columns if col == '[E]Close SC'), None)
+    
+    # Try exact match first
+    id_col = next((col for col in df.columns if col.lower() in [c.lower() for c in possible_id_columns]), None)
+    brand_col = next((col for col in df.columns if col.lower() in [c.lower() for c in possible_brand_columns]), None)
+    description_col = next((col for col in df.columns if col.lower() in [c.lower() for c in possible_description_columns]), None)
+    location_col = next((col for col in df.columns if col.lower() in [c.lower() for c in possible_location_columns]), None)
+    count_col = next((col for col in df.columns if col.lower() in [c.lower() for c in possible_count_columns]), None)
+    
+    # Check specifically for 'Brand & Description' column which combines brand and description
+    brand_and_desc_col = next((col for col in df.columns if col in ['Brand & Description', 'Brand and Description']), None)
+    
+    # If not found, try partial match as a fallback
+    if description_col is None:
+        for col in df.columns:
+            if any(term in col.lower() for term in ['desc', 'name', 'product', 'item', 'title', 'article']):
+                description_col = col
+                break
+    
+    if count_col is None:
+        # First try partial name matching
+        for col in df.columns:
+            if any(term in col.lower() for term in ['count', 'qty', 'quant', 'stock', 'amount', 'unit', 'invent', 'par', 'level', 'number', 'vol']):
+                count_col = col
+                break
+        
+        # If still not found, try to find any numeric column as a last resort
+        if count_col is None:
+            for col in df.columns:
+                try:
+                    # Check if column has numeric values
+                    if pd.to_numeric(df[col], errors='coerce').notna().any():
+                        # Use the first mostly-numeric column we find
+                        if pd.to_numeric(df[col], errors='coerce').notna().mean() > 0.5:  # More than 50% are numbers
+                            count_col = col
+                            notify("info", f"Using '{col}' as the quantity column based on numeric content")
+                            break
+                except:
+                    continue
+    
+    # Special handling for "Brand & Description" column
+    # If we have this column, we should split it into brand and description
+    # Look for any column containing both 'brand' and 'description' in any case
+    brand_and_desc_cols = [col for col in df.columns if 'brand' in col.lower() and ('description' in col.lower() or 'desc' in col.lower())]
+    brand_and_desc_col = None
+    
+    if brand_and_desc_cols:
+        # Use the first matching column
+        brand_and_desc_col = brand_and_desc_cols[0]
+        notify("info", f"Found '{brand_and_desc_col}' column - splitting into brand and description components")
+        
+        # First, keep the full text for searching (critical for our search function)
+        df['combined_search_field'] = df[brand_and_desc_col].fillna("").astype(str)
+        
+        # Ensure Brand & Description is available for search
+        df['Brand & Description'] = df[brand_and_desc_col].fillna("").astype(str)
+        
+        # Assuming format is "Brand - Description" or just the description
+        try:
+            # Try to split by dash with brand before the dash
+            df['brand_extracted'] = df[brand_and_desc_col].str.split('-', n=1).str[0].str.strip()
+            df['description_extracted'] = df[brand_and_desc_col].str.split('-', n=1).str[1].str.strip()
+            
+            # If we have null values in description, it means there was no dash
+            # In that case, use the whole field as description
+            mask = df['description_extracted'].isna()
+            df.loc[mask, 'description_extracted'] = df.loc[mask, brand_and_desc_col]
+            df.loc[mask, 'brand_extracted'] = "Unknown"
+            
+            # Set our columns
+            brand_col = 'brand_extracted'
+            description_col = 'description_extracted'
+        except:
+            # If split fails, just use the whole column as description
+            df['description_extracted'] = df[brand_and_desc_col]
+            df['brand_extracted'] = "Unknown"
+            brand_col = 'brand_extracted'
+            description_col = 'description_extracted'
+    
+    # Check if we have product_name or description - we can work with either
+    has_product_name = False
+    if 'product_name' in df.columns and description_col is None:
+        description_col = 'product_name'
+        has_product_name = True
+    
+    # Handle missing brand by using a default value
+    if brand_col is None and description_col is not None:
+        df['brand'] = "Unknown"
+        brand_col = 'brand'
+    
+    # Check if we have sufficient columns to work with
+    missing_types = []
+    if id_col is None:
+        # If no ID column, we'll create one using row numbers
+        df['product_id'] = [f"P{i+1:03d}" for i in range(len(df))]
+        id_col = 'product_id'
+    
+    # Description is required - we can't reasonably create this
+    if description_col is None:
+        missing_types.append("description or product name")
+    
+    # Location is optional, we can use "Unknown" as default
+    if location_col is None:
+        df['location'] = "Unknown"
+        location_col = 'location'
+    
+    # Expected count is required
+    if count_col is None:
+        missing_types.append("expected count or quantity")
+    
+    # Make sure we preserve the [E]Close SC column if it exists
+    if close_sc_col is not None and close_sc_col != count_col:
+        # Keep it for export later
+        df['[E]Close SC_preserved'] = df[close_sc_col]
+    
+    if missing_types:
+        return False, f"Required column types missing: {', '.join(missing_types)}. At minimum, please include columns for description/name and expected count."
+    
+    # Map the found columns to our expected column names
+    df_mapped = df.copy()
+    rename_dict = {
+        id_col: 'product_id',
+        location_col: 'location',
+        count_col: 'expected_count'
+    }
+    
+    if not has_product_name:
+        rename_dict[description_col] = 'description'
+        if brand_col != 'brand':  # Don't remap if we created it above
+            rename_dict[brand_col] = 'brand'
+    else:
+        # If we're using product_name as description, no need to rename
+        df_mapped['description'] = df_mapped[description_col]
+    
+    df_mapped.rename(columns=rename_dict, inplace=True)
+    
+    # Create product_name field by combining brand and description if needed
+    if 'product_name' not in df_mapped.columns:
+        df_mapped['product_name'] = df_mapped['brand'] + ' - ' + df_mapped['description']
+    
+    # Make sure we preserve the combined search field if it exists
+    if 'combined_search_field' in df.columns:
+        df_mapped['combined_search_field'] = df['combined_search_field']
+    
+    # Always create or preserve Brand & Description field for searching
+    if 'Brand & Description' in df.columns:
+        df_mapped['Brand & Description'] = df['Brand & Description']
+    elif 'combined_search_field' in df_mapped.columns:
+        df_mapped['Brand & Description'] = df_mapped['combined_search_field']
+    else:
+        # Create a combined field for display and search
+        df_mapped['Brand & Description'] = df_mapped['brand'] + ' - ' + df_mapped['description']
+    
+    # Check data types
+    try:
+        # Handle PID and other non-numeric headers in the count column
+        # First try to detect header or comment rows if they exist
+        if count_col:
+            # Check for standard header terms
+            if str(df_mapped['expected_count'].iloc[0]).strip().upper() in ['PID', 'QTY', 'COUNT', 'QUANTITY']:
+                notify("info", f"Detected header row. Removing first row containing '{df_mapped['expected_count'].iloc[0]}'")
+                df_mapped = df_mapped.iloc[1:].reset_index(drop=True)
+            
+            # Check for comment row containing "Do not delete or edit"
+            comment_rows = []
+            for i, val in enumerate(df_mapped['expected_count']):
+                if isinstance(val, str) and "do not delete" in val.lower():
+                    comment_rows.append(i)
+                    notify("info", f"Found comment row at index {i}: '{val}'")
+            
+            # Remove any detected comment rows
+            if comment_rows:
+                df_mapped = df_mapped.drop(comment_rows).reset_index(drop=True)
+                notify("success", f"Removed {len(comment_rows)} comment row(s) from the data")
+        
+        # Now handle any remaining non-numeric values in the expected_count
+        try:
+            # Convert expected_count to numeric
+            df_mapped['expected_count'] = pd.to_numeric(df_mapped['expected_count'], errors='coerce')
+            
+            # Check if we have NaN values after conversion
+            if df_mapped['expected_count'].isna().any():
+                # If some values couldn't be converted, drop those rows
+                na_count = df_mapped['expected_count'].isna().sum()
+                notify("warning", f"Removed {na_count} rows with non-numeric expected counts")
+                df_mapped = df_mapped.dropna(subset=['expected_count']).reset_index(drop=True)
+                
+                # If we dropped all rows, that's an error
+                if len(df_mapped) == 0:
+                    return False, "No valid rows remaining after removing non-numeric count values."
+        except Exception as e:
+            return False, f"Error converting expected counts to numbers: {str(e)}"
+        
+        # Ensure product_id is unique
+        if df_mapped['product_id'].duplicated().any():
+            return False, "Duplicate product IDs found. Each product ID must be unique."
+        
+        return True, df_mapped
+    except Exception as e:
+        return False, f"Error validating data: {str(e)}"
@@ -0,0 +1,90 @@
+"""
+Recording count entries.
+
+Every entry a counter adds goes to the per-product count log, the columnar
+count ledger the reports and variance engine read, the running per-session
+totals and the historical counts, and marks the product as counted in the
+current count session. The functions take the session state (or any object
+with the same attributes) so they can run outside a Streamlit script.
+"""
+from datetime import datetime
+
+
+# Function to add a count entry with historical tracking
+def add_count_entry(state, product_id, count_value, count_location, count_note):
+    # Initialize product in count_data if it doesn't exist
+    if product_id not in state.count_data:
+        state.count_data[product_id] = []
+    
+    # Initialize product in historical_counts if it doesn't exist
+    if product_id not in state.historical_counts:
+        state.historical_counts[product_id] = []
+    
+    # Add timestamp to count entry
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    session_id = state.current_count_session["id"]
+    
+    # Create the count entry
+    count_entry = {
+        'count': count_value,
+        'location': count_location,
+        'timestamp': timestamp,
+        'session_id': session_id
+    }
+    
+    # Store entry in current count data
+    state.count_data[product_id].append(count_entry.copy())
+    
+    # Append the entry to the columnar ledger used for reports
+    state.count_ledger.append(product_id, count_value, count_location, timestamp, session_id)
+    
+    # Update this product's running total for the session
+    state.session_history.add(
+        product_id, session_id, state.current_count_session["name"], count_value, timestamp
+    )
+    
+    # Add to historical counts 
+    state.historical_counts[product_id].append({
+        'count': count_value,
+        'location': count_location,
+        'timestamp': timestamp,
+        'session_id': session_id,
+        'session_name': state.current_count_session["name"]
+    })
+    
+    # Keep track of which products have been counted in this session
+    product_info = None
+    
+    # Find the product details in the stock data
+    if state.stock_data is not None:
+        product_row = state.stock_data[state.stock_data['product_id'] == product_id]
+        if not product_row.empty:
+            product_info = {
+                'product_id': product_id,
+                'name': product_row['Brand & Description'].iloc[0],
+                'expected_count': product_row['expected_count'].iloc[0] if 'expected_count' in product_row else None
+            }
+    
+    # Add product to the current session's counted items if not already there
+    session_exists = False
+    for session in state.count_sessions:
+        if session['id'] == session_id:
+            session_exists = True
+            if product_info and product_id not in [p['product_id'] for p in session.get('products', [])]:
+                if 'products' not in session:
+                    session['products'] = []
+                session['products'].append(product_info)
+            break
+    
+    # If this is a new session, add it to the list
+    if not session_exists:
+        new_session = state.current_count_session.copy()
+        new_session['products'] = [product_info] if product_info else []
+        state.count_sessions.append(new_session)
+
+
+# Function to mark a product's count as complete (or not), which updates [E]Close SC in the export
+def set_count_complete(state, product_id, is_complete):
+    state.sc_closed[product_id] = is_complete
+    # Exports include the Count Complete flags, so cached exports must be invalidated
+    state.count_ledger.bump_version()
@@ -0,0 +1,153 @@
+"""
+Counted quantity by (product, location, session).
+
+LocationCube is folded forward from the count ledger the same way the
+variance engine is: only entries appended since the last refresh are
+applied. Alongside the cells it keeps every slice the UI asks for (one
+location in one session, one product across locations and sessions, the
+total of a location in a session, and how many of the products assigned to a
+room have been counted there), so each lookup is a single dict access
+instead of a scan over the entries. Catalog locations are resolved through
+the location registry, so items can be matched to rooms and shelves by any
+spelling the registry knows. Items assigned to a room that has shelves are
+complete once counted on any of its shelves; the room's summary row rolls up
+the counts of its shelves. The location summary export reads a snapshot of
+per-product totals by location, rebuilt only after new entries arrive.
+"""
+import pandas as pd
+
+
+def _room_key(location):
+    return str(location).strip().lower()
+
+
+class LocationCube:
+    """Incrementally maintained (product, location, session) aggregate."""
+    
+    def __init__(self, catalog, registry=None):
+        locations = catalog['location'] if 'location' in catalog else pd.Series('Unknown', index=catalog.index)
+        locations = locations.fillna('').astype(str)
+        if registry is not None:
+            # Resolve each distinct catalog location once, not once per row
+            locations = locations.map({location: registry.match(location, location) for location in locations.unique()})
+        room_keys = locations.str.strip().str.lower()
+        # Room each catalog item is stocked in, and how many items each room holds
+        self._room_of = dict(zip(catalog['product_id'], room_keys))
+        self._assigned = room_keys.value_counts().to_dict()
+        self._registry = registry
+        self._covering_keys = {}    # location -> room keys of the location and the registry rooms above it
+        
+        self._cells = {}            # (product_id, location, session_id) -> quantity
+        self._slices = {}           # (location, session_id) -> {product_id: quantity}
+        self._products = {}         # product_id -> {(location, session_id): quantity}
+        self._totals = {}           # session_id -> {location: quantity}
+        self._rooms = {}            # (room key, session_id) -> {product_id: quantity} at or below the room
+        self._room_totals = {}      # (room key, session_id) -> quantity at or below the room
+        self._assigned_counted = {} # (room key, session_id) -> assigned products counted at or below it
+        self._entries = {}          # product_id -> entries applied
+        self._location_totals = (-1, None)  # (entries applied, snapshot), replaced as one tuple
+        self.entries_applied = 0
+        # Locations and sessions in the order they were first counted
+        self.locations = {}
+        self.sessions = {}
+        self.rows_applied = 0
+    
+    def refresh(self, ledger):
+        """Fold in the ledger entries appended since the last refresh."""
+        for row in range(self.rows_applied, len(ledger)):
+            self.add(ledger.product_ids[row], ledger.location_at(row), ledger.session_ids[row], ledger.counts[row])
+        self.rows_applied = len(ledger)
+    
+    def add(self, product_id, location, session_id, count):
+        """Apply one count entry to every maintained slice."""
+        self.locations.setdefault(location, None)
+        self.sessions.setdefault(session_id, None)
+        self._entries[product_id] = self._entries.get(product_id, 0) + 1
+        self.entries_applied += 1
+        
+        location_slice = self._slices.setdefault((location, session_id), {})
+        location_slice[product_id] = location_slice.get(product_id, 0.0) + count
+        
+        for key in self._covering(location):
+            room_slice = self._rooms.setdefault((key, session_id), {})
+            if product_id not in room_slice:
+                room_slice[product_id] = 0.0
+                if self._room_of.get(product_id) == key:
+                    self._assigned_counted[(key, session_id)] = self._assigned_counted.get((key, session_id), 0) + 1
+            room_slice[product_id] += count
+            self._room_totals[(key, session_id)] = self._room_totals.get((key, session_id), 0.0) + count
+        
+        cell = (product_id, location, session_id)
+        self._cells[cell] = self._cells.get(cell, 0.0) + count
+        product_slice = self._products.setdefault(product_id, {})
+        product_slice[(location, session_id)] = product_slice.get((location, session_id), 0.0) + count
+        session_totals = self._totals.setdefault(session_id, {})
+        session_totals[location] = session_totals.get(location, 0.0) + count
+    
+    def _covering(self, location):
+        keys = self._covering_keys.get(location)
+        if keys is None:
+            code = self._registry.code_of(location) if self._registry is not None else None
+            if code is None:
+                keys = [_room_key(location)]
+            else:
+                labels = self._registry.labels
+                keys = [_room_key(labels[node]) for node in self._registry.ancestors_of(code) if node in labels]
+            self._covering_keys[location] = keys
+        return keys
+    
+    def cell(self, product_id, location, session_id):
+        return self._cells.get((product_id, location, session_id), 0.0)
+    
+    def location_slice(self, location, session_id):
+        """{product_id: quantity} counted at a location in a session. Treat as read-only."""
+        return self._slices.get((location, session_id), {})
+    
+    def product_slice(self, product_id):
+        """{(location, session_id): quantity} for one product. Treat as read-only."""
+        return self._products.get(product_id, {})
+    
+    def location_totals(self):
+        """
+        {product_id: ({location: quantity across sessions}, entries)} as of the
+        entries applied so far. The snapshot is rebuilt only after new entries
+        and never changed afterwards, so an export can read it on another
+        thread while counting goes on.
+        """
+        applied, totals = self._location_totals
+        if applied != self.entries_applied:
+            totals = {}
+            for product_id, product_slice in self._products.items():
+                by_location = {}
+                for (location, _), quantity in product_slice.items():
+                    by_location[location] = by_location.get(location, 0.0) + quantity
+                totals[product_id] = (by_location, self._entries[product_id])
+            self._location_totals = (self.entries_applied, totals)
+        return totals
+    
+    def location_total(self, location, session_id):
+        return self._totals.get(session_id, {}).get(location, 0.0)
+    
+    def session_totals(self, session_id):
+        """{location: quantity} counted in a session. Treat as read-only."""
+        return self._totals.get(session_id, {})
+    
+    def completion(self, location, session_id):
+        """(assigned products counted at or below the location, products assigned to it) for a session."""
+        key = _room_key(location)
+        return self._assigned_counted.get((key, session_id), 0), self._assigned.get(key, 0)
+    
+    def session_summary(self, session_id, locations=()):
+        """One row per location with quantity, products counted and completion for a session."""
+        rooms = list(dict.fromkeys(list(locations) + list(self.locations)))
+        rows = []
+        for location in rooms:
+            counted, assigned = self.completion(location, session_id)
+            rows.append({
+                'Location': location,
+                'Products Counted': len(self._rooms.get((_room_key(location), session_id), {})),
+                'Quantity': self._room_totals.get((_room_key(location), session_id), 0.0),
+                'Assigned Items': assigned,
+                'Completion': counted / assigned if assigned else 0.0,
+            })
+        return pd.DataFrame(rows, columns=['Location', 'Products Counted', 'Quantity', 'Assigned Items', 'Completion'])
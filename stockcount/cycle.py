@@ -0,0 +1,137 @@
+"""
+ABC cycle counting: count the items that matter every session and a sample
+of the rest.
+
+Catalog rows are ranked by a score, stock value (expected quantity times
+unit value) or velocity (how much the counted total moves between sessions),
+and split Pareto-style: class A holds the items making up the first 80% of
+the total score, B the next 15% and C the remainder. A is counted in full.
+B and C are sampled at random, with sample sizes from the usual formula for
+estimating a population total:
+
+    n0 = (z * N * sigma / E) ** 2,    n = n0 / (1 + n0 / N)
+
+where sigma is the expected spread of the per-item error (a prior error rate
+times the class's RMS item value) and E is the class's share of the allowed
+margin on total variance, with a floor of MIN_SAMPLE_ITEMS per class. The sample is seeded by session, so a different
+part of the tail is counted each week.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+ABC_CLASSES = ('A', 'B', 'C')
+
+# Cumulative score share where class A and class B end
+A_SHARE = 0.80
+B_SHARE = 0.95
+
+# Allowed error on the estimated total variance, as a share of total stock value
+DEFAULT_TOLERANCE = 0.02
+# Prior standard deviation of an item's count error, as a share of its value
+DEFAULT_ERROR_RATE = 0.10
+# Two-sided 95% confidence
+DEFAULT_Z = 1.96
+# Smallest sample taken from a class, so its error estimate isn't based on a handful of items
+MIN_SAMPLE_ITEMS = 30
+
+
+def classify_abc(scores, a_share=A_SHARE, b_share=B_SHARE):
+    """Class letter for every row by cumulative share of `scores`."""
+    scores = np.asarray(scores, dtype=float)
+    classes = np.full(len(scores), 'C', dtype='<U1')
+    total = scores.sum()
+    if total <= 0:
+        return classes
+    
+    order = np.argsort(-scores, kind='stable')
+    # Share of the total held by everything ranked above each item
+    share_before = (np.cumsum(scores[order]) - scores[order]) / total
+    classes[order[share_before < b_share]] = 'B'
+    classes[order[share_before < a_share]] = 'A'
+    return classes
+
+
+def sample_size(population, sigma, margin, z=DEFAULT_Z):
+    """Items to sample from `population` so the estimated total is within `margin`."""
+    if population == 0:
+        return 0
+    if margin <= 0:
+        return population
+    if sigma <= 0:
+        return 0
+    n0 = (z * population * sigma / margin) ** 2
+    n = max(np.ceil(n0 / (1 + n0 / population)), MIN_SAMPLE_ITEMS)
+    return int(min(population, n))
+
+
+class CyclePlan:
+    """Which catalog rows to count this session."""
+    
+    def __init__(self, scores, values, session_id, tolerance=DEFAULT_TOLERANCE,
+                 error_rate=DEFAULT_ERROR_RATE, z=DEFAULT_Z):
+        values = np.asarray(values, dtype=float)
+        self.classes = classify_abc(scores)
+        self.selected = self.classes == 'A'
+        self.tolerance = tolerance
+        
+        # B and C share the allowed margin equally in variance terms
+        total_margin = tolerance * values.sum()
+        class_margin = total_margin / np.sqrt(2)
+        
+        seed = int(hashlib.sha1(str(session_id).encode()).hexdigest()[:8], 16)
+        rng = np.random.default_rng(seed)
+        
+        self.sample_sizes = {'A': int(self.selected.sum())}
+        for abc_class in ('B', 'C'):
+            members = np.flatnonzero(self.classes == abc_class)
+            if not len(members):
+                self.sample_sizes[abc_class] = 0
+                continue
+            sigma = error_rate * np.sqrt(np.mean(values[members] ** 2))
+            size = sample_size(len(members), sigma, class_margin, z)
+            self.selected[rng.choice(members, size=size, replace=False)] = True
+            self.sample_sizes[abc_class] = size
+    
+    def __len__(self):
+        return int(self.selected.sum())
+    
+    @property
+    def effort_saving(self):
+        """Share of catalog items not counted this session."""
+        return 1 - len(self) / len(self.classes) if len(self.classes) else 0.0
+    
+    def summary(self):
+        rows = []
+        for abc_class in ABC_CLASSES:
+            population = int((self.classes == abc_class).sum())
+            rows.append({
+                'Class': abc_class,
+                'Items': population,
+                'To Count': self.sample_sizes.get(abc_class, 0),
+                'Coverage': self.sample_sizes.get(abc_class, 0) / population if population else 0.0,
+            })
+        return pd.DataFrame(rows, columns=['Class', 'Items', 'To Count', 'Coverage'])
+    
+    def estimate_total_variance(self, item_variance, is_counted, z=DEFAULT_Z):
+        """
+        Estimated catalog-wide variance (in the same units as item_variance)
+        and its margin of error, scaling each class up from the items counted
+        so far. The margin is infinite until every class has at least two
+        counted items.
+        """
+        estimate, error_variance = 0.0, 0.0
+        for abc_class in ABC_CLASSES:
+            members = self.classes == abc_class
+            counted = members & self.selected & is_counted
+            population, sampled = int(members.sum()), int(counted.sum())
+            if not population:
+                continue
+            if sampled < min(2, population):
+                return estimate, np.inf
+            observed = item_variance[counted]
+            estimate += population * observed.mean()
+            if sampled < population:
+                error_variance += (population ** 2) * observed.var(ddof=1) / sampled * (1 - sampled / population)
+        return estimate, z * np.sqrt(error_variance)
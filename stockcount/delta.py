@@ -0,0 +1,56 @@
+"""
+Delta exports: only the products whose counted total changed since the last
+export.
+
+Each export records a watermark, the ledger version it was built from. Ledger
+entries carry the version they were appended at, so the entries after a
+watermark are a suffix of the ledger found by binary search. The changed set,
+and so the patch, grows with counting activity rather than catalog size.
+"""
+import time
+
+
+class ExportWatermark:
+    """Ledger version and catalog of the last export sent to the stock system."""
+    
+    def __init__(self):
+        self.version = 0
+        self.catalog_hash = None
+        self.exported_at = None
+    
+    def since(self, catalog_hash):
+        """Version to diff from; a different catalog means nothing was exported yet."""
+        return self.version if catalog_hash == self.catalog_hash else 0
+    
+    def record(self, catalog_hash, version):
+        self.version = version
+        self.catalog_hash = catalog_hash
+        self.exported_at = time.time()
+    
+    def reset(self):
+        self.version = 0
+        self.exported_at = None
+
+
+# Function to find the products whose total changed in the entries from row `start` on
+def changed_totals(entries, start):
+    """
+    Return the current total of every product whose counted total changed in
+    entries[start:], indexed by product_id, plus the change since the watermark.
+    """
+    import pandas as pd
+    
+    recent = entries.iloc[start:]
+    change = recent.groupby('product_id', sort=False)['count'].sum()
+    # Zero-quantity entries add a row to the ledger but don't change the total
+    change = change[change != 0]
+    
+    history = entries[entries['product_id'].isin(change.index)]
+    totals = history.groupby('product_id', sort=False)['count'].sum()
+    return pd.DataFrame({'Count': totals.reindex(change.index), 'Change': change})
+
+
+# Function to build the compact patch format: one row per changed product
+def patch_frame(changed):
+    patch = changed.reset_index().rename(columns={'product_id': 'Product ID'})
+    return patch[['Product ID', 'Count', 'Change']]
@@ -0,0 +1,67 @@
+"""
+Differences between two count sessions.
+
+The per-product totals of both sessions come out of a single grouped pass
+over the ledger, with one column per session, so statuses and deltas are
+computed as whole-column operations instead of by walking each session's
+product lists.
+"""
+import numpy as np
+import pandas as pd
+
+# Status of a product between the baseline and the compared session
+ADDED = "Added"
+MISSING = "Missing"
+INCREASED = "Increased"
+DECREASED = "Decreased"
+UNCHANGED = "Unchanged"
+
+DIFF_STATUSES = [ADDED, MISSING, INCREASED, DECREASED, UNCHANGED]
+
+
+def diff_sessions(entries, baseline_session, compare_session, include_unchanged=False):
+    """
+    Compare the per-product totals of two sessions in the ledger.
+    
+    Returns a DataFrame indexed by product_id with the Baseline and Compare
+    totals (NaN where the product wasn't counted), the Change between them and
+    a Status. A product counted only in the compared session is Added; one
+    counted only in the baseline is Missing. Comparing a session with itself
+    raises ValueError.
+    """
+    if baseline_session == compare_session:
+        raise ValueError("Choose two different sessions to compare.")
+    pair = entries[entries['session_id'].isin([baseline_session, compare_session])]
+    totals = (
+        pair.groupby(['product_id', 'session_id'], sort=False)['count'].sum()
+        .unstack('session_id')
+        .reindex(columns=[baseline_session, compare_session])
+    )
+    baseline = totals[baseline_session].to_numpy(dtype=float)
+    compare = totals[compare_session].to_numpy(dtype=float)
+    
+    in_baseline = ~np.isnan(baseline)
+    in_compare = ~np.isnan(compare)
+    change = np.nan_to_num(compare) - np.nan_to_num(baseline)
+    
+    status = np.select(
+        [~in_baseline, ~in_compare, change > 0, change < 0],
+        [ADDED, MISSING, INCREASED, DECREASED],
+        default=UNCHANGED,
+    )
+    
+    diff = pd.DataFrame({
+        'Baseline': baseline,
+        'Compare': compare,
+        'Change': change,
+        'Status': status,
+    }, index=totals.index.rename('product_id'))
+    
+    if not include_unchanged:
+        diff = diff[diff['Status'] != UNCHANGED]
+    return diff
+
+
+def diff_summary(diff):
+    """Number of products in each status, in DIFF_STATUSES order."""
+    return diff['Status'].value_counts().reindex(DIFF_STATUSES, fill_value=0)
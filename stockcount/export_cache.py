@@ -0,0 +1,62 @@
+"""
+Cache of finished export files.
+
+Exports are keyed by (catalog hash, ledger version, report type). While no
+count or Count Complete flag changes, the ledger version stays the same and a
+repeat export is served from memory. Only the most recent few versions are
+kept, since older ones can never be requested again once the counts move on.
+"""
+import threading
+from collections import OrderedDict
+
+# Number of (catalog, ledger version) generations kept by default
+DEFAULT_MAX_VERSIONS = 3
+
+
+class ExportCache:
+    """Bounded store of export bytes, safe to use from the download thread."""
+    
+    def __init__(self, max_versions=DEFAULT_MAX_VERSIONS):
+        self.max_versions = max_versions
+        # (catalog_hash, ledger_version) -> {report_type: bytes}, oldest first
+        self._generations = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self):
+        with self._lock:
+            return sum(len(reports) for reports in self._generations.values())
+    
+    def get(self, catalog_hash, ledger_version, report_type):
+        """Return the cached export, or None if it hasn't been built."""
+        generation = (catalog_hash, ledger_version)
+        with self._lock:
+            reports = self._generations.get(generation)
+            if reports is None or report_type not in reports:
+                self.misses += 1
+                return None
+            self._generations.move_to_end(generation)
+            self.hits += 1
+            return reports[report_type]
+    
+    def put(self, catalog_hash, ledger_version, report_type, data):
+        """Store an export, evicting the least recently used generations."""
+        generation = (catalog_hash, ledger_version)
+        with self._lock:
+            self._generations.setdefault(generation, {})[report_type] = data
+            self._generations.move_to_end(generation)
+            while len(self._generations) > self.max_versions:
+                self._generations.popitem(last=False)
+    
+    def get_or_build(self, catalog_hash, ledger_version, report_type, build):
+        """Return the cached export, calling build() to create it on a miss."""
+        data = self.get(catalog_hash, ledger_version, report_type)
+        if data is None:
+            data = build()
+            self.put(catalog_hash, ledger_version, report_type, data)
+        return data
+    
+    def clear(self):
+        with self._lock:
+            self._generations.clear()
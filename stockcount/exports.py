@@ -0,0 +1,327 @@
+"""
+Building the export files.
+
+The standard and counted-only exports rewrite the uploaded CSV with the
+counts, the other reports come from the count ledger through reports.py, and
+bundles pack several of them into one archive. Every prepare_* function
+snapshots what it needs from the session state and returns a callable that
+builds the file later, on the download thread or in a background job.
+"""
+import csv
+import time
+from collections import Counter
+from io import StringIO
+
+from stockcount.bundles import write_bundle
+from stockcount.delta import changed_totals, patch_frame
+from stockcount.profiling import active_profiler, profiled_on
+from stockcount.reports import REPORT_BUILDERS, build_report
+
+# Number of CSV rows encoded per chunk when streaming an export
+EXPORT_CHUNK_ROWS = 5000
+
+
+# Function to encode CSV rows into byte chunks without building the whole file as a string
+def iter_csv_chunks(rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+    
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        
+        # Hand off a chunk and reuse the buffer once enough rows are written
+        if pending >= chunk_rows:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    
+    if pending:
+        yield buffer.getvalue().encode('utf-8')
+
+
+# Function to encode a report DataFrame as CSV byte chunks
+def iter_frame_chunks(frame, chunk_rows=EXPORT_CHUNK_ROWS):
+    for start in range(0, max(len(frame), 1), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0).encode('utf-8')
+
+
+# Function to join export chunks into one file, reporting progress after each chunk
+def collect_chunks(chunks, total_chunks, progress=None):
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        if progress is not None:
+            progress(len(parts), total_chunks, "Writing file")
+    return b"".join(parts)
+
+
+# Function to generate the rows of the export CSV from the original upload
+def iter_export_rows(csv_content, product_ids, count_data, report_type="standard", only_products=None):
+    """
+    Raw CSV manipulation to ensure [E]Close SC in row 2 of the CSV gets updated
+    with count values without adding any extra columns.
+    
+    If only_products is given, just the header rows and the rows of those
+    products are produced (used by delta exports).
+    
+    Works only on the values passed in (never st.session_state) because the
+    download button runs it on a separate thread when the user clicks.
+    """
+    # Parse the raw CSV content row by row
+    rows = csv.reader(StringIO(csv_content.strip()))
+    
+    # First row is the header (row 0), second row (row 1) should contain [E]Close SC
+    header_row = next(rows, None)
+    eclose_row = next(rows, None)
+    if header_row is None or eclose_row is None:
+        raise ValueError("CSV file doesn't have the expected format.")
+    
+    # Find the cell containing [E]Close SC in the second row
+    eclose_col = next((i for i, cell in enumerate(eclose_row) if '[E]Close SC' in cell), -1)
+    if eclose_col == -1:
+        raise ValueError("Cannot find [E]Close SC in row 2 of the CSV file.")
+    
+    # Find the column index for the count column (794438), using the [E]Close SC column if it is missing
+    count_col = next((i for i, cell in enumerate(header_row) if '794438' in cell), eclose_col)
+    
+    # Create a mapping of product_id to count value
+    product_counts = {}
+    for product_id, counts in count_data.items():
+        if counts and (only_products is None or product_id in only_products):
+            product_counts[product_id] = str(sum(entry['count'] for entry in counts))
+    
+    # Keep the header row and the original [E]Close SC row completely unchanged
+    yield header_row
+    yield eclose_row
+    
+    # Data rows (row 3 onwards) line up with the rows of the processed stock data
+    product_ids = list(product_ids)
+    counted_only = report_type == "counted" or only_products is not None
+    for i, row in enumerate(rows):
+        if i >= len(product_ids):
+            # Rows beyond the stock data are passed through (and left out of filtered reports)
+            if not counted_only:
+                yield row
+            continue
+        
+        product_id = product_ids[i]
+        if only_products is not None and product_id not in only_products:
+            continue
+        count_value = product_counts.get(product_id, "0")  # Set to 0 if not counted
+        
+        # Set count value in the 794438 column unless the row is malformed
+        if len(row) > max(count_col, eclose_col):
+            row[count_col] = count_value
+        
+        # Update the [E]Close SC column with the count value
+        while len(row) <= eclose_col:
+            row.append("")
+        row[eclose_col] = count_value
+        
+        # Handle filtered report for counted items only
+        if counted_only and product_id not in product_counts:
+            continue
+        yield row
+
+
+# Function to cut the per-product count log back to the first entries of the ledger
+def count_data_snapshot(count_data, ledger, rows):
+    """
+    Every count entry is appended to count_data and the ledger together, and
+    both only grow, so the first `rows` ledger entries tell how many of each
+    product's logged entries existed when the export was requested. Entries
+    added while the export is built are left out.
+    """
+    entries_per_product = Counter(ledger.product_ids[:rows])
+    return {product_id: count_data[product_id][:entries] for product_id, entries in entries_per_product.items()}
+
+
+# Function to snapshot the session data one export needs
+def export_chunk_source(state, report_type="standard"):
+    """
+    Capture what an export needs from the session and return a function that
+    yields (chunk iterator, number of chunks). The function works only on the
+    captured values, so it can run on the download thread or a background job.
+    Its optional progress(done, total, phase) callback hears when a report
+    starts building, which can take longer than writing it out.
+    """
+    # Reports built from the count ledger (or the location cube) and the stock data
+    if report_type in REPORT_BUILDERS:
+        ledger = state.count_ledger
+        ledger_rows = len(ledger)  # Entries appended after this point are left out
+        catalog = state.stock_data
+        closed = dict(state.sc_closed)
+        if report_type == "location_summary":
+            # The cube's snapshot is taken here, on the script thread, at the same ledger row
+            state.location_cube.refresh(ledger)
+            location_totals = state.location_cube.location_totals()
+            source = lambda: location_totals
+        else:
+            source = lambda: ledger.to_frame(ledger_rows)
+        
+        def report_chunks(progress=None):
+            if progress is not None:
+                progress(0, 1, f"Building {report_type.replace('_', ' ')} report")
+            report = build_report(report_type, source(), catalog, closed)
+            return iter_frame_chunks(report), max(-(-len(report) // EXPORT_CHUNK_ROWS), 1)
+        
+        return report_chunks
+    
+    # Standard and counted-only exports rewrite the original CSV
+    csv_content = state.raw_csv_content
+    product_ids = state.stock_data['product_id']
+    count_data = state.count_data
+    ledger = state.count_ledger
+    ledger_rows = len(ledger)
+    
+    def csv_chunks(progress=None):
+        counts = count_data_snapshot(count_data, ledger, ledger_rows)
+        rows = iter_export_rows(csv_content, product_ids, counts, report_type)
+        return iter_csv_chunks(rows), -(-(len(product_ids) + 2) // EXPORT_CHUNK_ROWS)
+    
+    return csv_chunks
+
+
+# Function to prepare final data for export
+def prepare_export_data(state, report_type="standard", export_seconds=None, record_watermark=True):
+    """
+    Snapshot what an export needs from the session and return a callable that
+    builds the CSV file. Nothing is generated until the callable runs, which
+    st.download_button only does when the user clicks it.
+    
+    Built files are cached by (catalog hash, ledger version, report type), so
+    exporting again before any count changes costs nothing.
+    
+    The callable takes an optional progress(done, total, phase) callback,
+    which the background export jobs use to drive their progress bars. Build
+    times are observed on the export_seconds histogram when one is given, and
+    recorded as the prepare_export_data phase of the session's profiler,
+    whichever thread runs the build.
+    
+    Serving the standard report moves the delta watermark. Background jobs
+    build it ahead of any download, so they pass record_watermark=False and
+    move it with export_served_callback when the file is downloaded.
+    """
+    if state.stock_data is None or not state.raw_csv_content:
+        return None
+    
+    export_cache = state.export_cache
+    export_watermark = state.export_watermark
+    catalog_hash = state.catalog_hash
+    ledger_version = state.count_ledger.version
+    chunk_source = export_chunk_source(state, report_type)
+    
+    @profiled_on(active_profiler(), "prepare_export_data")
+    def build_export(progress=None):
+        started = time.perf_counter()
+        chunks, total_chunks = chunk_source(progress)
+        data = collect_chunks(chunks, total_chunks, progress)
+        if export_seconds is not None:
+            export_seconds.observe(time.perf_counter() - started, report_type=report_type)
+        return data
+    
+    def cached_export(progress=None):
+        data = export_cache.get_or_build(catalog_hash, ledger_version, report_type, lambda: build_export(progress))
+        # The standard report is what goes to the stock system, so later deltas start from here
+        if record_watermark and report_type == "standard":
+            export_watermark.record(catalog_hash, ledger_version)
+        return data
+    
+    return cached_export
+
+
+# Function to capture the delta watermark move for an export built ahead of its download
+def export_served_callback(state, report_type="standard"):
+    """
+    Return a callable that records the export watermark at the current ledger
+    version, to run when the export is served; None for reports that don't
+    go to the stock system.
+    """
+    if report_type != "standard":
+        return None
+    export_watermark = state.export_watermark
+    catalog_hash = state.catalog_hash
+    ledger_version = state.count_ledger.version
+    return lambda: export_watermark.record(catalog_hash, ledger_version)
+
+
+# Function to prepare an export of only the products whose count changed since the last export
+def prepare_delta_export(state, delta_format="original"):
+    """
+    Return a callable building a delta export against the export watermark.
+    
+    "original" keeps the uploaded file's layout (header rows plus the changed
+    product rows); "patch" is a compact Product ID, Count, Change CSV. Building
+    the delta moves the watermark up to the current ledger version.
+    """
+    if state.stock_data is None or not state.raw_csv_content:
+        return None
+    
+    ledger = state.count_ledger
+    export_cache = state.export_cache
+    export_watermark = state.export_watermark
+    catalog_hash = state.catalog_hash
+    ledger_version = ledger.version
+    since_version = export_watermark.since(catalog_hash)
+    start_row = ledger.first_row_after(since_version)
+    ledger_rows = len(ledger)
+    csv_content = state.raw_csv_content
+    product_ids = state.stock_data['product_id']
+    count_data = state.count_data
+    
+    def build_delta():
+        changed = changed_totals(ledger.to_frame(ledger_rows), start_row)
+        if delta_format == "patch":
+            return b"".join(iter_frame_chunks(patch_frame(changed)))
+        counts = count_data_snapshot(count_data, ledger, ledger_rows)
+        rows = iter_export_rows(csv_content, product_ids, counts, only_products=set(changed.index))
+        return b"".join(iter_csv_chunks(rows))
+    
+    def cached_delta():
+        data = export_cache.get_or_build(catalog_hash, ledger_version, f"delta:{delta_format}:{since_version}", build_delta)
+        export_watermark.record(catalog_hash, ledger_version)
+        return data
+    
+    return cached_delta
+
+
+# File name of each report inside an export bundle
+BUNDLE_MEMBER_NAMES = {
+    "standard": "inventory_report.csv",
+    "counted": "counted_items.csv",
+    "detailed": "detailed_count_log.csv",
+    "location_summary": "location_summary.csv",
+    "compliance": "compliance_report.csv",
+}
+
+
+# Function to prepare a compressed bundle of several reports
+def prepare_bundle_export(state, report_types, bundle_format="zip"):
+    """
+    Like prepare_export_data, but the callable packs every requested report
+    into one zip or tar.gz archive, compressing each report as it is generated.
+    """
+    if state.stock_data is None or not state.raw_csv_content:
+        return None
+    
+    export_cache = state.export_cache
+    catalog_hash = state.catalog_hash
+    ledger_version = state.count_ledger.version
+    cache_key = f"bundle:{bundle_format}:{'+'.join(report_types)}"
+    chunk_sources = [(BUNDLE_MEMBER_NAMES[report_type], export_chunk_source(state, report_type)) for report_type in report_types]
+    
+    def build_bundle(progress=None):
+        members = []
+        total_chunks = 0
+        for name, chunk_source in chunk_sources:
+            chunks, member_chunks = chunk_source(progress)
+            members.append((name, chunks))
+            total_chunks += member_chunks
+        return write_bundle(bundle_format, members, total_chunks, progress)
+    
+    return lambda progress=None: export_cache.get_or_build(
+        catalog_hash, ledger_version, cache_key, lambda: build_bundle(progress)
+    )
@@ -0,0 +1,84 @@
+"""
+Per-product count session history.
+
+SessionHistory keeps one running aggregate per (product, count session):
+total counted, number of entries and first/last entry timestamps. It is
+updated as each count arrives, so the history section of a product only reads
+a handful of precomputed rows instead of regrouping every historical entry on
+each rerun.
+"""
+
+
+class SessionTotal:
+    """Aggregate of one product's entries within one count session."""
+    
+    __slots__ = ('session_id', 'name', 'total', 'entries', 'first_timestamp', 'last_timestamp')
+    
+    def __init__(self, session_id, name, timestamp):
+        self.session_id = session_id
+        self.name = name
+        self.total = 0.0
+        self.entries = 0
+        self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+
+
+class SessionHistory:
+    """(product, session) aggregate table maintained incrementally."""
+    
+    def __init__(self):
+        self._totals = {}  # (product_id, session_id) -> SessionTotal
+        # product_id -> its sessions in the order they were first counted (oldest first)
+        self._sessions = {}
+        self._entry_counts = {}
+        # session_id -> {product_id: SessionTotal}
+        self._by_session = {}
+    
+    def add(self, product_id, session_id, session_name, count, timestamp):
+        """Fold one count entry into its (product, session) row."""
+        key = (product_id, session_id)
+        row = self._totals.get(key)
+        if row is None:
+            row = SessionTotal(session_id, session_name, timestamp)
+            self._totals[key] = row
+            self._sessions.setdefault(product_id, []).append(row)
+            self._by_session.setdefault(session_id, {})[product_id] = row
+        row.total += count
+        row.entries += 1
+        row.last_timestamp = timestamp
+        self._entry_counts[product_id] = self._entry_counts.get(product_id, 0) + 1
+    
+    def entry_count(self, product_id):
+        """Number of count entries recorded for a product across all sessions."""
+        return self._entry_counts.get(product_id, 0)
+    
+    def get(self, product_id, session_id):
+        """The aggregate for one product in one session, or None."""
+        return self._totals.get((product_id, session_id))
+    
+    def session_totals(self, session_id):
+        """{product_id: total counted} for every product counted in a session."""
+        return {product_id: row.total for product_id, row in self._by_session.get(session_id, {}).items()}
+    
+    def sessions(self, product_id):
+        """A product's session aggregates, newest first."""
+        return self._sessions.get(product_id, [])[::-1]
+    
+    def latest_two(self, product_id):
+        """(current, previous) session aggregates for trend comparison, or None if fewer than two."""
+        sessions = self._sessions.get(product_id, [])
+        if len(sessions) < 2:
+            return None
+        return sessions[-1], sessions[-2]
+    
+    def frame(self, product_id):
+        """The product's sessions as the table shown in the history section."""
+        import pandas as pd
+        
+        sessions = self.sessions(product_id)
+        return pd.DataFrame({
+            'Session': [row.name for row in sessions],
+            'Total Count': [row.total for row in sessions],
+            'Count Entries': [row.entries for row in sessions],
+            'Date/Time': [row.first_timestamp for row in sessions],
+        })
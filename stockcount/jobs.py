@@ -0,0 +1,153 @@
+"""
+Background export jobs.
+
+Large exports run on a shared thread pool instead of inside the button
+handler, so the page script (and the counting UI) keeps responding while the
+file is built. Each job exposes a progress fraction and the phase it is in
+(building a report, writing the file) for the page to poll, and can be
+cancelled: the build function reports progress through ExportJob.report, which
+raises JobCancelled once cancellation has been requested.
+
+A job can carry an on_served callback, run each time its finished file is
+handed to the download button (standard exports use it to move the delta
+watermark only once the file actually leaves the app).
+
+Finished files are held in memory until they expire or are dismissed, and
+each session keeps at most MAX_RESULTS_PER_OWNER of them; submitting another
+export forgets that session's oldest finished jobs.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Finished jobs are forgotten this long after they complete
+JOB_TTL_SECONDS = 30 * 60
+
+# Finished jobs (and their files) kept per session before the oldest are forgotten
+MAX_RESULTS_PER_OWNER = 3
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    """Raised inside a build function when its job has been cancelled."""
+
+
+class ExportJob:
+    """State of one background export, shared between the worker and the page."""
+    
+    def __init__(self, label, file_name, owner=None, on_served=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.file_name = file_name
+        self.owner = owner
+        self.on_served = on_served
+        self.status = QUEUED
+        self.progress = 0.0
+        self.phase = "Queued"
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._cancel = threading.Event()
+    
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+    
+    def report(self, done, total, phase=None):
+        """Record progress from the build function; raises JobCancelled if cancelled."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        if phase is not None:
+            self.phase = phase
+        if total:
+            self.progress = min(done / total, 1.0)
+    
+    def download(self):
+        """The finished file, for the download button."""
+        if self.on_served is not None:
+            self.on_served()
+        return self.result
+    
+    def cancel(self):
+        self._cancel.set()
+        if self.status == QUEUED:
+            self.status = CANCELLED
+            self.finished = time.time()
+
+
+class ExportJobManager:
+    """Thread pool running export jobs, shared by every session in the process."""
+    
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, label, file_name, build, owner=None, on_served=None):
+        """
+        Queue build(progress) to run in the background and return its job.
+        
+        `build` receives the job's report method as its progress callback and
+        must return the export bytes. `owner` (the session id) caps how many
+        finished results one session holds on to. `on_served` runs whenever the
+        finished file is downloaded.
+        """
+        self._prune(owner)
+        job = ExportJob(label, file_name, owner, on_served)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, build)
+        return job
+    
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def discard(self, job_id):
+        """Cancel a job if it is still running and forget it."""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None:
+            job.cancel()
+    
+    def _run(self, job, build):
+        if job.status == CANCELLED:
+            return
+        job.status = RUNNING
+        job.phase = "Starting"
+        try:
+            job.result = build(job.report)
+            job.progress = 1.0
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+    
+    def _prune(self, owner=None):
+        # Drop jobs that finished long enough ago that nobody is waiting for them
+        cutoff = time.time() - JOB_TTL_SECONDS
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items() if job.finished is not None and job.finished < cutoff]
+            
+            # Make room for the owner's new job by forgetting its oldest finished ones
+            if owner is not None:
+                finished = sorted(
+                    (job for job in self._jobs.values() if job.owner == owner and job.finished is not None and job.id not in expired),
+                    key=lambda job: job.finished,
+                )
+                expired.extend(job.id for job in finished[:max(len(finished) - (MAX_RESULTS_PER_OWNER - 1), 0)])
+            
+            for job_id in expired:
+                del self._jobs[job_id]
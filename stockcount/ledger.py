@@ -0,0 +1,106 @@
+"""
+Columnar ledger of count entries.
+
+Every count entry is appended to a set of parallel columns rather than stored
+as one dict per entry. Reports turn the ledger into a DataFrame with a single
+constructor call instead of walking per-product lists of dicts.
+
+Locations are stored as small integer codes into a table of location names,
+so hundreds of bins cost four bytes per entry rather than a string reference.
+The codes are the ledger's own, not LocationRegistry codes: registry codes
+are renumbered whenever locations.toml is edited, and entries may name
+locations the registry doesn't know, so the ledger keeps the labels.
+
+The ledger also carries a monotonic version number. It goes up on every write
+that can change an export (count entries and Count Complete flags), so
+anything derived from the counts can be cached against it.
+"""
+import bisect
+from array import array
+
+# Column order of the DataFrame produced by CountLedger.to_frame
+LEDGER_COLUMNS = ['product_id', 'count', 'location', 'timestamp', 'session_id']
+
+
+class CountLedger:
+    """Append-only store of count entries, one list per column."""
+    
+    def __init__(self):
+        self.product_ids = []
+        self.counts = array('d')
+        self.location_codes = array('i')
+        self.location_names = []  # Code -> location label
+        self._location_index = {}
+        self.timestamps = []
+        self.session_ids = []
+        # Ledger version right after each entry was appended, ascending
+        self.entry_versions = array('q')
+        
+        # Bumped by every write to the counts or the Count Complete flags
+        self.version = 0
+        
+        # (number of entries covered, DataFrame), replaced as one tuple so threads never see a mismatched pair
+        self._frame_memo = (-1, None)
+    
+    def __len__(self):
+        return len(self.counts)
+    
+    def append(self, product_id, count, location, timestamp, session_id):
+        """Record one count entry."""
+        self.product_ids.append(product_id)
+        self.counts.append(float(count))
+        self.location_codes.append(self.location_code(location))
+        self.timestamps.append(timestamp)
+        self.session_ids.append(session_id)
+        self.version += 1
+        self.entry_versions.append(self.version)
+    
+    def location_code(self, location):
+        """Ledger-local code of a location label, assigning the next code to new ones."""
+        code = self._location_index.get(location)
+        if code is None:
+            code = len(self.location_names)
+            self._location_index[location] = code
+            self.location_names.append(location)
+        return code
+    
+    def location_at(self, row):
+        """Location label of one entry."""
+        return self.location_names[self.location_codes[row]]
+    
+    def bump_version(self):
+        """Mark a write that isn't a count entry, such as a Count Complete toggle."""
+        self.version += 1
+    
+    def first_row_after(self, version):
+        """Index of the first entry appended after the ledger reached `version`."""
+        return bisect.bisect_right(self.entry_versions, version)
+    
+    def to_frame(self, rows=None):
+        """
+        Return the first `rows` entries (default: all of them) as a DataFrame.
+        
+        Columns only ever grow, so a row limit taken on the script thread gives
+        a consistent snapshot even if entries are appended while an export is
+        being built on another thread.
+        """
+        if rows is None:
+            rows = len(self)
+        memo_rows, memo_frame = self._frame_memo
+        if rows == memo_rows:
+            return memo_frame
+        
+        # Imported here so an empty ledger can be created before pandas is loaded
+        import numpy as np
+        import pandas as pd
+        
+        frame = pd.DataFrame({
+            'product_id': self.product_ids[:rows],
+            'count': np.array(self.counts[:rows], dtype=float),
+            'location': np.array(self.location_names, dtype=object)[np.array(self.location_codes[:rows], dtype=np.intp)],
+            'timestamp': self.timestamps[:rows],
+            'session_id': self.session_ids[:rows],
+        }, columns=LEDGER_COLUMNS)
+        
+        self._frame_memo = (rows, frame)
+        return frame
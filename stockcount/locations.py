@@ -0,0 +1,186 @@
+"""
+Configurable location hierarchy: site -> room -> shelf.
+
+The registry is loaded from a TOML file (locations.toml next to the app, or
+the path in STOCKCOUNT_LOCATIONS):
+
+    [[sites]]
+    name = "Arc Bar"
+
+    [[sites.rooms]]
+    name = "Cellar"
+    shelves = ["Kegs", "Racking A", "Racking B"]
+
+Every node gets an integer code. Counts are recorded against leaves (a shelf,
+or a room without shelves); catalog rows may also name a room that has
+shelves, which then stands for the whole room. Each leaf's ancestors are precomputed as a padded
+code matrix, so rolling quantities up to rooms and sites is one scatter-add
+however many bins there are. Without a config file the registry holds the
+original five rooms in a single site, so labels and exports are unchanged.
+"""
+import logging
+import os
+import tomllib
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCATIONS_PATH = "locations.toml"
+
+# Rooms used when no locations.toml is present
+DEFAULT_ROOMS = ["Bar 1", "Bar 2", "Store Room 1", "Store Room 2", "Cellar"]
+
+SITE, ROOM, SHELF = 0, 1, 2
+LEVEL_NAMES = {SITE: "Site", ROOM: "Room", SHELF: "Shelf"}
+
+
+class LocationRegistry:
+    """Tree of sites, rooms and shelves with integer codes."""
+    
+    def __init__(self, sites):
+        """`sites` is a list of {'name', 'rooms': [{'name', 'shelves': [...]}]} dicts."""
+        self.names = []
+        self.parents = []
+        self.levels = []
+        self.paths = []
+        
+        for site in sites:
+            site_code = self._add_node(site['name'], -1, SITE)
+            for room in site.get('rooms', []):
+                room_code = self._add_node(room['name'], site_code, ROOM)
+                for shelf in room.get('shelves', []):
+                    self._add_node(shelf, room_code, SHELF)
+        
+        self.parents = np.array(self.parents, dtype=np.int32)
+        self.levels = np.array(self.levels, dtype=np.int8)
+        
+        has_children = np.zeros(len(self.names), dtype=bool)
+        has_children[self.parents[self.parents >= 0]] = True
+        # Countable locations: shelves, and rooms that have no shelves
+        self.leaves = np.flatnonzero(~has_children & (self.levels > SITE))
+        
+        # Ancestor codes of every node (itself first), padded with -1
+        depth = int(self.levels.max()) + 1 if len(self.levels) else 1
+        self.ancestors = np.full((len(self.names), depth), -1, dtype=np.int32)
+        for code in range(len(self.names)):
+            node, column = code, 0
+            while node >= 0:
+                self.ancestors[code, column] = node
+                node, column = self.parents[node], column + 1
+        
+        # Leaves are labelled by name, or by path where names repeat or sites differ
+        multi_site = int((self.levels == SITE).sum()) > 1
+        name_counts = Counter(self.names[code] for code in self.leaves)
+        duplicated = {name for name, count in name_counts.items() if count > 1}
+        self.labels = {}
+        for code in self.leaves:
+            name = self.names[code]
+            if multi_site or name in duplicated or self.levels[code] == SHELF:
+                self.labels[code] = self._short_path(code, multi_site)
+            else:
+                self.labels[code] = name
+        # Rooms with shelves are labelled too, for catalog rows that name the whole room
+        self._room_codes = [int(code) for code in np.flatnonzero((self.levels == ROOM) & has_children)]
+        for code in self._room_codes:
+            self.labels[code] = self._short_path(code, multi_site)
+        
+        # Every spelling a count or catalog row might use, case-insensitively; leaves win over rooms
+        self._lookup = {}
+        for code in [int(code) for code in self.leaves] + self._room_codes:
+            for alias in (self.labels[code], self.paths[code], self.names[code]):
+                self._lookup.setdefault(alias.strip().lower(), code)
+    
+    def _add_node(self, name, parent, level):
+        self.names.append(str(name))
+        self.parents.append(parent)
+        self.levels.append(level)
+        self.paths.append(f"{self.paths[parent]} / {name}" if parent >= 0 else str(name))
+        return len(self.names) - 1
+    
+    def _short_path(self, code, include_site):
+        parts = [self.names[node] for node in self.ancestors_of(code)][::-1]
+        return " / ".join(parts if include_site else parts[1:])
+    
+    def ancestors_of(self, code):
+        row = self.ancestors[code]
+        return [int(node) for node in row[row >= 0]]
+    
+    @property
+    def is_hierarchical(self):
+        """True when there is more than one site or any room has shelves."""
+        return len(self.names) - len(self.leaves) > 1
+    
+    @property
+    def leaf_labels(self):
+        """Countable locations in configuration order."""
+        return [self.labels[code] for code in self.leaves]
+    
+    @property
+    def assignable_labels(self):
+        """Locations catalog rows can refer to (leaves and rooms with shelves) in configuration order."""
+        return [self.labels[code] for code in sorted(self.labels)]
+    
+    def code_of(self, location):
+        """Leaf or room code for a location name, label or path (any case), or None."""
+        if not isinstance(location, str):
+            return None
+        return self._lookup.get(location.strip().lower())
+    
+    def match(self, location, default=None):
+        """Leaf or room label a catalog location refers to, or `default`."""
+        code = self.code_of(location)
+        return self.labels[code] if code is not None else default
+    
+    def leaf_for(self, location, default=None):
+        """Leaf label to count a catalog location at (the first shelf of a room with shelves), or `default`."""
+        code = self.code_of(location)
+        if code is None:
+            return default
+        below = np.flatnonzero((self.ancestors[self.leaves] == code).any(axis=1))
+        return self.labels[int(self.leaves[below[0]])]
+    
+    def rollup(self, totals):
+        """
+        Roll {location label: quantity} up the hierarchy.
+        
+        Returns one row per node (site, room, shelf) in configuration order
+        with the quantity counted at or below it. Labels outside the registry
+        are ignored.
+        """
+        codes = np.array([self._lookup.get(str(location).strip().lower(), -1) for location in totals], dtype=np.int64)
+        quantities = np.array(list(totals.values()), dtype=float)
+        known = codes >= 0
+        
+        node_totals = np.zeros(len(self.names))
+        ancestor_codes = self.ancestors[codes[known]]
+        weights = np.broadcast_to(quantities[known][:, None], ancestor_codes.shape)
+        valid = ancestor_codes >= 0
+        np.add.at(node_totals, ancestor_codes[valid], weights[valid])
+        
+        return pd.DataFrame({
+            'Level': [LEVEL_NAMES[level] for level in self.levels.tolist()],
+            'Location': self.paths,
+            'Quantity': node_totals,
+        })
+
+
+def default_sites():
+    return [{'name': "Main Site", 'rooms': [{'name': room} for room in DEFAULT_ROOMS]}]
+
+
+def load_location_registry(path=None):
+    """Registry from the TOML file, or the default five rooms if there is none."""
+    path = path or os.environ.get("STOCKCOUNT_LOCATIONS", DEFAULT_LOCATIONS_PATH)
+    if not os.path.exists(path):
+        return LocationRegistry(default_sites())
+    with open(path, 'rb') as config_file:
+        config = tomllib.load(config_file)
+    registry = LocationRegistry(config.get('sites') or default_sites())
+    if not len(registry.leaves):
+        # A site without rooms leaves nothing to count at
+        logger.warning("%s defines no rooms; using the default rooms", path)
+        return LocationRegistry(default_sites())
+    return registry
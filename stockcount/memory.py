@@ -0,0 +1,199 @@
+"""
+Memory accounting for session state.
+
+deep_size walks an object graph and adds up what it holds, using pandas' and
+NumPy's own accounting for frames and arrays. audit_state applies it to every
+session-state key, folding per-product widget keys (selected_loc_P001,
+count_P001, ...) into one row per key pattern so thousands of small keys show
+up as the single leak they are. MemoryAuditor keeps each session's latest
+audit until the session is closed, for totals across sessions and threshold
+warnings. Each threshold is logged once when it is crossed, and again only
+after usage has dropped back under it.
+
+Deep sizes are measured per key: an object reachable from two keys is counted
+under both. pandas and NumPy are imported by the audit itself, not by this
+module, so the auditor can be set up before a catalog is loaded.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import types
+from array import array
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Seconds between audits of one session; a deep walk of a large catalog isn't free
+AUDIT_INTERVAL_SECONDS = 60
+
+# Warn when one session, or all sessions together, hold more than this
+DEFAULT_SESSION_WARN_MB = 256
+DEFAULT_TOTAL_WARN_MB = 2048
+
+# Without a way to ask whether a session is still open, audits older than this
+# are taken to belong to sessions that went away
+AUDIT_STALE_SECONDS = 600
+
+_SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+_LEAF_TYPES = (str, bytes, bytearray, int, float, complex, bool, array, type(None))
+
+
+def deep_size(obj):
+    """Bytes held by `obj` and everything it references."""
+    import numpy as np
+    import pandas as pd
+    
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _SKIPPED_TYPES):
+            continue
+        seen.add(id(item))
+        
+        if isinstance(item, pd.DataFrame):
+            total += int(item.memory_usage(deep=True).sum())
+        elif isinstance(item, (pd.Series, pd.Index)):
+            total += int(item.memory_usage(deep=True))
+        elif isinstance(item, np.ndarray):
+            if item.dtype == object:
+                # pandas sizes the referenced objects in C, far faster than walking them
+                total += int(pd.Series(item.ravel(), copy=False).memory_usage(index=False, deep=True))
+            else:
+                total += sys.getsizeof(item) if item.base is None else item.nbytes
+        else:
+            total += sys.getsizeof(item)
+            if isinstance(item, _LEAF_TYPES):
+                continue
+            if isinstance(item, dict):
+                stack.extend(item.keys())
+                stack.extend(item.values())
+            elif isinstance(item, (list, tuple, set, frozenset, deque)):
+                stack.extend(item)
+            else:
+                if hasattr(item, '__dict__'):
+                    stack.append(vars(item))
+                for slot in getattr(type(item), '__slots__', ()):
+                    if hasattr(item, slot):
+                        stack.append(getattr(item, slot))
+    return total
+
+
+def key_pattern(key, product_ids):
+    """'selected_loc_*' for a key ending in a product id, else the key itself."""
+    for index, char in enumerate(key):
+        if char == '_' and key[index + 1:] in product_ids:
+            return key[:index + 1] + '*'
+    return key
+
+
+def audit_state(items, product_ids=frozenset()):
+    """
+    Deep size of every session-state key as a DataFrame, largest first.
+    `items` are (key, value) pairs; `product_ids` are the catalog's ids as
+    strings, used to group per-product keys.
+    """
+    import pandas as pd
+    
+    sizes = {}
+    counts = {}
+    for key, value in items:
+        pattern = key_pattern(str(key), product_ids)
+        sizes[pattern] = sizes.get(pattern, 0) + deep_size(value)
+        counts[pattern] = counts.get(pattern, 0) + 1
+    audit = pd.DataFrame({
+        'Key': list(sizes),
+        'Keys': [counts[pattern] for pattern in sizes],
+        'Bytes': list(sizes.values()),
+    })
+    audit['MB'] = (audit['Bytes'] / 2**20).round(2)
+    return audit.sort_values('Bytes', ascending=False, ignore_index=True)
+
+
+class MemoryAuditor:
+    """Latest session-state audit of every active session in this process."""
+    
+    def __init__(self, interval=AUDIT_INTERVAL_SECONDS, session_warn_mb=None, total_warn_mb=None, is_open=None):
+        """`is_open(session_id)` tells whether a session still exists, idle or not."""
+        self.interval = interval
+        self.is_open = is_open
+        self.session_warn_bytes = (session_warn_mb or float(os.environ.get("STOCKCOUNT_MEMORY_WARN_MB", DEFAULT_SESSION_WARN_MB))) * 2**20
+        self.total_warn_bytes = (total_warn_mb or float(os.environ.get("STOCKCOUNT_MEMORY_TOTAL_WARN_MB", DEFAULT_TOTAL_WARN_MB))) * 2**20
+        self._audits = {}  # session id -> (audited at, audit frame)
+        self._warned = set()  # ('session', session id) or ('total',) while over the threshold
+        self._lock = threading.Lock()
+    
+    def due(self, session_id):
+        with self._lock:
+            audited = self._audits.get(session_id)
+        return audited is None or time.time() - audited[0] >= self.interval
+    
+    def audit(self, session_id, items, product_ids=frozenset()):
+        """Audit one session's state, record it and log any threshold crossed."""
+        audit = audit_state(items, product_ids)
+        with self._lock:
+            self._audits[session_id] = (time.time(), audit)
+        self._forget_closed()
+        
+        crossed = dict(self._threshold_warnings(session_id))
+        with self._lock:
+            for key, warning in crossed.items():
+                if key not in self._warned:
+                    logger.warning(warning)
+                    self._warned.add(key)
+            # Back under a threshold: warn again the next time it is crossed
+            for key in [('session', session_id), ('total',)]:
+                if key not in crossed:
+                    self._warned.discard(key)
+        return audit
+    
+    def _forget_closed(self):
+        now = time.time()
+        with self._lock:
+            if self.is_open is not None:
+                closed = [key for key in self._audits if not self.is_open(key)]
+            else:
+                closed = [key for key, (audited_at, _) in self._audits.items() if now - audited_at > AUDIT_STALE_SECONDS]
+            for key in closed:
+                del self._audits[key]
+                self._warned.discard(('session', key))
+    
+    def latest(self, session_id):
+        with self._lock:
+            audited = self._audits.get(session_id)
+        return audited[1] if audited else None
+    
+    def session_bytes(self, session_id):
+        audit = self.latest(session_id)
+        return int(audit['Bytes'].sum()) if audit is not None else 0
+    
+    def total_bytes(self):
+        self._forget_closed()
+        with self._lock:
+            return int(sum(audit['Bytes'].sum() for _, audit in self._audits.values()))
+    
+    def session_count(self):
+        with self._lock:
+            return len(self._audits)
+    
+    def warnings(self, session_id):
+        """Threshold messages for a session and for the whole process."""
+        return [message for _, message in self._threshold_warnings(session_id)]
+    
+    def _threshold_warnings(self, session_id):
+        # (dedupe key, message) for every threshold currently exceeded
+        messages = []
+        session_bytes = self.session_bytes(session_id)
+        if session_bytes > self.session_warn_bytes:
+            audit = self.latest(session_id)
+            messages.append((('session', session_id),
+                f"Session {session_id} holds {session_bytes / 2**20:.0f} MB of session state "
+                f"(largest: {audit['Key'].iloc[0]} at {audit['MB'].iloc[0]:.0f} MB)"
+            ))
+        total_bytes = self.total_bytes()
+        if total_bytes > self.total_warn_bytes:
+            messages.append((('total',), f"{self.session_count()} sessions hold {total_bytes / 2**20:.0f} MB of session state"))
+        return messages
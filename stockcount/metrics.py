@@ -0,0 +1,317 @@
+"""
+Process-wide metrics in Prometheus text format.
+
+MetricsRegistry holds counters, gauges and fixed-bucket histograms that the
+app updates from its hot paths (every rerun phase, count entries, export
+builds). Updates are a dict lookup and an addition under one lock, cheap
+enough for every rerun. MetricsExporter renders the registry periodically to
+a file (for a node-exporter style textfile collector) and/or serves it on a
+local HTTP port, so an existing scraper can graph it without touching the
+Streamlit UI. Each file path or port is served by at most one exporter per
+process, and a port that can't be bound is logged and skipped rather than
+failing the app.
+
+    STOCKCOUNT_METRICS_FILE=/var/lib/node_exporter/stockcount.prom
+    STOCKCOUNT_METRICS_PORT=9464
+"""
+import bisect
+import logging
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from stockcount.profiling import RERUN_PHASE
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Seconds between writes of the metrics file
+DEFAULT_WRITE_INTERVAL = 15.0
+
+# A session that hasn't rerun for this long no longer counts as active
+SESSION_IDLE_SECONDS = 300
+
+# Metrics files and ports already served in this process
+_claimed_targets = set()
+_claimed_lock = threading.Lock()
+
+
+def _claim(target):
+    """True the first time a file path or port is claimed in this process."""
+    with _claimed_lock:
+        if target in _claimed_targets:
+            return False
+        _claimed_targets.add(target)
+        return True
+
+
+def _release(target):
+    with _claimed_lock:
+        _claimed_targets.discard(target)
+
+
+def _format_labels(label_names, values, extra=None):
+    pairs = list(zip(label_names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+    
+    def __init__(self, name, help_text, label_names, lock):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = lock
+        self._values = {}
+    
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.label_names)
+    
+    def _snapshot(self):
+        # Copied under the lock, since updates may add keys while rendering
+        with self._lock:
+            return list(self._values.items())
+    
+    def _samples(self):
+        for key, value in self._snapshot():
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+    
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+    
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    
+    def __init__(self, name, help_text, label_names, lock):
+        super().__init__(name, help_text, label_names, lock)
+        self._function = None
+    
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+    
+    def set_function(self, function):
+        """Compute the (unlabelled) value when the registry is rendered."""
+        self._function = function
+    
+    def _samples(self):
+        if self._function is not None:
+            yield f"{self.name} {_format_value(self._function())}"
+        else:
+            yield from super()._samples()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    
+    def __init__(self, name, help_text, label_names, lock, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names, lock)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then +Inf, sum and count
+                series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+    
+    def _snapshot(self):
+        with self._lock:
+            return [(key, list(series)) for key, series in self._values.items()]
+    
+    def _samples(self):
+        for key, series in self._snapshot():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, ('le', _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(series[-2])}"
+            yield f"{self.name}_count{labels} {series[-1]}"
+
+
+class MetricsRegistry:
+    """Named metrics sharing one lock."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+    
+    def _register(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+    
+    def counter(self, name, help_text, label_names=()):
+        return self._register(Counter(name, help_text, label_names, self._lock))
+    
+    def gauge(self, name, help_text, label_names=()):
+        return self._register(Gauge(name, help_text, label_names, self._lock))
+    
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, label_names, self._lock, buckets))
+    
+    def render(self):
+        """The whole registry in Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class SessionTracker:
+    """Last rerun time and catalog size of each browser session."""
+    
+    def __init__(self, idle_seconds=SESSION_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._sessions = {}  # session id -> (last seen, catalog bytes)
+        self._lock = threading.Lock()
+    
+    def touch(self, session_id, catalog_bytes=0):
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = (now, catalog_bytes)
+            # Forget sessions that went away
+            stale = [key for key, (seen, _) in self._sessions.items() if now - seen > self.idle_seconds]
+            for key in stale:
+                del self._sessions[key]
+    
+    def active_sessions(self):
+        with self._lock:
+            return len(self._sessions)
+    
+    def catalog_bytes(self):
+        with self._lock:
+            return sum(size for _, size in self._sessions.values())
+
+
+class MetricsExporter:
+    """Writes the registry to a file on a timer and/or serves it over HTTP."""
+    
+    def __init__(self, registry, path=None, port=None, interval=DEFAULT_WRITE_INTERVAL):
+        self.registry = registry
+        self.path = path
+        self.port = port
+        self.interval = interval
+        self._server = None
+    
+    def start(self):
+        if self.path and _claim(('file', os.path.abspath(self.path))):
+            threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True).start()
+        if self.port and _claim(('port', self.port)):
+            registry = self.registry
+            
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split('?')[0] not in ('/', '/metrics'):
+                        self.send_error(404)
+                        return
+                    body = registry.render().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                
+                def log_message(self, *args):
+                    pass
+            
+            try:
+                self._server = ThreadingHTTPServer(("127.0.0.1", self.port), MetricsHandler)
+            except OSError as error:
+                logger.warning("Metrics endpoint disabled: cannot listen on port %s: %s", self.port, error)
+                _release(('port', self.port))
+                return self
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self
+    
+    def write(self):
+        """Write the metrics file atomically, so a scraper never reads half of it."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".prom.tmp")
+        with os.fdopen(handle, 'w') as temp_file:
+            temp_file.write(self.registry.render())
+        os.replace(temp_path, self.path)
+    
+    def _write_loop(self):
+        while True:
+            try:
+                self.write()
+            except Exception:
+                # A full disk or a bad gauge shouldn't stop later writes
+                logger.exception("Could not write metrics to %s", self.path)
+            time.sleep(self.interval)
+    
+    @classmethod
+    def from_environment(cls, registry):
+        port = os.environ.get("STOCKCOUNT_METRICS_PORT")
+        return cls(
+            registry,
+            path=os.environ.get("STOCKCOUNT_METRICS_FILE"),
+            port=int(port) if port else None,
+            interval=float(os.environ.get("STOCKCOUNT_METRICS_INTERVAL", DEFAULT_WRITE_INTERVAL)),
+        )
+
+
+class AppMetrics:
+    """The stock count app's metrics and the session tracker behind its gauges."""
+    
+    def __init__(self, registry=None):
+        self.registry = registry or MetricsRegistry()
+        self.sessions = SessionTracker()
+        
+        self.reruns = self.registry.counter("stockcount_reruns_total", "Script reruns across all sessions.")
+        self.phase_seconds = self.registry.histogram(
+            "stockcount_phase_seconds", "Duration of timed rerun phases, search and rendering included.", ("phase",)
+        )
+        self.count_entries = self.registry.counter("stockcount_count_entries_total", "Count entries added.")
+        self.export_seconds = self.registry.histogram(
+            "stockcount_export_build_seconds", "Time to build an export file on a cache miss.", ("report_type",)
+        )
+        self.registry.gauge("stockcount_active_sessions", "Sessions that reran in the last five minutes.").set_function(
+            self.sessions.active_sessions
+        )
+        self.registry.gauge("stockcount_catalog_bytes", "Memory held by the catalogs of active sessions.").set_function(
+            self.sessions.catalog_bytes
+        )
+    
+    def observe_phase(self, phase, seconds):
+        """Profiler sink: every timed phase feeds the latency histogram."""
+        self.phase_seconds.observe(seconds, phase=phase)
+        if phase == RERUN_PHASE:
+            self.reruns.inc()
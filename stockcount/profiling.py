@@ -0,0 +1,166 @@
+"""
+Per-rerun phase timings.
+
+Each browser session owns a PhaseProfiler. At the top of every rerun the app
+makes it the active profiler for the script thread; spans and decorated
+functions then add their elapsed time to the current rerun's breakdown, and
+the profiler keeps the last few hundred durations of every phase for rolling
+percentiles. Recording a span is two perf_counter calls and a deque append,
+so it stays on in production. Code running on other threads (download
+callbacks, background exports) has no active profiler; work prepared on the
+script thread and run there later is bound to the session's profiler with
+profiled_on, and counts towards its percentiles but not any rerun breakdown.
+
+pandas and NumPy are only imported when the percentiles table is built, so
+the splash screen can be timed before either is loaded.
+"""
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Durations kept per phase for the rolling percentiles
+DEFAULT_WINDOW = 200
+
+# Phase recorded for the whole rerun
+RERUN_PHASE = "rerun"
+
+_active = threading.local()
+
+
+class PhaseProfiler:
+    """Rolling per-phase durations for one session's reruns."""
+    
+    def __init__(self, window=DEFAULT_WINDOW, sink=None):
+        self.window = window
+        # Called with (phase, seconds) for every recorded duration, e.g. to feed metrics
+        self.sink = sink
+        self.samples = {}       # phase -> deque of seconds
+        self.current = None     # phase -> seconds for the rerun in progress
+        self.last_rerun = {}    # breakdown of the last finished rerun
+        self.reruns = 0
+        self._rerun_started = None
+        self._last_activity = None
+    
+    def record(self, phase, seconds, rerun=True):
+        # setdefault so two threads recording a new phase keep the same deque
+        samples = self.samples.get(phase)
+        if samples is None:
+            samples = self.samples.setdefault(phase, deque(maxlen=self.window))
+        samples.append(seconds)
+        if self.sink is not None:
+            self.sink(phase, seconds)
+        if not rerun:
+            return
+        if self.current is not None:
+            self.current[phase] = self.current.get(phase, 0.0) + seconds
+        self._last_activity = time.perf_counter()
+    
+    def begin_rerun(self):
+        # A rerun cut short by st.rerun() never reaches end_rerun; close it at its last span
+        if self.current is not None:
+            self._finish(self._last_activity or self._rerun_started)
+        self.current = {}
+        self._rerun_started = self._last_activity = time.perf_counter()
+    
+    def end_rerun(self):
+        if self.current is not None:
+            self._finish(time.perf_counter())
+    
+    def _finish(self, ended):
+        breakdown = self.current
+        self.current = None
+        self.record(RERUN_PHASE, ended - self._rerun_started)
+        breakdown[RERUN_PHASE] = ended - self._rerun_started
+        self.last_rerun = breakdown
+        self.reruns += 1
+    
+    def percentiles(self):
+        """Last, p50, p95 and p99 milliseconds per phase, the whole rerun first."""
+        import numpy as np
+        import pandas as pd
+        
+        phases = sorted(self.samples, key=lambda phase: (phase != RERUN_PHASE, phase))
+        rows = []
+        for phase in phases:
+            samples = np.array(list(self.samples[phase]), dtype=float) * 1000
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            last = self.last_rerun.get(phase)
+            rows.append({
+                'Phase': phase,
+                'Last (ms)': round(last * 1000, 1) if last is not None else None,
+                'p50': round(p50, 1),
+                'p95': round(p95, 1),
+                'p99': round(p99, 1),
+                'Samples': len(samples),
+            })
+        return pd.DataFrame(rows, columns=['Phase', 'Last (ms)', 'p50', 'p95', 'p99', 'Samples'])
+
+
+def activate(profiler):
+    """Make `profiler` the one spans on this thread record into."""
+    _active.profiler = profiler
+
+
+def active_profiler():
+    return getattr(_active, 'profiler', None)
+
+
+def phase_start():
+    """Start time for phase_end, for phases too long to wrap in a with block."""
+    return time.perf_counter()
+
+
+def phase_end(phase, started):
+    profiler = active_profiler()
+    if profiler is not None:
+        profiler.record(phase, time.perf_counter() - started)
+
+
+@contextmanager
+def span(phase):
+    """Time the enclosed block as `phase`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase_end(phase, started)
+
+
+def profiled_on(profiler, phase):
+    """
+    Decorator timing every call as `phase` into `profiler`, from any thread.
+    
+    For work prepared on the script thread and run later elsewhere: the
+    durations feed the phase's percentiles but not the breakdown of whichever
+    rerun happens to be in progress. With no profiler the function is
+    returned as it is.
+    """
+    def decorate(func):
+        if profiler is None:
+            return func
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.record(phase, time.perf_counter() - started, rerun=False)
+        return wrapper
+    return decorate
+
+
+def profiled(phase):
+    """Decorator timing every call of a function as `phase`."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                phase_end(phase, started)
+        return wrapper
+    return decorate
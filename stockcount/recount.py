@@ -0,0 +1,121 @@
+"""
+Priority queue of products to recount.
+
+Products are ordered by the size of their count discrepancy: absolute
+variance, optionally multiplied by unit value so expensive lines come first.
+The queue is a binary heap with lazy invalidation. Updating a product pushes
+a new heap entry and marks the old one stale, so each new count costs
+O(log N) instead of re-sorting the catalog; stale entries are skipped when
+popping and the heap is compacted once they outnumber the live ones.
+
+A popped product is outstanding until a new count for it arrives (update).
+Outstanding products stay out of the queue, also when it is rebuilt, and
+come back once everything else has been handed out, so skipping a recount
+never loses the product.
+"""
+import heapq
+import itertools
+
+import numpy as np
+
+
+class RecountQueue:
+    """Max-heap of products keyed by recount priority."""
+    
+    def __init__(self):
+        self._heap = []  # (-priority, sequence, product_id)
+        self._live = {}  # product_id -> (priority, sequence) of its current entry
+        self._sequence = itertools.count()
+        self._outstanding = {}  # product_id -> priority, popped but not recounted yet, oldest first
+    
+    def __len__(self):
+        return len(self._live)
+    
+    def __contains__(self, product_id):
+        return product_id in self._live
+    
+    @property
+    def outstanding(self):
+        """Popped products still waiting for their recount, with their priorities."""
+        return dict(self._outstanding)
+    
+    def update(self, product_id, priority):
+        """Set a product's priority after a new count; zero removes it from the queue."""
+        self._outstanding.pop(product_id, None)
+        if priority <= 0:
+            self.remove(product_id)
+            return
+        sequence = next(self._sequence)
+        self._live[product_id] = (priority, sequence)
+        heapq.heappush(self._heap, (-priority, sequence, product_id))
+        self._maybe_compact()
+    
+    def remove(self, product_id):
+        # The heap entry stays behind and is skipped as stale
+        self._live.pop(product_id, None)
+        self._outstanding.pop(product_id, None)
+    
+    def _is_live(self, entry):
+        current = self._live.get(entry[2])
+        return current is not None and current[1] == entry[1]
+    
+    def _drop_stale(self):
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+    
+    def _maybe_compact(self):
+        # Rebuild from live entries once stale ones dominate, keeping memory proportional to the queue
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._heap = [(-priority, sequence, product_id) for product_id, (priority, sequence) in self._live.items()]
+            heapq.heapify(self._heap)
+    
+    def peek(self):
+        """(product_id, priority) of the next product to recount, or None."""
+        self._drop_stale()
+        if not self._heap:
+            return None
+        negative_priority, _, product_id = self._heap[0]
+        return product_id, -negative_priority
+    
+    def pop(self):
+        """
+        Hand out the next product as (product_id, priority), or None. It stays
+        outstanding until it is recounted; once the queue runs dry, products
+        handed out but never recounted are queued again.
+        """
+        if self.peek() is None and self._outstanding:
+            requeue, self._outstanding = self._outstanding, {}
+            for product_id, priority in requeue.items():
+                self.update(product_id, priority)
+        head = self.peek()
+        if head is not None:
+            heapq.heappop(self._heap)
+            del self._live[head[0]]
+            self._outstanding[head[0]] = head[1]
+        return head
+    
+    def peek_many(self, n):
+        """The next n products without removing them, highest priority first."""
+        stale = len(self._heap) - len(self._live)
+        live = [entry for entry in heapq.nsmallest(n + stale, self._heap) if self._is_live(entry)]
+        return [(product_id, -negative_priority) for negative_priority, _, product_id in live[:n]]
+    
+    @classmethod
+    def from_arrays(cls, product_ids, priorities, outstanding=()):
+        """
+        Build a queue for many products at once with a single heapify.
+        Products in `outstanding` (handed out by the queue being replaced)
+        stay outstanding with their new priority instead of being queued again.
+        """
+        queue = cls()
+        keep = np.flatnonzero(priorities > 0)
+        for position in keep:
+            product_id = product_ids[position]
+            if product_id in outstanding:
+                queue._outstanding[product_id] = float(priorities[position])
+                continue
+            sequence = next(queue._sequence)
+            queue._live[product_id] = (float(priorities[position]), sequence)
+            queue._heap.append((-float(priorities[position]), sequence, product_id))
+        heapq.heapify(queue._heap)
+        return queue
@@ -0,0 +1,59 @@
+"""
+Walking route through the catalog for counting without searching.
+
+The route visits locations in the order they are configured in the location
+registry (sites, then rooms, then shelves, as listed in locations.toml), and
+within a location goes by product id, with catalog row order breaking ties.
+The ordering is computed once per catalog as a sort index; stepping to the
+next uncounted stop is a vectorized scan of the counted flags in route order.
+"""
+import numpy as np
+import pandas as pd
+
+
+class CountRoute:
+    """Catalog row positions in walking order."""
+    
+    def __init__(self, catalog, registry):
+        locations = catalog['location'] if 'location' in catalog else pd.Series('Unknown', index=catalog.index)
+        locations = locations.fillna('').astype(str)
+        
+        # Node codes follow configuration order, with a room just ahead of its shelves;
+        # locations the registry doesn't know come last
+        unknown_rank = len(registry.names)
+        rank_of = {}
+        label_of = {}
+        for location in locations.unique():
+            code = registry.code_of(location)
+            rank_of[location] = code if code is not None else unknown_rank
+            label_of[location] = registry.labels[code] if code is not None else location
+        ranks = locations.map(rank_of).to_numpy(dtype=np.int64)
+        
+        # Sort by product id, then stably by location, so each location is in product order
+        # and duplicate ids keep catalog order
+        by_product = catalog['product_id'].astype(str).argsort(kind='stable').to_numpy()
+        self.order = by_product[np.argsort(ranks[by_product], kind='stable')]
+        self.product_ids = catalog['product_id'].to_numpy()[self.order]
+        self.locations = locations.map(label_of).to_numpy()[self.order]
+    
+    def __len__(self):
+        return len(self.order)
+    
+    def next_stop(self, is_counted, start=0, include=None):
+        """
+        Index of the first uncounted stop at or after `start`, wrapping round
+        to the beginning of the route. `is_counted`, and `include` if given to
+        limit the route to a worklist, are flags per catalog row. Returns None
+        once everything has been counted.
+        """
+        pending = ~is_counted if include is None else include & ~is_counted
+        pending = np.flatnonzero(pending[self.order])
+        if not len(pending):
+            return None
+        after = np.searchsorted(pending, start)
+        return int(pending[after] if after < len(pending) else pending[0])
+    
+    def remaining(self, is_counted, include=None):
+        if include is None:
+            return int(len(self.order) - np.count_nonzero(is_counted))
+        return int(np.count_nonzero(include & ~is_counted))
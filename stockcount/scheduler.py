@@ -0,0 +1,192 @@
+"""
+Splitting a stock take across several counters.
+
+The uncounted catalog is cut into work packages along the walking route:
+consecutive items at the same location form a block, blocks bigger than
+half a fair share are split, and the pieces are dealt out longest first to
+whichever counter has the least estimated time so far. Each counter's
+package is kept in route order, so everyone walks a compact set of
+locations.
+
+One WorkSchedule is shared by every browser session working on the same
+catalog. Its arrays (owner and done flag per catalog row, package per
+counter) make "what should this tablet count next" a dict lookup plus a
+scan of that counter's own package. When a counter runs out of work they
+take the second half of the busiest counter's remaining route. Rebalancing
+builds a new package dict and swaps it in with one assignment, so readers in
+other sessions never see a package half moved.
+"""
+import heapq
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Estimated time to count one catalog item: a fixed cost plus a little per expected unit
+BASE_SECONDS_PER_ITEM = 15.0
+SECONDS_PER_UNIT = 0.5
+MAX_SECONDS_PER_ITEM = 120.0
+
+
+def estimate_seconds(catalog):
+    """Estimated count time for every catalog row."""
+    expected = pd.to_numeric(catalog['expected_count'], errors='coerce').fillna(0.0).abs().to_numpy(dtype=float)
+    return np.minimum(BASE_SECONDS_PER_ITEM + SECONDS_PER_UNIT * expected, MAX_SECONDS_PER_ITEM)
+
+
+def partition_work(stops, locations, seconds, counters):
+    """
+    Deal route stops into `counters` packages of roughly equal estimated time.
+    
+    `stops` are route indices in ascending order, with the location and
+    estimated seconds of each. Returns one array of stops per counter, each
+    in route order.
+    """
+    if not len(stops):
+        return [np.empty(0, dtype=np.int64) for _ in range(counters)]
+    
+    # Blocks: runs of the same location along the route
+    new_block = np.ones(len(stops), dtype=bool)
+    new_block[1:] = locations[1:] != locations[:-1]
+    block = np.cumsum(new_block) - 1
+    
+    # Split blocks so no piece exceeds half a fair share
+    piece_limit = max(seconds.sum() / counters / 2, seconds.max())
+    within_block = pd.Series(seconds).groupby(block).cumsum().to_numpy() - seconds
+    piece = np.floor(within_block / piece_limit).astype(np.int64)
+    new_piece = new_block.copy()
+    new_piece[1:] |= piece[1:] != piece[:-1]
+    piece_id = np.cumsum(new_piece) - 1
+    
+    piece_seconds = np.bincount(piece_id, weights=seconds)
+    piece_starts = np.flatnonzero(new_piece)
+    piece_ends = np.append(piece_starts[1:], len(stops))
+    
+    # Longest piece first to the least-loaded counter
+    loads = [(0.0, counter) for counter in range(counters)]
+    assigned = [[] for _ in range(counters)]
+    for piece_index in np.argsort(-piece_seconds, kind='stable'):
+        load, counter = heapq.heappop(loads)
+        assigned[counter].append(piece_index)
+        heapq.heappush(loads, (load + piece_seconds[piece_index], counter))
+    
+    packages = []
+    for pieces in assigned:
+        pieces.sort()
+        parts = [stops[piece_starts[index]:piece_ends[index]] for index in pieces]
+        packages.append(np.concatenate(parts) if parts else np.empty(0, dtype=np.int64))
+    return packages
+
+
+class WorkSchedule:
+    """Work packages for named counters over one catalog's route."""
+    
+    def __init__(self, catalog, route, counters, is_counted=None):
+        self.counters = list(dict.fromkeys(counters))
+        self._route = route
+        self._seconds = estimate_seconds(catalog)
+        self._positions = pd.Index(catalog['product_id'].to_numpy())
+        self._lock = threading.Lock()
+        
+        # Shared progress, one flag per catalog row
+        self.done = np.zeros(len(route), dtype=bool) if is_counted is None else is_counted.copy()
+        # Counter index owning each catalog row, -1 for unassigned
+        self.owner = np.full(len(route), -1, dtype=np.int32)
+        
+        pending = np.flatnonzero(~self.done[route.order])
+        packages = partition_work(
+            pending,
+            route.locations[pending],
+            self._seconds[route.order[pending]],
+            len(self.counters),
+        )
+        self._packages = {}
+        for index, (counter, stops) in enumerate(zip(self.counters, packages)):
+            self._assign(self._packages, counter, index, stops)
+    
+    def __contains__(self, counter):
+        return counter in self._packages
+    
+    def _assign(self, packages, counter, index, stops):
+        packages[counter] = stops
+        self.owner[self._route.order[stops]] = index
+    
+    def _pending(self, stops):
+        return stops[~self.done[self._route.order[stops]]]
+    
+    def package(self, counter):
+        """Route stops assigned to a counter, in route order."""
+        return self._packages.get(counter, np.empty(0, dtype=np.int64))
+    
+    def pending(self, counter):
+        return self._pending(self.package(counter))
+    
+    def mark_counted(self, product_id):
+        """Record a count from any session; unknown products are ignored."""
+        position = self._positions.get_indexer([product_id])[0]
+        if position >= 0:
+            self.done[position] = True
+    
+    def next_stop(self, counter, after=-1):
+        """
+        The counter's first pending stop after route stop `after`, wrapping
+        round. Takes over part of another package when this one is finished.
+        Returns None when nothing is left anywhere.
+        """
+        pending = self.pending(counter)
+        if not len(pending) and counter in self:
+            self.rebalance()
+            pending = self.pending(counter)
+        if not len(pending):
+            return None
+        later = np.searchsorted(pending, after, side='right')
+        return int(pending[later] if later < len(pending) else pending[0])
+    
+    def rebalance(self):
+        """
+        Give every counter without pending work the second half, by
+        estimated time, of the busiest counter's pending stops. Returns the
+        number of stops moved.
+        """
+        moved = 0
+        with self._lock:
+            packages = dict(self._packages)
+            for index, counter in enumerate(self.counters):
+                if len(self._pending(packages[counter])):
+                    continue
+                busiest = max(self.counters, key=lambda name: self._seconds_left(packages[name]))
+                pending = self._pending(packages[busiest])
+                if len(pending) < 2:
+                    break
+                
+                elapsed = np.cumsum(self._seconds[self._route.order[pending]])
+                split = int(np.clip(np.searchsorted(elapsed, elapsed[-1] / 2), 1, len(pending) - 1))
+                handed_over = pending[split:]
+                
+                packages[busiest] = packages[busiest][~np.isin(packages[busiest], handed_over)]
+                self._assign(packages, counter, index, np.union1d(packages[counter], handed_over))
+                moved += len(handed_over)
+            self._packages = packages
+        return moved
+    
+    def _seconds_left(self, stops):
+        return float(self._seconds[self._route.order[self._pending(stops)]].sum())
+    
+    def remaining_seconds(self, counter):
+        return self._seconds_left(self.package(counter))
+    
+    def summary(self):
+        """Progress per counter."""
+        packages = self._packages
+        rows = []
+        for counter in self.counters:
+            stops = packages[counter]
+            pending = self._pending(stops)
+            rows.append({
+                'Counter': counter,
+                'Items': len(stops),
+                'Done': len(stops) - len(pending),
+                'Remaining': len(pending),
+                'Est. Minutes Left': round(self._seconds_left(stops) / 60, 1),
+            })
+        return pd.DataFrame(rows, columns=['Counter', 'Items', 'Done', 'Remaining', 'Est. Minutes Left'])
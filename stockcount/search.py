@@ -0,0 +1,145 @@
+"""
+Product search over the validated catalog.
+
+search_all_columns scores every row against the search term (product id
+first, then the unnamed vendor columns, the combined Brand & Description
+field and the individual fields) and filter_catalog turns the scores into
+the ordered results the page lists.
+"""
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# Enhanced search function with improved matching algorithms
+def search_all_columns(df, search_term):
+    """
+    Advanced search function that intelligently searches across all columns
+    with smart matching and prioritization
+    """
+    # Convert search term to lowercase for case-insensitive search
+    search_term = search_term.lower().strip()
+    
+    # Create a mask of all False initially
+    mask = pd.Series([False] * len(df))
+    
+    # Dictionary to store matches with scores for better ranking
+    # Higher score = better match (exact match > starts with > contains)
+    match_scores = {}
+    
+    logger.debug("Available columns for search: %s", df.columns.tolist())
+    
+    # Break search term into words for multi-word searching
+    search_words = search_term.split()
+    
+    # FIRST PRIORITY: Product ID (exact match)
+    if 'product_id' in df.columns:
+        # Try to match product ID (including partial matches)
+        prod_ids = df['product_id'].fillna('').astype(str).str.lower()
+        for idx, value in prod_ids.items():
+            # Exact product ID match gets highest priority
+            if search_term == value:
+                match_scores[idx] = 100
+                mask.iloc[idx] = True
+            # Partial product ID match (starts with)
+            elif value.startswith(search_term):
+                match_scores[idx] = 90
+                mask.iloc[idx] = True
+            # Partial product ID match (contains)
+            elif search_term in value:
+                match_scores[idx] = 80
+                mask.iloc[idx] = True
+    
+    # SECOND PRIORITY: Unnamed columns (main product information)
+    unnamed_columns = [col for col in df.columns if 'Unnamed:' in col]
+    for col in unnamed_columns:
+        if col in df.columns:
+            col_values = df[col].fillna('').astype(str).str.lower()
+            logger.debug("Searching in unnamed column %r", col)
+            for idx, value in col_values.items():
+                if value.strip() == "":
+                    continue
+                
+                # Check for exact match
+                if search_term == value.strip():
+                    match_scores[idx] = match_scores.get(idx, 0) + 70
+                    mask.iloc[idx] = True
+                # Check for starts with
+                elif value.strip().startswith(search_term):
+                    match_scores[idx] = match_scores.get(idx, 0) + 60
+                    mask.iloc[idx] = True
+                # Check for contains
+                elif search_term in value.strip():
+                    match_scores[idx] = match_scores.get(idx, 0) + 50
+                    mask.iloc[idx] = True
+                # Check for multi-word match (all words present)
+                elif len(search_words) > 1 and all(word in value for word in search_words):
+                    match_scores[idx] = match_scores.get(idx, 0) + 45
+                    mask.iloc[idx] = True
+                # Check if any word matches (partial match)
+                elif any(word in value for word in search_words):
+                    match_scores[idx] = match_scores.get(idx, 0) + 40
+                    mask.iloc[idx] = True
+    
+    # THIRD PRIORITY: Product name/Brand and name combinations
+    # Check 'Brand & Description' field
+    if 'Brand & Description' in df.columns:
+        col_values = df['Brand & Description'].fillna('').astype(str).str.lower()
+        logger.debug("Searching in 'Brand & Description'")
+        for idx, value in col_values.items():
+            if search_term == value.strip():
+                match_scores[idx] = match_scores.get(idx, 0) + 35
+                mask.iloc[idx] = True
+            elif value.strip().startswith(search_term):
+                match_scores[idx] = match_scores.get(idx, 0) + 30
+                mask.iloc[idx] = True
+            elif search_term in value.strip():
+                match_scores[idx] = match_scores.get(idx, 0) + 25
+                mask.iloc[idx] = True
+            elif len(search_words) > 1 and all(word in value for word in search_words):
+                match_scores[idx] = match_scores.get(idx, 0) + 20
+                mask.iloc[idx] = True
+    
+    # FOURTH PRIORITY: Individual fields
+    priority_fields = ['brand', 'description', 'product_name']
+    for col in priority_fields:
+        if col in df.columns:
+            col_values = df[col].fillna('').astype(str).str.lower()
+            logger.debug("Searching in %r", col)
+            for idx, value in col_values.items():
+                if search_term == value.strip():
+                    match_scores[idx] = match_scores.get(idx, 0) + 15
+                    mask.iloc[idx] = True
+                elif value.strip().startswith(search_term):
+                    match_scores[idx] = match_scores.get(idx, 0) + 10
+                    mask.iloc[idx] = True
+                elif search_term in value.strip():
+                    match_scores[idx] = match_scores.get(idx, 0) + 5
+                    mask.iloc[idx] = True
+    
+    # Add column for sorting by match score
+    if mask.sum() > 0:
+        df_temp = df[mask].copy()
+        df_temp['match_score'] = pd.Series(match_scores)
+    
+    logger.debug("Found %d matches in total", mask.sum())
+    return mask, match_scores
+
+
+# Function to filter the catalog to the rows matching the search, best matches first
+def filter_catalog(df, search_term):
+    mask, match_scores = search_all_columns(df, search_term)
+    
+    # Filter data using the mask
+    filtered = df[mask].copy()
+    
+    # Apply match scores for better ordering
+    if not filtered.empty:
+        # Create a match_score column based on the scores
+        filtered['match_score'] = filtered.index.map(lambda idx: match_scores.get(idx, 0))
+        
+        # Sort by match score (descending - highest scores first)
+        filtered = filtered.sort_values('match_score', ascending=False).drop(columns=['match_score'])
+    return filtered
@@ -0,0 +1,901 @@
+"""
+Theme colours and the page's CSS.
+
+The style blocks are built once when the module is imported, instead of the
+page script formatting every f-string again on each rerun. The page only
+passes them to st.markdown.
+"""
+
+# Define global theme colors
+THEME_PRIMARY = "#6a28e8"  # Main purple shade
+THEME_SECONDARY = "#9161fd"  # Lighter purple
+THEME_GRADIENT = f"linear-gradient(135deg, {THEME_PRIMARY} 0%, {THEME_SECONDARY} 100%)"
+THEME_SUCCESS = "#34C759"  # Green
+THEME_WARNING = "#FF9500"  # Orange
+THEME_ERROR = "#FF3B30"  # Red
+
+# Purple theme applied to the whole app
+GLOBAL_THEME_CSS = f"""
+<style>
+/* Global Theme Styles */
+:root {{
+    --theme-primary: {THEME_PRIMARY};
+    --theme-secondary: {THEME_SECONDARY};
+    --theme-success: {THEME_SUCCESS};
+    --theme-warning: {THEME_WARNING};
+    --theme-error: {THEME_ERROR};
+}}
+
+/* Header styling */
+h1, h2, h3, h4, h5, h6 {{
+    color: {THEME_PRIMARY} !important;
+}}
+
+/* Change primary button color to purple */
+.stButton > button[data-baseweb="button"] {{
+    background-color: {THEME_PRIMARY};
+    border-color: {THEME_PRIMARY};
+}}
+
+/* Change hover state */
+.stButton > button[data-baseweb="button"]:hover {{
+    background-color: {THEME_SECONDARY};
+    border-color: {THEME_SECONDARY};
+}}
+
+/* Change links to purple */
+a {{
+    color: {THEME_PRIMARY} !important;
+}}
+
+/* Change selection color */
+::selection {{
+    background-color: {THEME_SECONDARY};
+    color: white;
+}}
+
+/* Custom scrollbar */
+::-webkit-scrollbar {{
+    width: 10px;
+}}
+
+::-webkit-scrollbar-track {{
+    background: #f1f1f1;
+}}
+
+::-webkit-scrollbar-thumb {{
+    background: {THEME_SECONDARY};
+    border-radius: 5px;
+}}
+
+::-webkit-scrollbar-thumb:hover {{
+    background: {THEME_PRIMARY};
+}}
+
+/* Streamlit progress bar */
+.stProgress > div > div > div > div {{
+    background-color: {THEME_PRIMARY};
+}}
+
+/* Sidebar */
+.css-1d391kg {{
+    background-color: #f5f0ff;
+}}
+
+/* Custom input fields */
+.stTextInput > div > div > input {{
+    border-color: #d0bfff !important;
+}}
+.stTextInput > div > div > input:focus {{
+    border-color: {THEME_PRIMARY} !important;
+    box-shadow: 0 0 0 1px {THEME_SECONDARY} !important;
+}}
+
+/* Change select box color */
+.stSelectbox > div > div > div {{
+    border-color: #d0bfff !important;
+}}
+.stSelectbox > div > div > div:focus {{
+    border-color: {THEME_PRIMARY} !important;
+    box-shadow: 0 0 0 1px {THEME_SECONDARY} !important;
+}}
+
+/* Number input */
+.stNumberInput > div > div > input {{
+    border-color: #d0bfff !important;
+}}
+.stNumberInput > div > div > input:focus {{
+    border-color: {THEME_PRIMARY} !important;
+    box-shadow: 0 0 0 1px {THEME_SECONDARY} !important;
+}}
+
+</style>
+"""
+
+
+# Global centering for all text content
+CENTERING_CSS = """
+<style>
+.stApp {
+    text-align: center;
+}
+.stTextInput, .stNumberInput, .stSelectbox, .stTextArea {
+    text-align: center;
+    margin-left: auto;
+    margin-right: auto;
+    max-width: 600px;
+}
+div.row-widget.stButton {
+    text-align: center;
+    display: flex;
+    justify-content: center;
+}
+.css-6qob1r {
+    text-align: center !important;
+}
+.css-10trblm {
+    text-align: center !important;
+}
+p, h1, h2, h3, h4, h5, h6 {
+    text-align: center !important;
+}
+.stMarkdown {
+    text-align: center !important;
+}
+/* Dropdown style changes */
+.stSelectbox > div > div {
+    background-color: white !important;
+    color: black !important;
+}
+/* Dropdown options */
+.stSelectbox ul {
+    background-color: white !important;
+}
+.stSelectbox ul li {
+    color: black !important;
+}
+/* Dropdown arrow */
+.stSelectbox svg {
+    color: black !important;
+}
+</style>
+"""
+
+
+# Search box with explicit iOS styling
+SEARCH_BOX_CSS = """
+        <style>
+        /* Hide default input container styles */
+        .stTextInput > div > div[data-testid="stFormSubmitButton"] { 
+            display: none !important; 
+        }
+        
+        /* Hide default input border & background */
+        div[data-baseweb="base-input"] {
+            border: none !important;
+            background: transparent !important;
+        }
+        
+        /* Style the input field exactly like iOS */
+        div[data-baseweb="input"] {
+            border-radius: 20px !important;
+            border: 1px solid rgba(159, 121, 242, 0.3) !important;
+            padding: 0 !important; 
+            overflow: hidden !important;
+            background: white !important;
+        }
+        
+        /* Input element styling */
+        .stTextInput input {
+            border: none !important;
+            padding: 10px 10px 10px 40px !important;
+            background-color: transparent !important;
+            font-size: 15px !important;
+            color: #333 !important;
+        }
+        
+        /* Input placeholder */
+        .stTextInput input::placeholder {
+            color: #999 !important;
+            font-size: 15px !important;
+        }
+        
+        /* Magnifying glass icon */
+        .stTextInput {
+            position: relative !important;
+        }
+        .stTextInput::before {
+            content: "🔍";
+            position: absolute;
+            left: 15px;
+            top: 11px;
+            font-size: 15px;
+            z-index: 10;
+            color: #777;
+        }
+        </style>
+        """
+
+
+# Animated search results
+SEARCH_RESULTS_CSS = """
+                <style>
+                /* Animated hover styles for search result expanders */
+                section[data-testid="stExpander"] {
+                    background-color: white;
+                    border-radius: 8px !important;
+                    border: 1px solid rgba(0,0,0,0.05) !important;
+                    margin-bottom: 12px;
+                    transition: all 0.3s cubic-bezier(0.25, 0.8, 0.25, 1) !important;
+                    box-shadow: 0 1px 3px rgba(0,0,0,0.05) !important;
+                    overflow: hidden !important;
+                    position: relative !important;
+                }
+                
+                /* Hover effect with scaling, shadow and color change */
+                section[data-testid="stExpander"]:hover {
+                    transform: translateY(-2px) scale(1.01);
+                    border-color: rgba(106, 40, 232, 0.15) !important;
+                    box-shadow: 0 4px 15px rgba(106, 40, 232, 0.1) !important;
+                }
+                
+                /* Add animated purple highlight bar on the left side on hover */
+                section[data-testid="stExpander"]::before {
+                    content: "";
+                    position: absolute;
+                    top: 0;
+                    left: 0;
+                    width: 4px;
+                    height: 100%;
+                    background: linear-gradient(135deg, #6a28e8 0%, #9161fd 100%);
+                    opacity: 0;
+                    transition: opacity 0.3s ease, width 0.2s ease;
+                    z-index: 10;
+                }
+                
+                section[data-testid="stExpander"]:hover::before {
+                    opacity: 1;
+                }
+                
+                /* Button glow effect on hover */
+                section[data-testid="stExpander"] > div:first-child {
+                    position: relative;
+                    border: none !important;
+                    background-color: transparent !important;
+                    padding: 16px !important;
+                    transition: background-color 0.3s ease !important;
+                }
+                
+                section[data-testid="stExpander"]:hover > div:first-child {
+                    background-color: rgba(248, 245, 255, 0.5) !important;
+                }
+                
+                /* Fix expander title text */
+                section[data-testid="stExpander"] > div:first-child p {
+                    color: #333 !important;
+                    font-weight: 500 !important;
+                    font-size: 15px !important;
+                    transition: color 0.3s ease, transform 0.2s ease !important;
+                }
+                
+                section[data-testid="stExpander"]:hover > div:first-child p {
+                    color: rgba(106, 40, 232, 0.9) !important;
+                    transform: translateX(4px);
+                }
+                
+                /* Content animation */
+                section[data-testid="stExpander"] > div:nth-child(2) {
+                    animation: fadeIn 0.4s ease-in-out;
+                    background-color: rgba(250, 248, 255, 0.5) !important;
+                    border-top: 1px solid rgba(106, 40, 232, 0.05) !important;
+                    padding: 16px !important;
+                }
+                
+                /* Animation for fade in */
+                @keyframes fadeIn {
+                    from { opacity: 0; transform: translateY(-8px); }
+                    to { opacity: 1; transform: translateY(0); }
+                }
+                
+                /* Pulsing effect on expander arrow */
+                section[data-testid="stExpander"] button {
+                    color: #6a28e8 !important;
+                    transition: transform 0.3s cubic-bezier(0.34, 1.56, 0.64, 1) !important;
+                }
+                
+                section[data-testid="stExpander"]:hover button {
+                    transform: rotate(90deg) scale(1.2);
+                }
+                
+                /* Enhanced styling when expanded */
+                section[data-testid="stExpander"]:has(div[data-testid="stExpander-content"]) {
+                    box-shadow: 0 6px 20px rgba(106, 40, 232, 0.15) !important;
+                    border-color: rgba(106, 40, 232, 0.2) !important;
+                }
+                
+                /* Purple highlight bar on the left side when expanded */
+                section[data-testid="stExpander"]:has(div[data-testid="stExpander-content"])::before {
+                    opacity: 1;
+                    width: 6px;
+                }
+                </style>
+                """
+
+
+# iOS-style count screen
+COUNT_SCREEN_CSS = """
+                        <style>
+                        .product-info-card {
+                            background-color: white;
+                            border-radius: 12px;
+                            padding: 20px;
+                            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+                            margin-bottom: 20px;
+                            transition: all 0.3s ease;
+                        }
+                        .product-info-card:hover {
+                            box-shadow: 0 4px 15px rgba(0,0,0,0.08);
+                        }
+                        .count-form-card {
+                            background-color: white;
+                            border-radius: 12px;
+                            padding: 20px;
+                            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+                            margin-bottom: 20px;
+                            transition: all 0.3s ease;
+                        }
+                        .count-form-card:hover {
+                            box-shadow: 0 4px 15px rgba(0,0,0,0.08);
+                        }
+                        
+                        /* Styles for multiple metrics */
+                        .summary-metrics {
+                            display: flex;
+                            justify-content: space-between;
+                            background-color: white;
+                            border-radius: 12px;
+                            padding: 16px 24px;
+                            margin: 20px 0;
+                            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+                        }
+                        .metric-item {
+                            text-align: center;
+                            padding: 8px;
+                            flex: 1;
+                            border-right: 1px solid #f0f0f0;
+                        }
+                        .metric-item:last-child {
+                            border-right: none;
+                        }
+                        
+                        /* Styles for single metric (when hiding expected and variance) */
+                        .summary-metrics-single {
+                            background-color: white;
+                            border-radius: 12px;
+                            padding: 16px 24px;
+                            margin: 20px 0;
+                            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+                            text-align: center;
+                        }
+                        .metric-item-single {
+                            padding: 12px;
+                        }
+                        
+                        /* Shared metric styles */
+                        .metric-value {
+                            font-size: 28px;
+                            font-weight: 600;
+                            color: #007AFF;
+                            margin-bottom: 5px;
+                        }
+                        .metric-label {
+                            font-size: 13px;
+                            font-weight: 500;
+                            color: #666;
+                            text-transform: uppercase;
+                            letter-spacing: 0.5px;
+                        }
+                        .variance-positive {
+                            color: #34C759;
+                        }
+                        .variance-negative {
+                            color: #FF3B30;
+                        }
+                        .count-table {
+                            margin-top: 15px;
+                            margin-bottom: 15px;
+                            background-color: white;
+                            border-radius: 12px;
+                            padding: 5px;
+                            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+                        }
+                        
+                        /* Input field styling for iOS look */
+                        div[data-testid="stNumberInput"] label, div[data-testid="stSelectbox"] label {
+                            font-weight: 500;
+                            color: #444;
+                            font-size: 14px;
+                        }
+                        div[data-testid="stNumberInput"] input, div[data-testid="stSelectbox"] > div > div {
+                            border-radius: 8px !important;
+                            border: 1px solid #e0e0e0 !important;
+                            padding: 8px 12px !important;
+                        }
+                        div[data-testid="stNumberInput"] input:focus, div[data-testid="stSelectbox"] > div > div:focus {
+                            border-color: #007AFF !important;
+                            box-shadow: 0 0 0 1px #007AFF !important;
+                        }
+                        
+                        /* Custom expander styling for inside product details - not search results */
+                        .inner-expander section[data-testid="stExpander"] {
+                            border-radius: 12px;
+                            border: none !important;
+                            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+                            margin-bottom: 20px;
+                        }
+                        .inner-expander section[data-testid="stExpander"] > div:first-child {
+                            border-radius: 12px 12px 0 0 !important;
+                            border: none !important;
+                            padding: 1rem !important;
+                            background-color: #f8f9fa !important;
+                        }
+                        .inner-expander section[data-testid="stExpander"] > div:first-child p {
+                            font-weight: 600 !important;
+                            color: #333 !important;
+                        }
+                        .inner-expander section[data-testid="stExpander"] > div:nth-child(2) {
+                            border: none !important;
+                            border-top: 1px solid #f0f0f0 !important;
+                            border-radius: 0 0 12px 12px !important;
+                        }
+                        </style>
+                        """
+
+
+# iOS-style number input and the count entry card
+NUMBER_INPUT_CSS = f"""
+                            <style>
+                            /* iOS-style number input styling */
+                            div[data-testid="stNumberInput"] > div > div > div > input {{
+                                border-radius: 10px !important;
+                                border: 1px solid rgba({THEME_PRIMARY.replace('#', '')}, 0.2) !important;
+                                padding: 10px 8px !important;
+                                box-shadow: 0 2px 5px rgba({THEME_PRIMARY.replace('#', '')}, 0.05) !important;
+                                font-size: 16px !important;
+                                transition: all 0.2s ease;
+                            }}
+                            
+                            div[data-testid="stNumberInput"] > div > div > div > input:focus {{
+                                border: 1px solid {THEME_PRIMARY} !important;
+                                box-shadow: 0 0 0 2px rgba({THEME_PRIMARY.replace('#', '')}, 0.1) !important;
+                            }}
+                            
+                            /* Create nice count entry card with gradient border */
+                            .count-form-card {{
+                                border-radius: 16px;
+                                padding: 20px;
+                                margin-bottom: 20px;
+                                box-shadow: 0 4px 12px rgba({THEME_PRIMARY.replace('#', '')}, 0.08);
+                                background: white;
+                                border: 1px solid rgba({THEME_PRIMARY.replace('#', '')}, 0.15);
+                                background: linear-gradient(to bottom, white, rgba({THEME_PRIMARY.replace('#', '')}, 0.02));
+                            }}
+                            </style>
+                            """
+
+
+# Bigger number input for the count value
+COUNT_INPUT_CSS = f"""
+                            <style>
+                            /* Make number input field larger and more prominent */
+                            div[data-testid="stNumberInput"] {{
+                                margin-bottom: 25px;
+                            }}
+                            
+                            div[data-testid="stNumberInput"] > div > div > input {{
+                                border-radius: 12px !important;
+                                border: 2px solid {THEME_PRIMARY} !important;
+                                padding: 15px 20px !important;
+                                box-shadow: 0 3px 10px rgba(0,0,0,0.08) !important;
+                                font-size: 24px !important;
+                                font-weight: 500 !important;
+                                background-color: white !important;
+                                height: 60px !important;
+                                transition: all 0.2s ease !important;
+                            }}
+                            
+                            div[data-testid="stNumberInput"] > div > div > input:focus {{
+                                border: 2px solid {THEME_PRIMARY} !important;
+                                box-shadow: 0 3px 12px rgba({THEME_PRIMARY.replace('#', '')}, 0.3) !important;
+                            }}
+                            
+                            /* Simple fix for +/- buttons */
+                            div[data-testid="stNumberInput"] button {{
+                                width: 36px !important;
+                                height: 36px !important;
+                                border-radius: 10px !important;
+                                background: linear-gradient(135deg, {THEME_PRIMARY} 0%, #9161fd 100%) !important;
+                                color: white !important;
+                                box-shadow: 0 2px 6px rgba({THEME_PRIMARY.replace('#', '')}, 0.3) !important;
+                                padding: 0 !important;
+                                display: flex !important;
+                                align-items: center !important;
+                                justify-content: center !important;
+                                margin: 4px 0 !important;
+                                border: none !important;
+                                position: relative !important;
+                                bottom: 2px !important;
+                            }}
+                            
+                            /* Hover effect */
+                            div[data-testid="stNumberInput"] button:hover {{
+                                filter: brightness(1.05) !important;
+                                box-shadow: 0 3px 8px rgba({THEME_PRIMARY.replace('#', '')}, 0.4) !important;
+                            }}
+                            
+                            /* Make +/- icons more visible */
+                            div[data-testid="stNumberInput"] button svg {{
+                                width: 18px !important;
+                                height: 18px !important;
+                                fill: white !important;
+                            }}
+                            
+                            /* Help tooltip styling */
+                            div[data-testid="stNumberInput"] .stTooltipIcon {{
+                                color: {THEME_PRIMARY} !important;
+                            }}
+                            </style>
+                            """
+
+
+# iOS-style location buttons
+LOCATION_BUTTON_CSS = """
+                            <style>
+                            /* iOS-style location buttons */
+                            .location-buttons div[data-testid="stHorizontalBlock"] {
+                                gap: 8px;
+                                margin-bottom: 8px;
+                            }
+                            
+                            /* All location buttons base style */
+                            .location-buttons div[data-testid="stButton"] button {
+                                border-radius: 10px;
+                                font-size: 13px;
+                                font-weight: 500;
+                                padding: 8px 0;
+                                width: 100%;
+                                transition: all 0.2s;
+                                box-shadow: 0 1px 3px rgba(0,0,0,0.1);
+                                border: 1px solid #e4e4e4;
+                                background-color: #f5f5f7;
+                                color: #333;
+                            }
+                            
+                            /* Hover effect for all buttons */
+                            .location-buttons div[data-testid="stButton"] button:hover {
+                                transform: translateY(-1px);
+                                box-shadow: 0 3px 8px rgba(0,0,0,0.1);
+                                filter: brightness(1.05);
+                            }
+                            
+                            /* Selected location highlight with purple theme */
+                            .location-selected {
+                                font-size: 14px;
+                                color: {THEME_PRIMARY};
+                                margin: 12px 0 15px 0;
+                                text-align: center;
+                                padding: 10px;
+                                border-radius: 10px;
+                                background-color: rgba({THEME_PRIMARY.replace('#', '')}, 0.08);
+                                border: 1px solid rgba({THEME_PRIMARY.replace('#', '')}, 0.2);
+                                font-weight: 500;
+                            }
+                            </style>
+                            """
+
+
+# A more prominent Add Count Entry button
+ADD_COUNT_BUTTON_CSS = f"""
+                            <style>
+                            /* Style for the Add Count Entry button */
+                            div[data-testid="stButton"] button:has(div:contains("Add Count Entry")) {{
+                                background: {THEME_GRADIENT} !important;
+                                color: white !important;
+                                padding: 15px !important;
+                                font-size: 16px !important;
+                                font-weight: 600 !important;
+                                border-radius: 12px !important;
+                                border: none !important;
+                                box-shadow: 0 4px 12px rgba({THEME_PRIMARY.replace('#', '')}, 0.25) !important;
+                                margin-top: 5px !important;
+                                height: auto !important;
+                                transition: all 0.3s ease !important;
+                            }}
+                            
+                            div[data-testid="stButton"] button:has(div:contains("Add Count Entry")):hover {{
+                                transform: translateY(-2px) !important;
+                                box-shadow: 0 6px 15px rgba({THEME_PRIMARY.replace('#', '')}, 0.3) !important;
+                            }}
+                            </style>
+                            """
+
+
+# Metric styling
+METRIC_CSS = f"""
+                            <style>
+                            .summary-metrics-single {{
+                                background: #f7f7f9;
+                                color: #333;
+                                border-radius: 12px;
+                                padding: 15px 20px;
+                                text-align: center;
+                                margin: 15px 0;
+                                box-shadow: 0 4px 12px rgba(0, 0, 0, 0.05);
+                                border: 1px solid #e9e9ec;
+                            }}
+                            .metric-item-single {{
+                                text-align: center;
+                            }}
+                            .metric-value {{
+                                font-size: 36px;
+                                font-weight: 700;
+                                margin-bottom: 5px;
+                                color: #333;
+                            }}
+                            .metric-label {{
+                                font-size: 14px;
+                                font-weight: 500;
+                                letter-spacing: 1px;
+                                color: #666;
+                            }}
+                            
+                            /* Count history table styling */
+                            .count-table {{
+                                border-radius: 12px;
+                                overflow: hidden;
+                                box-shadow: 0 4px 12px rgba({THEME_PRIMARY.replace('#', '')}, 0.08);
+                                margin-top: 15px;
+                                margin-bottom: 20px;
+                                border: 1px solid rgba({THEME_PRIMARY.replace('#', '')}, 0.1);
+                            }}
+                            div[data-testid="stDataFrame"] > div > div > div {{
+                                border-radius: 12px !important;
+                            }}
+                            </style>
+                            """
+
+
+# Historical count comparison section
+HISTORY_COMPARISON_CSS = """
+                                <style>
+                                .comparison-header {
+                                    font-size: 18px;
+                                    font-weight: 600;
+                                    color: #6a28e8;
+                                    margin: 15px 0 10px 0;
+                                    text-align: left;
+                                }
+                                .history-table {
+                                    margin-top: 5px;
+                                    margin-bottom: 15px;
+                                    background-color: white;
+                                    border-radius: 12px;
+                                    padding: 5px;
+                                    box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+                                }
+                                .history-metrics {
+                                    display: flex;
+                                    justify-content: space-between;
+                                    background-color: white;
+                                    border-radius: 12px;
+                                    padding: 15px;
+                                    margin: 10px 0;
+                                    box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+                                }
+                                .history-metric {
+                                    text-align: center;
+                                    flex: 1;
+                                }
+                                .history-metric-value {
+                                    font-size: 20px;
+                                    font-weight: 600;
+                                    color: #6a28e8;
+                                    margin-bottom: 5px;
+                                }
+                                .history-metric-label {
+                                    font-size: 12px;
+                                    color: #666;
+                                    text-transform: uppercase;
+                                }
+                                .trend-up {
+                                    color: #34C759;
+                                }
+                                .trend-down {
+                                    color: #FF3B30;
+                                }
+                                .trend-stable {
+                                    color: #007AFF;
+                                }
+                                </style>
+                                """
+
+
+# Centered Count Complete button
+CENTERED_BUTTON_CSS = f"""
+                                    <style>
+                                    div[data-testid="stButton"] {{
+                                        text-align: center;
+                                        display: flex;
+                                        justify-content: center;
+                                    }}
+                                    </style>
+                                    """
+
+
+# iOS-style export buttons using the theme colors
+EXPORT_BUTTON_CSS = f"""
+            <style>
+                /* iOS style button for Generate Report */
+                div.stButton > button {{
+                    background-color: {THEME_PRIMARY}; /* Primary purple theme */
+                    color: white !important; /* Force white text */
+                    font-weight: 500;
+                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell;
+                    border: none;
+                    padding: 12px 24px;
+                    border-radius: 8px; /* Slightly rounded corners like iOS */
+                    transition: all 0.2s ease;
+                    box-shadow: 0 2px 5px rgba(106, 40, 232, 0.2);
+                    font-size: 15px;
+                    letter-spacing: 0.5px;
+                }}
+                
+                /* Make sure button text is white */
+                div.stButton > button p, 
+                div.stButton > button span,
+                div.stButton > button div {{
+                    color: white !important;
+                }}
+                div.stButton > button:hover {{
+                    box-shadow: 0 4px 10px rgba(106, 40, 232, 0.25);
+                    transform: translateY(-1px);
+                    filter: brightness(1.05);
+                    background-color: {THEME_SECONDARY};
+                }}
+                
+                /* Purple gradient style for Complete Inventory button */
+                [data-testid="stButton"] button:has(> div:contains("Export Inventory Report")) {{
+                    background: {THEME_GRADIENT} !important;
+                    color: white !important; /* Force white text */
+                    box-shadow: 0 4px 10px rgba(106, 40, 232, 0.3) !important;
+                    transition: all 0.3s ease;
+                }}
+                /* Fallback selector in case the above doesn't work */
+                [data-testid="stButton"] button[kind="secondary"][aria-label="📊 Export Inventory Report"] {{
+                    background: {THEME_GRADIENT} !important;
+                    color: white !important; /* Force white text */
+                    box-shadow: 0 4px 10px rgba(106, 40, 232, 0.3) !important;
+                    transition: all 0.3s ease;
+                }}
+                [data-testid="stButton"] button[kind="secondary"][aria-label="📊 Export Inventory Report"]:hover {{
+                    background: linear-gradient(135deg, {THEME_SECONDARY}, {THEME_PRIMARY});
+                    box-shadow: 0 6px 15px rgba(106, 40, 232, 0.4);
+                    transform: translateY(-2px);
+                }}
+                div.stButton > button:active {{
+                    transform: translateY(1px);
+                    box-shadow: 0 1px 3px rgba(0, 0, 0, 0.1);
+                }}
+                
+                /* Purple gradient style for the native export download buttons */
+                [data-testid="stDownloadButton"] button {{
+                    background: {THEME_GRADIENT} !important;
+                    color: white !important; /* Force white text */
+                    border: none !important;
+                    box-shadow: 0 4px 10px rgba(106, 40, 232, 0.3) !important;
+                    transition: all 0.3s ease;
+                }}
+                [data-testid="stDownloadButton"] button p {{
+                    color: white !important;
+                }}
+                
+                /* iOS style download button */
+                .ios-download-btn {{
+                    display: flex;
+                    align-items: center;
+                    justify-content: center;
+                    background: {THEME_GRADIENT}; /* Theme gradient */
+                    color: white !important; /* Force white text */
+                    text-decoration: none;
+                    padding: 12px 16px;
+                    border-radius: 8px;
+                    margin: 12px 0;
+                    font-weight: 500;
+                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen;
+                    transition: all 0.2s ease;
+                    box-shadow: 0 2px 5px rgba({THEME_PRIMARY.replace('#', '')}, 0.2);
+                }}
+                .ios-download-btn:hover {{
+                    background: linear-gradient(135deg, {THEME_SECONDARY}, {THEME_PRIMARY});
+                    box-shadow: 0 4px 10px rgba({THEME_PRIMARY.replace('#', '')}, 0.25);
+                    transform: translateY(-1px);
+                }}
+                .ios-download-btn:active {{
+                    transform: translateY(1px);
+                    box-shadow: 0 1px 3px rgba({THEME_PRIMARY.replace('#', '')}, 0.1);
+                }}
+                .ios-download-icon {{
+                    margin-right: 10px;
+                    font-size: 18px;
+                }}
+                
+                /* Report card styling */
+                .report-cards {{
+                    display: flex;
+                    flex-wrap: wrap;
+                    gap: 15px;
+                    margin-top: 15px;
+                    margin-bottom: 25px;
+                }}
+                .report-card {{
+                    flex: 1;
+                    min-width: 220px;
+                    background-color: #f8f9fa;
+                    border-radius: 10px;
+                    overflow: hidden;
+                    box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+                    transition: all 0.3s ease;
+                }}
+                .report-card:hover {{
+                    transform: translateY(-5px);
+                    box-shadow: 0 5px 15px rgba(0,0,0,0.1);
+                }}
+                .report-card-header {{
+                    padding: 15px;
+                    color: white;
+                    font-weight: 600;
+                    text-align: center;
+                }}
+                .report-card-body {{
+                    padding: 15px;
+                    min-height: 80px;
+                    font-size: 14px;
+                    color: #444;
+                }}
+                
+                /* Report summary styling */
+                .report-summary {{
+                    background: linear-gradient(135deg, rgba({THEME_PRIMARY.replace('#', '')}, 0.03), rgba({THEME_SECONDARY.replace('#', '')}, 0.05));
+                    border-radius: 10px;
+                    padding: 20px;
+                    margin-top: 20px;
+                    box-shadow: 0 2px 8px rgba({THEME_PRIMARY.replace('#', '')}, 0.1);
+                    border: 1px solid rgba({THEME_PRIMARY.replace('#', '')}, 0.1);
+                }}
+                .summary-header {{
+                    font-size: 18px;
+                    font-weight: 600;
+                    margin-bottom: 15px;
+                    color: {THEME_PRIMARY};
+                }}
+                .summary-metrics {{
+                    display: flex;
+                    gap: 25px;
+                    margin-bottom: 15px;
+                }}
+                .summary-metric {{
+                    flex: 1;
+                }}
+                .metric-value {{
+                    font-size: 24px;
+                    font-weight: 700;
+                    color: {THEME_SECONDARY}; 
+                    text-shadow: 0 1px 2px rgba({THEME_PRIMARY.replace('#', '')}, 0.2);
+                }}
+                .metric-label {{
+                    font-size: 14px;
+                    color: #666;
+                    margin-top: 5px;
+                }}
+            </style>
+            """
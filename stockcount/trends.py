@@ -0,0 +1,254 @@
+"""
+Persistent store of per-product count session totals.
+
+Counts only live in a browser session, so weekly stock takes lose their
+history when the tab closes. TrendStore keeps one record per (product, count
+session) on disk, across sessions and restarts, for long-range usage trends,
+rolling averages and seasonality.
+
+Layout: records are sorted by product then time and held as typed columns in
+CSR form. `offsets[i]:offsets[i + 1]` is product i's run; within a run,
+timestamps are delta-encoded (the first delta is the absolute time), which
+keeps the int64 column small and highly compressible. Totals are float32.
+Sessions older than the retention window are downsampled into one
+monthly-average record per product, so the file stays bounded however many
+years of weekly counts it holds.
+"""
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Default location of the store, overridable with STOCKCOUNT_TREND_STORE
+DEFAULT_STORE_PATH = os.path.join(".stockcount", "trends.npz")
+
+# Sessions newer than this many days are kept at full resolution
+DEFAULT_RETENTION_DAYS = 365
+
+# Record kinds
+SESSION = 0
+MONTHLY = 1
+
+
+class TrendStore:
+    """Delta-encoded, columnar time series of session totals per product."""
+    
+    def __init__(self, path=None, retention_days=DEFAULT_RETENTION_DAYS):
+        self.path = path or os.environ.get("STOCKCOUNT_TREND_STORE", DEFAULT_STORE_PATH)
+        self.retention_days = retention_days
+        self._lock = threading.RLock()  # Guards the columns, which _encode replaces one by one
+        
+        self.products = np.empty(0, dtype=str)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.time_deltas = np.empty(0, dtype=np.int64)
+        self.totals = np.empty(0, dtype=np.float32)
+        self.sessions = np.empty(0, dtype=np.int32)  # Sessions behind each record (1 unless monthly)
+        self.kinds = np.empty(0, dtype=np.int8)
+        self._codes = {}
+        
+        if os.path.exists(self.path):
+            self.load()
+    
+    def __len__(self):
+        return len(self.totals)
+    
+    def load(self):
+        with self._lock, np.load(self.path, allow_pickle=False) as data:
+            self.products = data['products']
+            self.offsets = data['offsets']
+            self.time_deltas = data['time_deltas']
+            self.totals = data['totals']
+            self.sessions = data['sessions']
+            self.kinds = data['kinds']
+            self._codes = {product_id: code for code, product_id in enumerate(self.products.tolist())}
+    
+    def save(self):
+        """Write the store atomically so a crash never leaves a half-written file."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".npz")
+            with os.fdopen(handle, 'wb') as temp_file:
+                np.savez_compressed(
+                    temp_file,
+                    products=self.products,
+                    offsets=self.offsets,
+                    time_deltas=self.time_deltas,
+                    totals=self.totals,
+                    sessions=self.sessions,
+                    kinds=self.kinds,
+                )
+            os.replace(temp_path, self.path)
+    
+    # ----- encoding -----
+    
+    def _decoded(self):
+        """All records as flat (product code, absolute time, total, sessions, kind) arrays."""
+        with self._lock:
+            run_lengths = np.diff(self.offsets)
+            codes = np.repeat(np.arange(len(self.products)), run_lengths)
+            # Undo the per-run delta encoding: cumulative sum restarted at each run
+            cumulative = np.cumsum(self.time_deltas)
+            run_starts = np.repeat(cumulative[self.offsets[:-1]] - self.time_deltas[self.offsets[:-1]], run_lengths)
+            times = cumulative - run_starts
+            return codes, times, self.totals.astype(np.float64), self.sessions, self.kinds
+    
+    def _encode(self, products, codes, times, totals, sessions, kinds):
+        order = np.lexsort((times, codes))
+        codes, times = codes[order], times[order]
+        totals, sessions, kinds = totals[order], sessions[order], kinds[order]
+        
+        offsets = np.zeros(len(products) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(products)), out=offsets[1:])
+        deltas = np.diff(times, prepend=0)
+        run_starts = offsets[:-1][np.diff(offsets) > 0]
+        deltas[run_starts] = times[run_starts]
+        
+        self.products = products
+        self.offsets = offsets
+        self.time_deltas = deltas.astype(np.int64)
+        self.totals = totals.astype(np.float32)
+        self.sessions = sessions.astype(np.int32)
+        self.kinds = kinds.astype(np.int8)
+        self._codes = {product_id: code for code, product_id in enumerate(products.tolist())}
+    
+    # ----- writes -----
+    
+    def record_session(self, session_time, totals):
+        """
+        Add one count session's totals ({product_id: total}). Recording the
+        same session again replaces its earlier totals.
+        """
+        if not totals:
+            return
+        timestamp = int(session_time.timestamp()) if isinstance(session_time, datetime) else int(session_time)
+        
+        with self._lock:
+            codes, times, old_totals, sessions, kinds = self._decoded()
+            
+            # Extend the product dictionary with products seen for the first time
+            new_ids = [str(product_id) for product_id in totals if str(product_id) not in self._codes]
+            products = np.concatenate([self.products, np.array(new_ids, dtype=str)]) if new_ids else self.products
+            lookup = dict(self._codes)
+            lookup.update({product_id: len(self.products) + i for i, product_id in enumerate(new_ids)})
+            
+            new_codes = np.array([lookup[str(product_id)] for product_id in totals], dtype=np.int64)
+            new_totals = np.array(list(totals.values()), dtype=np.float64)
+            
+            # Drop earlier records of this session for the same products
+            replaced = (times == timestamp) & (kinds == SESSION) & np.isin(codes, new_codes)
+            keep = ~replaced
+            
+            self._encode(
+                products,
+                np.concatenate([codes[keep], new_codes]),
+                np.concatenate([times[keep], np.full(len(new_codes), timestamp, dtype=np.int64)]),
+                np.concatenate([old_totals[keep], new_totals]),
+                np.concatenate([sessions[keep], np.ones(len(new_codes), dtype=np.int32)]),
+                np.concatenate([kinds[keep], np.full(len(new_codes), SESSION, dtype=np.int8)]),
+            )
+    
+    def downsample(self, now=None):
+        """
+        Replace session records older than the retention window with one
+        record per product and calendar month holding the mean session total.
+        Sessions that expire later are folded into the month's existing
+        record, weighted by the sessions it already stands for, so every
+        product keeps a single record per month however often this runs.
+        Returns the number of session records folded.
+        """
+        now = now or datetime.now()
+        cutoff = int(now.timestamp()) - self.retention_days * 86400
+        
+        with self._lock:
+            codes, times, totals, sessions, kinds = self._decoded()
+            old = (times < cutoff) & (kinds == SESSION)
+            if not old.any():
+                return 0
+            
+            # Existing monthly records are regrouped with the expiring sessions
+            fold = old | (kinds == MONTHLY)
+            months = pd.to_datetime(times[fold], unit='s').to_period('M')
+            grouped = pd.DataFrame({
+                'code': codes[fold],
+                'month': months,
+                'weighted': totals[fold] * sessions[fold],
+                'sessions': sessions[fold],
+            }).groupby(['code', 'month'], sort=False).agg(weighted=('weighted', 'sum'), sessions=('sessions', 'sum'))
+            
+            month_codes = grouped.index.get_level_values('code').to_numpy(dtype=np.int64)
+            month_times = grouped.index.get_level_values('month').to_timestamp().astype('datetime64[s]').astype(np.int64).to_numpy()
+            month_totals = (grouped['weighted'] / grouped['sessions']).to_numpy(dtype=np.float64)
+            
+            self._encode(
+                self.products,
+                np.concatenate([codes[~fold], month_codes]),
+                np.concatenate([times[~fold], month_times]),
+                np.concatenate([totals[~fold], month_totals]),
+                np.concatenate([sessions[~fold], grouped['sessions'].to_numpy(dtype=np.int32)]),
+                np.concatenate([kinds[~fold], np.full(len(month_codes), MONTHLY, dtype=np.int8)]),
+            )
+            return int(old.sum())
+    
+    # ----- queries -----
+    
+    def series(self, product_id, start=None, end=None):
+        """
+        A product's totals over time, oldest first, optionally limited to
+        [start, end]. Only the product's own run is decoded.
+        """
+        with self._lock:
+            code = self._codes.get(str(product_id))
+            if code is None:
+                return pd.DataFrame({'time': pd.to_datetime([]), 'total': [], 'sessions': [], 'monthly': []})
+            run = slice(self.offsets[code], self.offsets[code + 1])
+            times = np.cumsum(self.time_deltas[run])
+            totals, sessions, kinds = self.totals[run], self.sessions[run], self.kinds[run]
+        
+        first = 0 if start is None else np.searchsorted(times, int(pd.Timestamp(start).timestamp()), side='left')
+        last = len(times) if end is None else np.searchsorted(times, int(pd.Timestamp(end).timestamp()), side='right')
+        
+        return pd.DataFrame({
+            'time': pd.to_datetime(times[first:last], unit='s'),
+            'total': totals[first:last].astype(np.float64),
+            'sessions': sessions[first:last],
+            'monthly': kinds[first:last] == MONTHLY,
+        })
+    
+    def rolling_average(self, product_id, window=4, start=None, end=None):
+        """Rolling mean of the product's totals over `window` records."""
+        series = self.series(product_id, start, end)
+        return series.assign(rolling_average=series['total'].rolling(window, min_periods=1).mean())
+    
+    def usage_trend(self, product_id, start=None, end=None):
+        """Least-squares change in the product's total per 30 days, or None with fewer than two records."""
+        series = self.series(product_id, start, end)
+        if len(series) < 2:
+            return None
+        days = (series['time'] - series['time'].iloc[0]).dt.total_seconds().to_numpy() / 86400
+        if np.ptp(days) == 0:
+            return None
+        slope = np.polyfit(days, series['total'].to_numpy(), 1)[0]
+        return float(slope * 30)
+    
+    def velocity(self):
+        """
+        Mean absolute change between consecutive records of every product, as
+        a Series indexed by product id. Products with a single record are left out.
+        """
+        with self._lock:
+            codes, times, totals, sessions, kinds = self._decoded()
+            products = self.products
+        same_product = codes[1:] == codes[:-1]
+        changes = np.abs(np.diff(totals))[same_product]
+        change_codes = codes[1:][same_product]
+        moves = pd.Series(changes).groupby(change_codes).mean()
+        return pd.Series(moves.to_numpy(), index=products[moves.index.to_numpy()])
+    
+    def seasonality(self, product_id):
+        """Mean total by calendar month (1-12) across all years on record."""
+        series = self.series(product_id)
+        return series.groupby(series['time'].dt.month)['total'].mean()
@@ -0,0 +1,48 @@
+"""
+Per-product UI state with a bounded footprint.
+
+The count panel remembers small per-product choices (such as the location
+last picked for a product) across reruns. Keeping them as one session-state
+key per product grows without limit as a counter browses the catalog, and
+Streamlit has to carry every key through each rerun. ProductUIState holds
+them in one ordered dict instead and evicts the least recently used product
+beyond a fixed capacity.
+"""
+from collections import OrderedDict
+
+# Products whose UI state is remembered per session
+DEFAULT_CAPACITY = 500
+
+
+class ProductUIState:
+    """LRU map of product id -> {field: value}."""
+    
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._products = OrderedDict()
+    
+    def __len__(self):
+        return len(self._products)
+    
+    def __contains__(self, product_id):
+        return product_id in self._products
+    
+    def get(self, product_id, field, default=None):
+        fields = self._products.get(product_id)
+        if fields is None:
+            return default
+        self._products.move_to_end(product_id)
+        return fields.get(field, default)
+    
+    def set(self, product_id, field, value):
+        fields = self._products.get(product_id)
+        if fields is None:
+            fields = self._products[product_id] = {}
+            if len(self._products) > self.capacity:
+                self._products.popitem(last=False)
+        else:
+            self._products.move_to_end(product_id)
+        fields[field] = value
+    
+    def clear(self):
+        self._products.clear()
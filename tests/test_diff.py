@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+from stockcount.diff import ADDED, DECREASED, INCREASED, MISSING, diff_sessions, diff_summary
+
+
+def make_entries():
+    return pd.DataFrame({
+        'product_id': ["P1", "P1", "P2", "P3", "P2", "P4"],
+        'count': [5.0, 1.0, 3.0, 2.0, 1.0, 4.0],
+        'location': "Bar 1",
+        'timestamp': "2026-01-01 10:00:00",
+        'session_id': ["w1", "w1", "w1", "w1", "w2", "w2"],
+    })
+
+
+def test_statuses_and_changes():
+    diff = diff_sessions(make_entries(), "w1", "w2")
+    assert diff['Status'].to_dict() == {"P1": MISSING, "P2": DECREASED, "P3": MISSING, "P4": ADDED}
+    assert diff.loc["P2", 'Change'] == -2.0
+    assert diff.loc["P4", 'Change'] == 4.0
+    assert diff_summary(diff)[INCREASED] == 0
+
+
+def test_same_session_is_rejected():
+    with pytest.raises(ValueError):
+        diff_sessions(make_entries(), "w1", "w1")
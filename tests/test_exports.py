@@ -0,0 +1,116 @@
+import threading
+import time
+from datetime import datetime
+from io import BytesIO
+from types import SimpleNamespace
+
+import pandas as pd
+
+from stockcount.counting import add_count_entry
+from stockcount.cube import LocationCube
+from stockcount.delta import ExportWatermark
+from stockcount.export_cache import ExportCache
+from stockcount.exports import export_served_callback, prepare_delta_export, prepare_export_data
+from stockcount.history import SessionHistory
+from stockcount.jobs import ExportJobManager
+from stockcount.ledger import CountLedger
+from stockcount.profiling import PhaseProfiler, activate
+
+RAW_CSV = "Product ID,Brand & Description,794438\n,,[E]Close SC\nP1,Lager,0\nP2,Merlot,0\n"
+
+
+def make_state():
+    state = SimpleNamespace(
+        stock_data=pd.DataFrame({'product_id': ["P1", "P2"], 'Brand & Description': ["Lager", "Merlot"], 'expected_count': [5, 3]}),
+        raw_csv_content=RAW_CSV,
+        catalog_hash="catalog",
+        count_data={},
+        historical_counts={},
+        sc_closed={},
+        count_ledger=CountLedger(),
+        session_history=SessionHistory(),
+        export_cache=ExportCache(),
+        export_watermark=ExportWatermark(),
+        count_sessions=[],
+        current_count_session={"id": "s1", "timestamp": datetime.now(), "name": "Count Session"},
+        location_cube=None,
+    )
+    state.location_cube = LocationCube(state.stock_data)
+    return state
+
+
+def test_export_leaves_out_counts_added_after_it_was_requested():
+    state = make_state()
+    add_count_entry(state, "P1", 4, "Bar 1", "")
+    export = prepare_export_data(state)
+    add_count_entry(state, "P1", 2, "Bar 1", "")
+    add_count_entry(state, "P2", 1, "Bar 1", "")
+    
+    lines = export().decode().splitlines()
+    assert lines[2:] == ["P1,Lager,4", "P2,Merlot,0"]
+
+
+def test_background_build_moves_watermark_only_when_downloaded():
+    state = make_state()
+    add_count_entry(state, "P1", 4, "Bar 1", "")
+    builder = prepare_export_data(state, record_watermark=False)
+    job = ExportJobManager().submit("Inventory", "inventory.csv", builder, on_served=export_served_callback(state))
+    while job.active:
+        time.sleep(0.01)
+    assert state.export_watermark.since("catalog") == 0
+    
+    add_count_entry(state, "P2", 1, "Bar 1", "")
+    assert job.download().decode().splitlines()[2:] == ["P1,Lager,4", "P2,Merlot,0"]
+    assert state.export_watermark.since("catalog") == 1
+    
+    patch = prepare_delta_export(state, "patch")().decode().splitlines()
+    assert patch == ["Product ID,Count,Change", "P2,1.0,1.0"]
+
+
+def location_report(state):
+    return pd.read_csv(BytesIO(prepare_export_data(state, "location_summary")()), dtype={'Product ID': str}).set_index('Product ID')
+
+
+def cube_location_totals(cube):
+    return {location: sum(cube.location_total(location, session_id) for session_id in cube.sessions) for location in cube.locations}
+
+
+def test_location_summary_agrees_with_the_location_cube():
+    state = make_state()
+    add_count_entry(state, "P1", 4, "Bar 1", "")
+    add_count_entry(state, "P1", 2, "Cellar", "")
+    add_count_entry(state, "P2", 1, "Bar 1", "")
+    state.current_count_session = {"id": "s2", "timestamp": datetime.now(), "name": "Recount"}
+    add_count_entry(state, "P1", 3, "Bar 1", "")
+    
+    report = location_report(state)
+    assert report[["Bar 1", "Cellar"]].sum().to_dict() == cube_location_totals(state.location_cube) == {"Bar 1": 8.0, "Cellar": 2.0}
+    assert report.loc["P1", "Total Counted"] == 9.0
+    assert report.loc["P1", "Entries"] == 3
+    assert report.loc["P2", "Cellar"] == 0.0
+    
+    # Later entries reach both the cube and the next export
+    add_count_entry(state, "P2", 9, "Cellar", "")
+    state.export_cache = ExportCache()
+    report = location_report(state)
+    assert report[["Bar 1", "Cellar"]].sum().to_dict() == cube_location_totals(state.location_cube) == {"Bar 1": 8.0, "Cellar": 11.0}
+    assert report['Total Counted'].sum() == 19.0
+
+
+def test_export_build_is_profiled_on_the_thread_that_runs_it():
+    state = make_state()
+    add_count_entry(state, "P1", 4, "Bar 1", "")
+    profiler = PhaseProfiler()
+    activate(profiler)
+    try:
+        profiler.begin_rerun()
+        export = prepare_export_data(state)
+        assert "prepare_export_data" not in profiler.samples
+    finally:
+        activate(None)
+    
+    worker = threading.Thread(target=export)
+    worker.start()
+    worker.join()
+    assert len(profiler.samples["prepare_export_data"]) == 1
+    assert "prepare_export_data" not in profiler.current
@@ -0,0 +1,42 @@
+import threading
+import time
+
+from stockcount.jobs import DONE, MAX_RESULTS_PER_OWNER, ExportJobManager
+
+
+def wait_for(job, timeout=5):
+    deadline = time.time() + timeout
+    while job.active and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_report_build_phase_is_visible_while_building():
+    manager = ExportJobManager()
+    building = threading.Event()
+    release = threading.Event()
+    
+    def build(progress):
+        progress(0, 1, "Building compliance report")
+        building.set()
+        release.wait(5)
+        progress(1, 1, "Writing file")
+        return b"data"
+    
+    job = manager.submit("Compliance", "compliance.csv", build)
+    assert building.wait(5)
+    assert job.phase == "Building compliance report"
+    release.set()
+    assert wait_for(job).status == DONE
+    assert job.phase == "Writing file" and job.result == b"data"
+
+
+def test_finished_results_are_capped_per_owner():
+    manager = ExportJobManager()
+    jobs = [wait_for(manager.submit(f"Report {i}", "r.csv", lambda progress: b"x", owner="session-a")) for i in range(MAX_RESULTS_PER_OWNER + 2)]
+    other = wait_for(manager.submit("Other", "o.csv", lambda progress: b"y", owner="session-b"))
+    manager.submit("Report next", "r.csv", lambda progress: b"x", owner="session-a")
+    
+    kept = [job for job in jobs if manager.get(job.id) is not None]
+    assert kept == jobs[-(MAX_RESULTS_PER_OWNER - 1):]
+    assert manager.get(other.id) is other
@@ -0,0 +1,46 @@
+import threading
+
+from stockcount.ledger import LEDGER_COLUMNS, CountLedger
+
+
+def make_ledger(entries):
+    ledger = CountLedger()
+    for i in range(entries):
+        ledger.append(f"P{i % 7:03d}", i, "Bar" if i % 2 else "Cellar", f"2026-01-01 10:00:{i % 60:02d}", "s1")
+    return ledger
+
+
+def test_to_frame_snapshots_row_limit():
+    ledger = make_ledger(10)
+    frame = ledger.to_frame(4)
+    assert list(frame.columns) == LEDGER_COLUMNS
+    assert frame['count'].tolist() == [0.0, 1.0, 2.0, 3.0]
+    assert frame['location'].tolist() == ["Cellar", "Bar", "Cellar", "Bar"]
+
+
+def test_to_frame_reuses_frame_for_same_rows():
+    ledger = make_ledger(5)
+    first = ledger.to_frame()
+    assert ledger.to_frame() is first
+    
+    ledger.append("P999", 1, "Bar", "2026-01-01 11:00:00", "s1")
+    assert len(ledger.to_frame()) == 6
+    assert len(ledger.to_frame(5)) == 5
+
+
+def test_to_frame_rows_match_request_across_threads():
+    ledger = make_ledger(200)
+    mismatches = []
+    
+    def read(rows):
+        for _ in range(300):
+            frame = ledger.to_frame(rows)
+            if len(frame) != rows:
+                mismatches.append((rows, len(frame)))
+    
+    threads = [threading.Thread(target=read, args=(rows,)) for rows in (50, 100, 150, 200)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert mismatches == []
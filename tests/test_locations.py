@@ -0,0 +1,47 @@
+import pandas as pd
+
+from stockcount.cube import LocationCube
+from stockcount.locations import DEFAULT_ROOMS, LocationRegistry, load_location_registry
+
+SITES = [{'name': "Arc Bar", 'rooms': [
+    {'name': "Bar"},
+    {'name': "Cellar", 'shelves': ["Kegs", "Racking A"]},
+]}]
+
+
+def test_leaves_and_labels():
+    registry = LocationRegistry(SITES)
+    assert registry.leaf_labels == ["Bar", "Cellar / Kegs", "Cellar / Racking A"]
+    assert registry.assignable_labels == ["Bar", "Cellar", "Cellar / Kegs", "Cellar / Racking A"]
+    assert registry.match("racking a") == "Cellar / Racking A"
+    assert registry.match("Arc Bar / Cellar / Kegs") == "Cellar / Kegs"
+    assert registry.match("Garage", "Unknown") == "Unknown"
+
+
+def test_room_with_shelves_maps_to_the_room():
+    registry = LocationRegistry(SITES)
+    assert registry.match("cellar") == "Cellar"
+    assert registry.leaf_for("cellar") == "Cellar / Kegs"
+    assert registry.leaf_for("Bar") == "Bar"
+
+
+def test_room_completion_counts_every_shelf():
+    registry = LocationRegistry(SITES)
+    catalog = pd.DataFrame({'product_id': ["P1", "P2", "P3"], 'location': ["Cellar", "Cellar", "Bar"]})
+    cube = LocationCube(catalog, registry)
+    cube.add("P1", "Cellar / Kegs", "s1", 2)
+    cube.add("P2", "Cellar / Racking A", "s1", 3)
+    
+    assert cube.completion("Cellar", "s1") == (2, 2)
+    assert cube.completion("Cellar / Kegs", "s1") == (0, 0)
+    summary = cube.session_summary("s1", registry.assignable_labels).set_index('Location')
+    assert summary.loc["Cellar", 'Quantity'] == 5
+    assert summary.loc["Cellar", 'Completion'] == 1.0
+    assert summary.loc["Cellar / Kegs", 'Quantity'] == 2
+
+
+def test_site_without_rooms_falls_back_to_default_rooms(tmp_path):
+    config = tmp_path / "locations.toml"
+    config.write_text('[[sites]]\nname = "Empty"\n')
+    registry = load_location_registry(str(config))
+    assert registry.leaf_labels == DEFAULT_ROOMS
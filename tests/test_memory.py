@@ -0,0 +1,36 @@
+import logging
+import time
+
+from stockcount import memory
+from stockcount.memory import MemoryAuditor
+
+
+def test_threshold_is_logged_once_per_crossing(caplog):
+    auditor = MemoryAuditor(session_warn_mb=1, total_warn_mb=1000)
+    big = [('catalog', b"x" * 2**21)]
+    with caplog.at_level(logging.WARNING, logger="stockcount.memory"):
+        for _ in range(3):
+            auditor.audit("s1", big)
+        assert len(caplog.records) == 1
+        
+        auditor.audit("s1", [('catalog', b"x")])
+        auditor.audit("s1", big + [('extra', b"y" * 1024)])
+        assert len(caplog.records) == 2
+    assert len(auditor._warned) == 1
+
+
+def test_idle_sessions_count_until_closed(monkeypatch):
+    open_sessions = {"s1", "s2"}
+    auditor = MemoryAuditor(is_open=lambda session_id: session_id in open_sessions)
+    auditor.audit("s1", [('catalog', b"x" * 1000)])
+    auditor.audit("s2", [('catalog', b"x" * 1000)])
+    
+    # Long idle, still open: keeps counting
+    later = time.time() + 10 * memory.AUDIT_STALE_SECONDS
+    monkeypatch.setattr(memory.time, 'time', lambda: later)
+    assert auditor.session_count() == 2
+    assert auditor.total_bytes() >= 2000
+    
+    open_sessions.discard("s1")
+    assert auditor.total_bytes() < 2000
+    assert auditor.session_count() == 1
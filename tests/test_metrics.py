@@ -0,0 +1,70 @@
+import socket
+import sys
+import threading
+
+from stockcount.metrics import MetricsExporter, MetricsRegistry
+
+
+def test_render_while_other_threads_add_series():
+    # Switch threads often so updates land in the middle of a render
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    registry = MetricsRegistry()
+    counter = registry.counter("test_events_total", "Events.", ("kind",))
+    histogram = registry.histogram("test_seconds", "Latency.", ("kind",))
+    
+    def update(offset):
+        for i in range(2000):
+            counter.inc(kind=f"k{offset}-{i % 500}")
+            histogram.observe(i % 7 / 10, kind=f"k{offset}-{i % 500}")
+    
+    threads = [threading.Thread(target=update, args=(offset,)) for offset in range(3)]
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            registry.render()
+    finally:
+        sys.setswitchinterval(switch_interval)
+        for thread in threads:
+            thread.join()
+    
+    text = registry.render()
+    assert text.count('test_seconds_count{') == text.count('test_events_total{') == 1500
+
+
+def test_busy_port_is_skipped_and_port_served_once():
+    with socket.socket() as busy:
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        port = busy.getsockname()[1]
+        exporter = MetricsExporter(MetricsRegistry(), port=port).start()
+        assert exporter._server is None
+    
+    first = MetricsExporter(MetricsRegistry(), port=port).start()
+    second = MetricsExporter(MetricsRegistry(), port=port).start()
+    try:
+        assert first._server is not None
+        assert second._server is None
+    finally:
+        first._server.shutdown()
+        first._server.server_close()
+
+
+def test_write_loop_survives_a_failed_write(tmp_path, monkeypatch):
+    exporter = MetricsExporter(MetricsRegistry(), path=str(tmp_path / "metrics.prom"), interval=0)
+    attempts = []
+    
+    def write():
+        attempts.append(None)
+        if len(attempts) == 1:
+            raise OSError("disk full")
+        if len(attempts) == 3:
+            raise SystemExit
+    
+    monkeypatch.setattr(exporter, 'write', write)
+    try:
+        exporter._write_loop()
+    except SystemExit:
+        pass
+    assert len(attempts) == 3
@@ -0,0 +1,23 @@
+import numpy as np
+
+from stockcount.recount import RecountQueue
+
+
+def test_rebuild_keeps_popped_products_out_of_the_queue():
+    queue = RecountQueue.from_arrays(np.array(["A", "B", "C"]), np.array([3.0, 2.0, 1.0]))
+    assert queue.pop() == ("A", 3.0)
+    
+    rebuilt = RecountQueue.from_arrays(np.array(["A", "B", "C"]), np.array([5.0, 2.0, 1.0]), queue.outstanding)
+    assert rebuilt.peek_many(5) == [("B", 2.0), ("C", 1.0)]
+    assert rebuilt.outstanding == {"A": 5.0}
+
+
+def test_unrecounted_products_come_back_after_the_rest():
+    queue = RecountQueue.from_arrays(np.array(["A", "B"]), np.array([3.0, 2.0]))
+    assert queue.pop()[0] == "A"
+    assert queue.pop()[0] == "B"
+    queue.update("B", 0)
+    assert queue.pop() == ("A", 3.0)
+    assert queue.pop() == ("A", 3.0)
+    queue.update("A", 0)
+    assert queue.pop() is None and queue.outstanding == {}
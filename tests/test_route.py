@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from stockcount.locations import LocationRegistry, default_sites
+from stockcount.route import CountRoute
+
+
+def test_route_orders_by_location_then_product():
+    catalog = pd.DataFrame({
+        'product_id': ["B2", "A1", "C3", "A0", "A1"],
+        'location': ["Cellar", "Cellar", "Bar 1", "Cellar", "Cellar"],
+    })
+    route = CountRoute(catalog, LocationRegistry(default_sites()))
+    assert route.product_ids.tolist() == ["C3", "A0", "A1", "A1", "B2"]
+    assert route.order.tolist() == [2, 3, 1, 4, 0]
+    assert route.locations.tolist() == ["Bar 1", "Cellar", "Cellar", "Cellar", "Cellar"]
+
+
+def test_next_stop_skips_counted_and_wraps():
+    catalog = pd.DataFrame({'product_id': ["P1", "P2", "P3"], 'location': ["Bar 1", "Bar 1", "Bar 1"]})
+    route = CountRoute(catalog, LocationRegistry(default_sites()))
+    is_counted = np.array([False, True, False])
+    assert route.next_stop(is_counted, start=1) == 2
+    assert route.next_stop(is_counted, start=3) == 0
+    assert route.next_stop(np.ones(3, dtype=bool)) is None
@@ -0,0 +1,64 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from stockcount.locations import LocationRegistry, default_sites
+from stockcount.route import CountRoute
+from stockcount.scheduler import WorkSchedule
+
+
+def make_schedule(rows=40, counters=("Ana", "Ben")):
+    catalog = pd.DataFrame({
+        'product_id': [f"P{i:03d}" for i in range(rows)],
+        'location': [["Bar 1", "Bar 2", "Cellar"][i % 3] for i in range(rows)],
+        'expected_count': np.arange(rows) % 7,
+    })
+    route = CountRoute(catalog, LocationRegistry(default_sites()))
+    return catalog, route, WorkSchedule(catalog, route, list(counters))
+
+
+def test_packages_cover_every_stop_once():
+    catalog, route, schedule = make_schedule()
+    stops = np.concatenate([schedule.package(counter) for counter in schedule.counters])
+    assert sorted(stops.tolist()) == list(range(len(catalog)))
+
+
+def test_rebalance_hands_over_half_of_the_busiest_package():
+    catalog, route, schedule = make_schedule()
+    for stop in schedule.package("Ana"):
+        schedule.mark_counted(route.product_ids[stop])
+    busy_before = len(schedule.pending("Ben"))
+    
+    moved = schedule.rebalance()
+    assert 0 < moved < busy_before
+    assert len(schedule.pending("Ana")) == moved
+    assert len(schedule.pending("Ben")) == busy_before - moved
+    assert not np.intersect1d(schedule.pending("Ana"), schedule.pending("Ben")).size
+    assert (schedule.owner[route.order[schedule.pending("Ana")]] == 0).all()
+
+
+def test_summary_stays_consistent_while_rebalancing():
+    catalog, route, schedule = make_schedule(rows=600, counters=("Ana", "Ben", "Cy"))
+    errors = []
+    
+    def count():
+        for stop in np.concatenate([schedule.package(counter) for counter in schedule.counters]):
+            schedule.mark_counted(route.product_ids[stop])
+            schedule.next_stop("Ana")
+    
+    def read():
+        try:
+            for _ in range(300):
+                summary = schedule.summary()
+                assert summary['Items'].sum() == len(catalog)
+        except Exception as error:
+            errors.append(error)
+    
+    threads = [threading.Thread(target=count)] + [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert schedule.summary()['Remaining'].sum() == 0
@@ -0,0 +1,72 @@
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from stockcount.trends import TrendStore
+
+
+def test_downsample_keeps_records_in_their_month(tmp_path):
+    store = TrendStore(path=str(tmp_path / "trends.npz"), retention_days=30)
+    store.record_session(datetime(2024, 3, 4, 10), {"P1": 10})
+    store.record_session(datetime(2024, 3, 18, 10), {"P1": 20})
+    store.record_session(datetime(2024, 4, 1, 10), {"P1": 40})
+    
+    assert store.downsample(now=datetime(2025, 1, 1)) == 3
+    series = store.series("P1")
+    assert series['time'].dt.to_period('M').astype(str).tolist() == ["2024-03", "2024-04"]
+    assert series['total'].tolist() == [15.0, 40.0]
+    assert series['sessions'].tolist() == [2, 1]
+    assert series['monthly'].all()
+
+
+def test_weekly_downsampling_keeps_one_record_per_month(tmp_path):
+    store = TrendStore(path=str(tmp_path / "trends.npz"), retention_days=60)
+    start = datetime(2024, 1, 1, 10)
+    weeks = 156
+    for week in range(weeks):
+        session_time = start + timedelta(weeks=week)
+        store.record_session(session_time, {"P1": week, "P2": 2 * week})
+        store.downsample(now=session_time)
+    
+    series = store.series("P1")
+    monthly = series[series['monthly']]
+    months = monthly['time'].dt.to_period('M')
+    assert months.is_unique
+    assert monthly['sessions'].sum() + (~series['monthly']).sum() == weeks
+    assert len(series) < 50  # about 36 months plus the weeks still in the retention window
+    
+    # Each month holds the mean of the weeks that started in it
+    march = monthly[months == pd.Period("2024-03", 'M')].iloc[0]
+    march_weeks = [week for week in range(weeks) if (start + timedelta(weeks=week)).strftime("%Y-%m") == "2024-03"]
+    assert march['sessions'] == len(march_weeks)
+    assert march['total'] == pytest.approx(sum(march_weeks) / len(march_weeks))
+
+
+def test_series_reads_consistent_runs_while_recording(tmp_path):
+    store = TrendStore(path=str(tmp_path / "trends.npz"))
+    start = pd.Timestamp("2026-01-05").timestamp()
+    store.record_session(start, {"P0": 1})
+    errors = []
+    
+    def write():
+        for week in range(1, 150):
+            store.record_session(start + week * 7 * 86400, {f"P{week % 5}": week, "P0": week})
+    
+    def read():
+        try:
+            for _ in range(300):
+                series = store.series("P0")
+                assert series['time'].is_monotonic_increasing
+                store.velocity()
+        except Exception as error:
+            errors.append(error)
+    
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(store.series("P0")) == 150